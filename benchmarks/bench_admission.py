@@ -0,0 +1,153 @@
+"""
+Задержки при перегрузке с контролем допуска и без него (ASGI-клиент, SQLite-файл).
+
+Чтобы узким местом был пул, а не процессор (клиент и приложение делят один цикл событий),
+каждая сессия держит соединение ещё --db-latency мс — как запрос к удалённому PostgreSQL.
+Сначала замкнутым циклом с concurrency = размеру пула измеряется пропускная способность
+эндпоинта. Затем запросы подаются открытым потоком с частотой --overload × этой
+пропускной способности в течение --seconds секунд, дважды:
+  - без контроля допуска — лишние запросы копятся в ожидании соединения (до pool_timeout);
+  - с контролем допуска — лишние запросы сразу получают 503 с Retry-After.
+Для каждого режима печатаются задержки всех ответов и отдельно успешных:
+p99 с контролем допуска должен оставаться ограниченным, без него — расти со временем прогона.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_admission --rows 20000 --pool-size 4 --db-latency 50 --overload 5 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+# Приложению нужен DATABASE_URL при импорте; бенчмарк работает со своим движком
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench_admission.db")
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import database
+from benchmarks.load import percentile, prepare_database
+from main import app
+from services.admission import AdmissionController, admission_controller
+from services.cache import response_cache
+from services.metrics import InstrumentedAsyncQueuePool
+
+
+def summary(latencies: List[float]) -> str:
+    if not latencies:
+        return "нет ответов"
+    latencies = sorted(latencies)
+    return (
+        f"p50 {percentile(latencies, 0.50):8.1f}   p99 {percentile(latencies, 0.99):8.1f}   "
+        f"max {latencies[-1]:8.1f} мс"
+    )
+
+
+async def measure_capacity(client: httpx.AsyncClient, url: str, concurrency: int, requests: int) -> float:
+    """Пропускная способность (запросов в секунду) при concurrency одновременных запросах"""
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in counter:
+            await client.get(url)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+async def open_loop(client: httpx.AsyncClient, url: str, rate: float, seconds: float) -> Dict[str, Any]:
+    """Подаёт запросы с частотой rate независимо от того, успевает ли сервер отвечать"""
+    results: List[tuple] = []
+
+    async def one() -> None:
+        started = time.perf_counter()
+        response = await client.get(url)
+        results.append((response.status_code, (time.perf_counter() - started) * 1000))
+
+    pending = []
+    started = time.perf_counter()
+    total = int(rate * seconds)
+    for number in range(total):
+        delay = started + number / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        pending.append(asyncio.create_task(one()))
+    await asyncio.gather(*pending)
+
+    return {
+        "sent": total,
+        "ok": [ms for code, ms in results if code == 200],
+        "rejected": [ms for code, ms in results if code == 503],
+        "other": sum(1 for code, _ in results if code not in (200, 503)),
+        "all": [ms for _, ms in results],
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(
+        args.database_url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=args.pool_size,
+        max_overflow=0,
+        pool_timeout=database.DB_POOL_TIMEOUT,
+        connect_args={"timeout": 60},
+    )
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def get_bench_session():
+        async with session_factory() as session:
+            await session.connection()
+            await asyncio.sleep(args.db_latency / 1000)
+            yield session
+
+    app.dependency_overrides[database.get_async_session] = get_bench_session
+    app.dependency_overrides[database.get_read_session] = get_bench_session
+    response_cache.max_entries = 0
+
+    print(f"🌱 Засеваем {args.rows} задач...")
+    await prepare_database(session_factory, engine, args.rows)
+
+    url = f"/api/v2/tasks?limit={args.limit}"
+    # Таймаут пула без контроля допуска — ответ 500, а не исключение в бенчмарке
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        admission_controller.enabled = False
+        capacity = await measure_capacity(client, url, args.pool_size, args.pool_size * 50)
+        rate = capacity * args.overload
+        print(f"📏 {url}: {capacity:.0f} запросов/с при {args.pool_size} соединениях; "
+              f"подаём {rate:.0f} запросов/с ({args.overload:g}×) в течение {args.seconds:g} с\n")
+
+        for label, enabled in (("без контроля допуска", False), ("с контролем допуска", True)):
+            controller = AdmissionController(
+                read_limit=args.pool_size, write_limit=1, health_limit=1, enabled=enabled
+            )
+            admission_controller.enabled = controller.enabled
+            admission_controller.lanes = controller.lanes
+
+            result = await open_loop(client, url, rate, args.seconds)
+            print(f"{label}: отправлено {result['sent']}, успешно {len(result['ok'])}, "
+                  f"503 {len(result['rejected'])}, прочие ошибки {result['other']}")
+            print(f"   все ответы  {summary(result['all'])}")
+            print(f"   успешные    {summary(result['ok'])}")
+            print(f"   отклонённые {summary(result['rejected'])}\n")
+            # Очередь прошлого режима не должна влиять на следующий
+            await asyncio.sleep(1)
+
+    app.dependency_overrides.pop(database.get_async_session, None)
+    app.dependency_overrides.pop(database.get_read_session, None)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///./bench_admission.db",
+                        help="база для прогона (пересоздаётся!)")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--pool-size", type=int, default=4, help="соединений в пуле бенчмарка = лимит полосы чтения")
+    parser.add_argument("--db-latency", type=float, default=50.0, help="сколько мс сессия держит соединение сверх запроса")
+    parser.add_argument("--limit", type=int, default=20, help="задач на страницу в GET /tasks")
+    parser.add_argument("--overload", type=float, default=5.0, help="во сколько раз нагрузка больше пропускной способности")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+"""
+Задержка GET /tasks/agenda при росте таблицы (SQLite в памяти).
+
+Для каждого размера таблицы сравниваются:
+  - agenda_query — UNION ALL уровней приоритета с ORDER BY ... LIMIT по индексу ix_tasks_pending_agenda;
+  - прежний путь клиента — выбрать все незавершённые задачи и отсортировать их в Python.
+Время agenda_query должно оставаться примерно постоянным, время полного прохода — расти с таблицей.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_agenda --sizes 10000,100000,500000 --queries 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+# Приложению нужен DATABASE_URL при импорте; бенчмарк работает со своим движком
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Task
+from services.agenda import agenda_query
+from services.urgency import URGENCY_WINDOW, calculate_quadrant, calculate_urgency
+
+
+async def grow(db: AsyncSession, rows: int, now: datetime, chunk: int = 10000) -> None:
+    """Добавляет rows задач: половина завершена, у 80% есть дедлайн в пределах ±90 дней"""
+    for start in range(0, rows, chunk):
+        batch = []
+        for _ in range(min(chunk, rows - start)):
+            is_important = random.random() < 0.5
+            deadline_at = now + timedelta(days=random.uniform(-90, 90)) if random.random() < 0.8 else None
+            is_urgent = calculate_urgency(deadline_at, now)
+            batch.append({
+                "title": "задача",
+                "is_important": is_important,
+                "is_urgent": is_urgent,
+                "quadrant": calculate_quadrant(is_important, is_urgent),
+                "completed": random.random() < 0.5,
+                "created_at": now - timedelta(days=random.uniform(0, 365)),
+                "deadline_at": deadline_at,
+            })
+        await db.execute(insert(Task), batch)
+    await db.commit()
+    await db.execute(text("ANALYZE"))
+
+
+def client_side_agenda(rows, now: datetime, limit: int) -> list:
+    """Как раньше делал клиент: все незавершённые задачи, приоритет и сортировка в памяти"""
+    soon = now + URGENCY_WINDOW
+
+    def priority(row):
+        deadline = row.deadline_at.replace(tzinfo=timezone.utc) if row.deadline_at else None
+        urgent = deadline is not None and deadline < soon
+        quadrant = calculate_quadrant(row.is_important, urgent)
+        return quadrant, deadline is None, deadline or now, row.id
+
+    return sorted(rows, key=priority)[:limit]
+
+
+async def measure(db: AsyncSession, now: datetime, queries: int, limit: int) -> tuple:
+    stmt = agenda_query(now, limit)
+    started = time.perf_counter()
+    for _ in range(queries):
+        (await db.execute(stmt)).all()
+    agenda_ms = (time.perf_counter() - started) * 1000 / queries
+
+    full_queries = max(1, queries // 20)
+    started = time.perf_counter()
+    for _ in range(full_queries):
+        rows = (await db.execute(
+            select(Task.id, Task.is_important, Task.deadline_at).where(Task.completed.is_(False))
+        )).all()
+        client_side_agenda(rows, now, limit)
+    full_ms = (time.perf_counter() - started) * 1000 / full_queries
+    return agenda_ms, full_ms
+
+
+async def run(sizes: list, queries: int, limit: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    now = datetime.now(timezone.utc)
+
+    print(f"limit={limit}, запросов на размер: {queries}")
+    print(f"{'задач':>10} | {'agenda_query, мс':>17} | {'все незавершённые + сортировка, мс':>35}")
+    async with session_factory() as db:
+        total = 0
+        for size in sorted(sizes):
+            await grow(db, size - total, now)
+            total = size
+            agenda_ms, full_ms = await measure(db, now, queries, limit)
+            print(f"{size:>10} | {agenda_ms:>17.3f} | {full_ms:>35.1f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,500000", help="размеры таблицы через запятую")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run([int(size) for size in args.sizes.split(",")], args.queries, args.limit))
@@ -0,0 +1,122 @@
+"""
+Пропускная способность и задержка POST /tasks и PATCH /tasks/{id}/complete
+с группировкой записей и без неё (ASGI-клиент, по умолчанию файл SQLite).
+
+Для каждой конкурентности из --concurrency и каждого режима (без группировки и с окнами
+из --windows) воркеры отправляют по --requests созданий и завершений. Печатаются запросы
+в секунду, задержки p50/p99 и средний размер пакета. Одиночный клиент платит за группировку
+задержкой около окна; при высокой конкурентности число COMMIT уменьшается в размер пакета раз.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_coalesce --concurrency 1,64 --requests 2000 --windows 1,2,5
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+# Приложению нужен DATABASE_URL при импорте; бенчмарк работает со своим движком
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench_coalesce.db")
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import database
+from benchmarks.load import percentile, prepare_database
+from main import app
+from services.admission import admission_controller
+from services.write_coalescer import write_coalesce_batch_size, write_coalescer
+
+BASE = "/api/v2"
+
+
+def batch_totals(operation: str) -> tuple:
+    """(число пакетов, число операций) из гистограммы write_coalesce_batch_size"""
+    for labels, (counts, total) in write_coalesce_batch_size._values.items():
+        if dict(labels).get("operation") == operation:
+            return sum(counts), total[0]
+    return 0, 0.0
+
+
+async def drive(client: httpx.AsyncClient, requests: List[tuple], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(requests)
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, url, body in queue:
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(requests) / elapsed,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "errors": errors,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine_options = {"pool_size": max(args.concurrency), "max_overflow": 0}
+    if args.database_url.startswith("sqlite"):
+        # Писатели SQLite ждут друг друга, а не падают с "database is locked"
+        engine_options["connect_args"] = {"timeout": 60}
+    engine = create_async_engine(args.database_url, **engine_options)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def get_bench_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[database.get_async_session] = get_bench_session
+    # Запросы, ждущие пакета, не держат соединений; лимит полосы записи здесь не нужен
+    admission_controller.enabled = False
+    write_coalescer.session_factory = session_factory
+
+    modes = [("без группировки", None)] + [(f"окно {window:g} мс", window) for window in args.windows]
+    transport = httpx.ASGITransport(app=app)
+    print(f"{'клиентов':>8}  {'режим':<16} {'операция':<10} {'rps':>8} {'p50, мс':>9} {'p99, мс':>9} {'пакет':>7}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for concurrency, (label, window) in ((c, mode) for c in args.concurrency for mode in modes):
+            await prepare_database(session_factory, engine, 0)
+            write_coalescer.enabled = window is not None
+            write_coalescer.window = (window or 0) / 1000
+
+            creates = [
+                ("POST", f"{BASE}/tasks/", {"title": f"Группа {number}", "is_important": number % 2 == 0})
+                for number in range(args.requests)
+            ]
+            completes = [("PATCH", f"{BASE}/tasks/{number}/complete", None) for number in range(1, args.requests + 1)]
+
+            for operation, requests in (("create", creates), ("complete", completes)):
+                batches, operations = batch_totals(operation)
+                result = await drive(client, requests, concurrency)
+                batches, operations = batch_totals(operation)[0] - batches, batch_totals(operation)[1] - operations
+                batch = f"{operations / batches:7.1f}" if batches else f"{1:7.1f}"
+                mark = "⚠️" if result["errors"] else "  "
+                print(f"{mark}{concurrency:>6}  {label:<16} {operation:<10} {result['rps']:>8.0f} "
+                      f"{result['p50']:>9.2f} {result['p99']:>9.2f} {batch}")
+
+    write_coalescer.enabled = False
+    app.dependency_overrides.pop(database.get_async_session, None)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///./bench_coalesce.db",
+                        help="база для прогона (пересоздаётся!)")
+    parser.add_argument("--concurrency", type=lambda value: [int(part) for part in value.split(",")],
+                        default=[1, 64], help="число одновременных клиентов через запятую")
+    parser.add_argument("--requests", type=int, default=2000, help="созданий и завершений на режим")
+    parser.add_argument("--windows", type=lambda value: [float(part) for part in value.split(",")],
+                        default=[1.0, 2.0, 5.0], help="окна группировки в мс через запятую")
+    asyncio.run(main(parser.parse_args()))
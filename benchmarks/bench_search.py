@@ -0,0 +1,97 @@
+"""
+Сравнение поиска задач на SQLite: ILIKE '%q%' (полный скан) против
+запасного инвертированного индекса из services.search.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_search --rows 100000 --queries 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# Приложению нужен DATABASE_URL при импорте; бенчмарк работает со своим движком
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Task
+from services.search import InvertedIndex
+
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщэюяabcdefghijklmnopqrstuvwxyz"
+
+# Словарь из нескольких тысяч "слов" с неравномерной частотой, как в живых текстах
+WORDS = ["".join(random.choice(ALPHABET) for _ in range(random.randint(4, 10))) for _ in range(5000)]
+WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+
+
+def random_text(words: int) -> str:
+    return " ".join(random.choices(WORDS, weights=WEIGHTS, k=words))
+
+
+async def seed(db: AsyncSession, rows: int, chunk: int = 10000) -> None:
+    for start in range(0, rows, chunk):
+        await db.execute(insert(Task), [
+            {
+                "title": random_text(3),
+                "description": random_text(12),
+                "is_important": False,
+                "is_urgent": False,
+                "quadrant": "Q4",
+                "completed": False,
+            }
+            for _ in range(min(chunk, rows - start))
+        ])
+    await db.commit()
+
+
+async def run(rows: int, queries: int, limit: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    terms = [random.choice(WORDS)[:4] for _ in range(queries)]  # поиск по префиксу
+
+    async with session_factory() as db:
+        await seed(db, rows)
+
+        started = time.perf_counter()
+        for term in terms:
+            keyword = f"%{term}%"
+            await db.execute(
+                select(Task.id)
+                .where(Task.title.ilike(keyword) | Task.description.ilike(keyword))
+                .order_by(Task.created_at, Task.id)
+                .limit(limit)
+            )
+        ilike_ms = (time.perf_counter() - started) * 1000 / queries
+
+        index = InvertedIndex()
+        started = time.perf_counter()
+        await index.build(db)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for term in terms:
+            index.search(term)[:limit]
+        index_ms = (time.perf_counter() - started) * 1000 / queries
+
+    await engine.dispose()
+
+    print(f"Задач: {rows}, запросов: {queries}, limit={limit}")
+    print(f"  ILIKE '%q%' (скан таблицы): {ilike_ms:8.2f} мс/запрос")
+    print(f"  InvertedIndex.search:       {index_ms:8.2f} мс/запрос (ранжирование всех совпадений)")
+    print(f"  построение индекса:         {build_ms:8.0f} мс однократно")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.queries, args.limit))
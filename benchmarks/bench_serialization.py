@@ -0,0 +1,112 @@
+"""
+Сравнение сериализации страницы задач: прежний путь (ORM-объекты,
+TaskResponse.model_validate для каждой строки, pydantic + json.dumps)
+против быстрого (колонки из paginate_tasks и orjson через render_task_page).
+Перед замером проверяется, что оба пути дают побайтно одинаковый ответ.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+# Приложению нужен DATABASE_URL при импорте; бенчмарк работает со своим движком
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Task
+from schemas import TaskPage, TaskResponse
+from services.pagination import encode_cursor, paginate_tasks
+from services.serialization import render_json, render_task_page
+from services.urgency import calculate_urgency, calculate_quadrant
+
+
+async def seed(db: AsyncSession, rows: int, chunk: int = 10000) -> None:
+    now = datetime.now(timezone.utc)
+    for start in range(0, rows, chunk):
+        batch = []
+        for number in range(start, min(start + chunk, rows)):
+            is_important = random.random() < 0.5
+            deadline_at = now + timedelta(days=random.uniform(-30, 30)) if random.random() < 0.7 else None
+            is_urgent = calculate_urgency(deadline_at, now)
+            completed = random.random() < 0.3
+            batch.append({
+                "title": f"Задача №{number}: подготовить отчёт",
+                "description": "Описание с \"кавычками\" и переводом\nстроки" if number % 3 else None,
+                "is_important": is_important,
+                "is_urgent": is_urgent,
+                "quadrant": calculate_quadrant(is_important, is_urgent),
+                "completed": completed,
+                "created_at": now - timedelta(seconds=rows - number, microseconds=random.randint(0, 999999)),
+                "completed_at": now if completed else None,
+                "deadline_at": deadline_at,
+            })
+        await db.execute(insert(Task), batch)
+    await db.commit()
+
+
+async def orm_page(db: AsyncSession, limit: int) -> bytes:
+    """Прежний путь: ORM-объекты и валидация каждой строки"""
+    result = await db.execute(select(Task).order_by(Task.created_at, Task.id).limit(limit + 1))
+    tasks = result.scalars().all()
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+    items = [TaskResponse.model_validate(task).model_dump() for task in tasks]
+    next_cursor = encode_cursor(tasks[-1].created_at, tasks[-1].id) if has_more and tasks else None
+    return render_json(TaskPage, {"items": items, "next_cursor": next_cursor})
+
+
+async def fast_page(db: AsyncSession, limit: int) -> bytes:
+    """Быстрый путь: колонки без ORM и orjson"""
+    return render_task_page(await paginate_tasks(db, limit=limit))
+
+
+async def measure(session_factory: async_sessionmaker, produce, limit: int, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        # Новая сессия на каждый замер, чтобы identity map не переиспользовала объекты
+        async with session_factory() as db:
+            started = time.perf_counter()
+            await produce(db, limit)
+            best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+async def run(sizes: list[int], repeats: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        await seed(db, max(sizes))
+
+    print(f"{'строк':>8} {'ORM + pydantic':>16} {'колонки + orjson':>18} {'ускорение':>10}")
+    for size in sizes:
+        async with session_factory() as db:
+            expected = await orm_page(db, size)
+        async with session_factory() as db:
+            actual = await fast_page(db, size)
+        if actual != expected:
+            raise SystemExit(f"❌ Ответы различаются при {size} строках")
+
+        orm_ms = await measure(session_factory, orm_page, size, repeats)
+        fast_ms = await measure(session_factory, fast_page, size, repeats)
+        print(f"{size:>8} {orm_ms:>13.1f} мс {fast_ms:>15.1f} мс {orm_ms / fast_ms:>9.1f}x")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeats))
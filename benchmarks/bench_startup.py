@@ -0,0 +1,128 @@
+"""
+Время импорта и запуска приложения и цена холодного старта с прогревом и без него.
+
+База (файл SQLite) засевается один раз. Затем для каждого режима (WARMUP_ENABLED=false/true)
+--runs раз запускается отдельный процесс: он импортирует main, проходит lifespan и отправляет
+по одному запросу на каждый GET-эндпоинт (первое обращение), а потом ещё --repeat кругов
+(установившийся режим). Кэш ответов отключён. Отдельные процессы нужны, чтобы пул
+и кэш скомпилированных запросов каждый раз были пустыми.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup --rows 50000 --runs 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+DEFAULT_URL = "sqlite+aiosqlite:///./bench_startup.db"
+
+ROUTES = [
+    "/api/v2/tasks",
+    "/api/v2/tasks?include_archived=true",
+    "/api/v2/tasks/quadrant/Q1",
+    "/api/v2/tasks/status/pending",
+    "/api/v2/tasks/1",
+    "/api/v2/tasks/agenda",
+    "/api/v2/tasks/changes",
+    "/api/v2/stats",
+    "/api/v2/stats/history",
+    "/health",
+]
+
+
+async def child(repeat: int) -> Dict[str, Any]:
+    """Один холодный запуск: импорт, lifespan, первые запросы и установившийся режим"""
+    started = time.perf_counter()
+    import httpx
+    from main import app
+    from services.admission import admission_controller
+    from services.cache import response_cache
+    from services.warmup import startup_timings
+    import_ms = (time.perf_counter() - started) * 1000
+
+    response_cache.max_entries = 0
+    admission_controller.enabled = False
+    async with app.router.lifespan_context(app):
+        startup_ms = startup_timings["startup"] * 1000
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def timed(route: str) -> float:
+                begun = time.perf_counter()
+                response = await client.get(route)
+                response.raise_for_status()
+                return (time.perf_counter() - begun) * 1000
+
+            first = [await timed(route) for route in ROUTES]
+            steady = [await timed(route) for _ in range(repeat) for route in ROUTES]
+
+    return {
+        "import_ms": import_ms,
+        "startup_ms": startup_ms,
+        "warmup_ms": (startup_timings.get("connections", 0) + startup_timings.get("statements", 0)) * 1000,
+        "first": first,
+        "steady": steady,
+    }
+
+
+async def seed(url: str, rows: int) -> None:
+    os.environ["DATABASE_URL"] = url
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from benchmarks.load import prepare_database
+
+    engine = create_async_engine(url)
+    await prepare_database(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False), engine, rows)
+    await engine.dispose()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def main(args: argparse.Namespace) -> None:
+    print(f"🌱 Засеваем {args.rows} задач...")
+    asyncio.run(seed(args.database_url, args.rows))
+
+    print(f"{'прогрев':<8} {'импорт':>8} {'запуск':>8} {'прогрев':>8}   "
+          f"{'первые запросы p50/p99/max, мс':>32}   {'установившийся p50/p99, мс':>28}")
+    for warmup in ("false", "true"):
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--child", "--repeat", str(args.repeat)],
+                env={**os.environ, "DATABASE_URL": args.database_url, "WARMUP_ENABLED": warmup},
+                capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+        first = [ms for run in runs for ms in run["first"]]
+        steady = [ms for run in runs for ms in run["steady"]]
+
+        def mean(key: str) -> float:
+            return sum(run[key] for run in runs) / len(runs)
+
+        print(
+            f"{'да' if warmup == 'true' else 'нет':<8} {mean('import_ms'):>6.0f}мс {mean('startup_ms'):>6.0f}мс "
+            f"{mean('warmup_ms'):>6.0f}мс   "
+            f"{percentile(first, 0.5):>10.2f} {percentile(first, 0.99):>10.2f} {max(first):>10.2f}   "
+            f"{percentile(steady, 0.5):>13.2f} {percentile(steady, 0.99):>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_URL, help="база для прогона (пересоздаётся!)")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=3, help="холодных запусков на режим")
+    parser.add_argument("--repeat", type=int, default=20, help="кругов по эндпоинтам после первого")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.repeat))))
+    else:
+        main(args)
@@ -1,9 +1,16 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from typing import AsyncGenerator
+from fastapi import Request, Response
+from typing import AsyncGenerator, List, Tuple
 from uuid import uuid4
+import itertools
+import math
 import os
+import time
 from dotenv import load_dotenv
+from services.metrics import InstrumentedAsyncQueuePool, instrument_engine
 
 # Попытка импорта моделей
 try:
@@ -13,27 +20,138 @@ except ImportError:
         pass
 
 load_dotenv()
+# postgresql+asyncpg://... — рабочая база; sqlite+aiosqlite:// (в памяти) или
+# sqlite+aiosqlite:///./todo.db (файл) — локальный запуск, тесты и бенчмарки без сетевой базы
 DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise RuntimeError(
+        "Не задан DATABASE_URL. Укажите строку подключения в .env "
+        "(для локального запуска без PostgreSQL: DATABASE_URL=sqlite+aiosqlite://)"
+    )
 
-# ИСПРАВЛЕННАЯ КОНФИГУРАЦИЯ для работы с pgBouncer
-engine = create_async_engine(
-    DATABASE_URL,
-    # Используем стандартный пулинг вместо NullPool
-    pool_size=10,               # Количество постоянных соединений
-    max_overflow=5,             # Дополнительные соединения при нагрузке
-    pool_timeout=30,            # Таймаут ожидания соединения (секунды)
-    pool_recycle=1800,          # Переиспользовать соединения каждые 30 минут (1800 сек)
-    pool_pre_ping=True,         # ВАЖНО: Проверять соединение перед использованием
-    connect_args={
-        "statement_cache_size": 0,
-        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
-        "command_timeout": 60,   # Таймаут команды (секунды)
+# Профиль подключения:
+#   pgbouncer-transaction — через pgBouncer в режиме транзакций (по умолчанию): соединение
+#       с сервером меняется между транзакциями, поэтому подготовленные запросы не кэшируются;
+#   session — через пулер в режиме сессий: соединение закреплено за клиентом, кэш включён;
+#   direct — напрямую к PostgreSQL, кэш подготовленных запросов включён.
+DB_CONNECTION_PROFILE = os.getenv("DB_CONNECTION_PROFILE", "pgbouncer-transaction")
+CONNECTION_PROFILES = ("pgbouncer-transaction", "session", "direct")
+
+# Параметры пула и таймауты (значения по умолчанию — прежние жёстко заданные)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))                          # Постоянные соединения
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))                     # Дополнительные при нагрузке
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))                  # Ожидание соединения (секунды)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))                  # Пересоздавать соединения (секунды)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"   # Проверять соединение перед выдачей
+DB_POOL_MIN_CONNECTIONS = int(os.getenv("DB_POOL_MIN_CONNECTIONS", str(DB_POOL_SIZE)))  # Открыть при запуске
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))            # Таймаут команды (секунды)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))   # Кэш запросов (session/direct)
+
+# Создавать таблицы по моделям при запуске (init_db в lifespan). По умолчанию — только для SQLite:
+# схемой PostgreSQL управляют миграции
+DB_CREATE_SCHEMA = os.getenv(
+    "DB_CREATE_SCHEMA", "true" if make_url(DATABASE_URL).get_backend_name() == "sqlite" else "false"
+).lower() == "true"
+
+# Реплики для чтения: строки подключения через запятую (пусто — всё читается с основной базы)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Сколько секунд после записи клиент читает с основной базы (read-your-writes);
+# должно быть больше типичного отставания реплик
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+PRIMARY_STICKY_COOKIE = "read_primary_until"
+
+
+def connect_args_for_profile(profile: str) -> dict:
+    """Параметры asyncpg для профиля подключения"""
+    if profile not in CONNECTION_PROFILES:
+        raise ValueError(
+            f"Неизвестный DB_CONNECTION_PROFILE={profile!r}. Используйте: {', '.join(CONNECTION_PROFILES)}"
+        )
+
+    connect_args = {
+        "command_timeout": DB_COMMAND_TIMEOUT,
         "server_settings": {
             "jit": "off",        # Отключаем JIT для стабильности
         }
-    },
-    echo=False
-)
+    }
+
+    if profile == "pgbouncer-transaction":
+        # Подготовленный запрос может попасть на другое серверное соединение:
+        # отключаем кэш и даём каждому запросу уникальное имя
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        # Соединение закреплено за клиентом: запрос разбирается и планируется один раз
+        connect_args["statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+        connect_args["prepared_statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+
+    return connect_args
+
+
+def is_memory_sqlite(url: str) -> bool:
+    """sqlite+aiosqlite:// и sqlite+aiosqlite:///:memory: — база живёт, пока открыто соединение"""
+    database_name = make_url(url).database
+    return database_name in (None, "", ":memory:") or "mode=memory" in url
+
+
+def sqlite_engine_options(url: str) -> dict:
+    """
+    Параметры create_async_engine для aiosqlite. База в памяти существует, пока открыто её
+    единственное соединение: пул из одного соединения без пересоздания, сессии ждут его по очереди
+    (каждая видит свою транзакцию). Файл — обычный пул; писатели ждут друг друга до DB_COMMAND_TIMEOUT.
+    """
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "connect_args": {"timeout": DB_COMMAND_TIMEOUT},
+        "echo": False,
+    }
+    if is_memory_sqlite(url):
+        options.update(pool_size=1, max_overflow=0, pool_recycle=-1, pool_pre_ping=False)
+    return options
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # Читатели не ждут писателя (WAL); подключается только для файла, не для базы в памяти
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def engine_options(profile: str = DB_CONNECTION_PROFILE, url: str = DATABASE_URL) -> dict:
+    """Параметры create_async_engine для строки подключения и профиля (профиль — только для PostgreSQL)"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return sqlite_engine_options(url)
+    return {
+        # Используем стандартный пулинг вместо NullPool
+        # (очередь с замером ожидания соединения для /metrics)
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args_for_profile(profile),
+        "echo": False,
+    }
+
+
+def create_engine(url: str, name: str = "default", profile: str = DB_CONNECTION_PROFILE) -> AsyncEngine:
+    """
+    Движок для строки подключения: PostgreSQL (asyncpg) с профилем DB_CONNECTION_PROFILE
+    или SQLite (aiosqlite, в памяти или файл). Подключает замеры SQL и пула для /metrics.
+    """
+    new_engine = create_async_engine(url, **engine_options(profile, url))
+    if new_engine.dialect.name == "sqlite" and not is_memory_sqlite(url):
+        event.listen(new_engine.sync_engine, "connect", _sqlite_pragmas)
+    instrument_engine(new_engine, name)
+    return new_engine
+
+
+engine = create_engine(DATABASE_URL)
 
 # Фабрика сессий
 AsyncSessionLocal = async_sessionmaker(
@@ -43,12 +161,66 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+replica_engines = [
+    create_engine(url, f"replica-{number}") for number, url in enumerate(DATABASE_REPLICA_URLS, start=1)
+]
+
+
+class ReadRouter:
+    """
+    Выбор базы для чтения: реплики по кругу, основная база — если реплик нет
+    или клиент недавно что-то записал (cookie PRIMARY_STICKY_COOKIE).
+    """
+
+    def __init__(
+            self,
+            primary: async_sessionmaker,
+            replicas: List[async_sessionmaker],
+            sticky_seconds: float = READ_YOUR_WRITES_SECONDS
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self._next_replica = itertools.count()
+
+    def is_sticky(self, request: Request) -> bool:
+        try:
+            return float(request.cookies.get(PRIMARY_STICKY_COOKIE, "0")) > time.time()
+        except ValueError:
+            return False
+
+    def choose(self, request: Request) -> Tuple[async_sessionmaker, bool]:
+        """Возвращает (фабрику сессий, читаем ли с реплики)"""
+        if not self.replicas or self.is_sticky(request):
+            return self.primary, False
+        return self.replicas[next(self._next_replica) % len(self.replicas)], True
+
+    def remember_write(self, response: Response) -> None:
+        """Закрепляет клиента за основной базой на sticky_seconds после записи"""
+        if not self.replicas:
+            return
+        response.set_cookie(
+            PRIMARY_STICKY_COOKIE,
+            f"{time.time() + self.sticky_seconds:.3f}",
+            max_age=math.ceil(self.sticky_seconds),
+            httponly=True,
+            samesite="lax"
+        )
+
+
+read_router = ReadRouter(
+    AsyncSessionLocal,
+    [
+        async_sessionmaker(bind=replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        for replica_engine in replica_engines
+    ]
+)
+
 
 async def init_db():
     """
-    Создание таблиц в БД.
-    ВНИМАНИЕ: Из-за проблем с pgBouncer рекомендуется создавать таблицы
-    через Supabase SQL Editor вручную.
+    Создание таблиц в БД напрямую по моделям (локальная разработка, SQLite, тесты).
+    Вызывается при запуске, если DB_CREATE_SCHEMA; в рабочей базе схемой управляют миграции: alembic upgrade head
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -72,3 +244,31 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+def get_read_session_factory(request: Request) -> async_sessionmaker:
+    """
+    Dependency для потоковых ответов: фабрика сессий чтения (реплика или основная база).
+    Сессию открывает сам генератор ответа — он работает уже после выхода из эндпоинта.
+    """
+    session_factory, _ = read_router.choose(request)
+    return session_factory
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency для GET-эндпоинтов: сессия на реплике (если они настроены)
+    или на основной базе. Изменяющие эндпоинты используют get_async_session.
+    """
+    session_factory, from_replica = read_router.choose(request)
+    # Кэш ответов учитывает, что данные реплики могут отставать на READ_YOUR_WRITES_SECONDS
+    request.state.replica_lag = read_router.sticky_seconds if from_replica else 0.0
+
+    async with session_factory() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
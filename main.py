@@ -1,24 +1,90 @@
-from fastapi import FastAPI, Depends
+import time
+
+# Время импорта приложения (модули, модели, роутеры) — для отчёта о запуске
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from database import  get_async_session
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-from routers import tasks, stats
+from database import DB_CREATE_SCHEMA, AsyncSessionLocal, engine, init_db, read_router
+from routers import tasks, stats, batch, events
+from services.counters import refresh_counters
+from services.requadrant import requadrant_scheduler
+from services.admission import AdmissionMiddleware, admission_controller
+from services.archive import archive_scheduler
+from services.events import start_change_feed, stop_change_feed
+from services.write_coalescer import write_coalescer
+from services.metrics import RequestStats, current_request_stats, record_request, registry, route_label
+from services.warmup import WARMUP_ENABLED, health_prober, startup_timings, warm_up
+
+startup_timings["import"] = time.perf_counter() - IMPORT_STARTED
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
     # Код ДО yield выполняется при ЗАПУСКЕ
+    started = time.perf_counter()
     print("🚀 Запуск приложения...")
     print("📊 Инициализация базы данных...")
+    if DB_CREATE_SCHEMA:
+        # SQLite (в памяти или файл): таблицы по моделям, без миграций. Строку счётчиков
+        # собираем до первых запросов: иначе их изменения пропадут, пока её создаёт планировщик
+        await init_db()
+        async with AsyncSessionLocal() as db:
+            await refresh_counters(db)
+
+    # Прогрев: соединения пула открыты и проверены, SQL запросов роутеров уже скомпилирован
+    if WARMUP_ENABLED:
+        try:
+            report = await warm_up()
+            print(
+                f"🔥 Прогрев: {report['connections']} соединений за {report['connections_ms']:g} мс, "
+                f"{report['statements']} запросов за {report['statements_ms']:g} мс, "
+                f"{report['compiled']} изменяющих запросов скомпилировано без выполнения"
+            )
+        except Exception as exc:
+            print(f"⚠️ Прогрев не выполнен: {exc!r}")
+
+    # /health отдаёт результат фоновой проверки, а не открывает сессию на каждый вызов
+    await health_prober.start()
+    if health_prober.stats["running"]:
+        print(f"🩺 Проверка базы для /health каждые {health_prober.interval:g} с")
+
+    # Фоновый пересчёт срочности: задачи становятся срочными по мере приближения дедлайна
+    requadrant_scheduler.start()
+    print(f"⏱️ Пересчёт срочности каждые {requadrant_scheduler.interval:g} с")
 
-    print("✅ Приложение готово к работе!")
+    # Перенос давно завершённых задач в архив небольшими пакетами
+    archive_scheduler.start()
+    print(f"🗄️ Архивация завершённых задач старше {archive_scheduler.after_days:g} дн. каждые {archive_scheduler.interval:g} с")
+
+    # Лента изменений: на PostgreSQL события между воркерами идут через LISTEN/NOTIFY
+    feed_mode = await start_change_feed(engine.dialect.name)
+    print(f"📡 Лента изменений: {'LISTEN/NOTIFY' if feed_mode == 'postgres' else 'в пределах процесса'}")
+
+    if admission_controller.enabled:
+        limits = ", ".join(f"{name} {lane.limit}" for name, lane in admission_controller.lanes.items())
+        print(f"🚦 Контроль допуска: {limits} одновременных запросов")
+
+    if write_coalescer.enabled:
+        print(f"📦 Группировка записей: окно {write_coalescer.window * 1000:g} мс, до {write_coalescer.max_batch} операций")
+
+    startup_timings["startup"] = time.perf_counter() - started
+    print(
+        f"✅ Приложение готово к работе! (импорт {startup_timings['import'] * 1000:.0f} мс, "
+        f"запуск {startup_timings['startup'] * 1000:.0f} мс)"
+    )
 
     yield  # Здесь приложение работает
 
     # Код ПОСЛЕ yield выполняется при ОСТАНОВКЕ
     print("🛑 Остановка приложения...")
+    await requadrant_scheduler.stop()
+    await archive_scheduler.stop()
+    await write_coalescer.stop()
+    await health_prober.stop()
+    await stop_change_feed()
 
 
 app = FastAPI(
@@ -31,7 +97,46 @@ app = FastAPI(
     lifespan=lifespan  # Подключаем lifespan
 )
 
+# Контроль допуска подключается первым и оказывается внутри остальных middleware:
+# отклонённые запросы (503) попадают в метрики запросов
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+
+@app.middleware("http")
+async def collect_metrics(request: Request, call_next):
+    """Время обработки запроса и SQL-запросы за него (число, время, строки) для /metrics"""
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    started = time.perf_counter()
+    status_code = 500
+    too_many_queries = False
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        current_request_stats.reset(token)
+        too_many_queries = record_request(
+            request.method, route_label(request.scope), status_code, time.perf_counter() - started, stats
+        )
+
+    if too_many_queries:
+        response.headers["X-DB-Queries"] = str(stats.queries)
+    return response
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """После успешной записи клиент какое-то время читает с основной базы, а не с реплик"""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        read_router.remember_write(response)
+    return response
+
+
 # Подключение роутеров
+# batch и events подключаются раньше tasks: иначе их пути перехватят маршруты /tasks/{task_id}
+app.include_router(batch.router, prefix="/api/v2")
+app.include_router(events.router, prefix="/api/v2")
 app.include_router(tasks.router, prefix="/api/v2")
 app.include_router(stats.router, prefix="/api/v2")
 
@@ -42,27 +147,23 @@ async def read_root() -> dict:
     return {
         "message": "Task Manager API - Управление задачами по матрице Эйзенхауэра",
         "version": "2.0.0",
-        "database": "PostgreSQL (Supabase)",
+        "database": "PostgreSQL (Supabase)" if engine.dialect.name == "postgresql" else "SQLite",
         "docs": "/docs",
         "redoc": "/redoc",
     }
 
 
 @app.get("/health")
-async def health_check(
-        db: AsyncSession = Depends(get_async_session)
-) -> dict:
+async def health_check() -> dict:
     """
-    Проверка здоровья API и динамическая проверка подключения к БД.
+    Проверка здоровья API и подключения к БД.
+    Возвращает последний результат фоновой проверки (checked_at — когда она была);
+    с HEALTH_PROBE_INTERVAL_SECONDS=0 база проверяется на каждый вызов.
     """
-    try:
-        # Пытаемся выполнить простейший запрос к БД
-        await db.execute(text("SELECT 1"))
-        db_status = "connected"
-    except Exception:
-        db_status = "disconnected"
+    return await health_prober.result()
 
-    return {
-        "status": "healthy",
-        "database": db_status
-    }
\ No newline at end of file
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Метрики запросов, SQL и пула соединений в текстовом формате Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import sys
+
+# Для Windows: используем SelectorEventLoop вместо ProactorEventLoop
+if sys.platform == "win32":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+from database import AsyncSessionLocal, engine
+from services.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ArchiveScheduler
+from services.counters import reconcile_counters
+from services.history import backfill_daily_stats
+from services.query_plans import check_query_plans
+from services.task_import import IMPORT_CHUNK_ROWS, ImportReport, import_tasks
+
+
+async def reconcile_stats(args: argparse.Namespace) -> int:
+    """Пересчитать счётчики статистики с нуля и показать расхождения"""
+    async with AsyncSessionLocal() as db:
+        drift = await reconcile_counters(db, fix=not args.check)
+
+    if not drift:
+        print("✅ Счётчики статистики совпадают с таблицей задач")
+        return 0
+
+    print("⚠️ Найдены расхождения счётчиков:")
+    for key, values in drift.items():
+        print(f"   {key}: сохранено {values['stored']}, фактически {values['actual']}")
+
+    if args.check:
+        print("💡 Запустите без --check, чтобы исправить счётчики")
+        return 1
+
+    print("✅ Счётчики пересчитаны")
+    return 0
+
+
+async def explain_check(args: argparse.Namespace) -> int:
+    """Проверить по EXPLAIN, что запросы роутеров используют индексы"""
+    print(f"🔍 Засеваем {args.rows} задач во временной транзакции и проверяем планы запросов...")
+    async with AsyncSessionLocal() as db:
+        report = await check_query_plans(db, rows=args.rows)
+
+    failed = 0
+    for item in report:
+        mark = "✅" if item["uses_index"] else "❌"
+        failed += not item["uses_index"]
+        print(f"{mark} {item['query']}: {item['plan']}")
+
+    if failed:
+        print(f"\n❌ Без индекса: {failed} из {len(report)} запросов")
+        return 1
+
+    print("\n✅ Все запросы используют индексы")
+    return 0
+
+
+async def _read_file(path: str, block_size: int = 1 << 20):
+    with open(path, "rb") as file:
+        while block := file.read(block_size):
+            yield block
+
+
+async def import_tasks_file(args: argparse.Namespace) -> int:
+    """Импортировать задачи из файла NDJSON или CSV"""
+    import_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    print(f"📥 Импорт задач из {args.path} ({import_format}), по {args.chunk_rows} строк за транзакцию...")
+
+    def progress(report: ImportReport) -> None:
+        print(f"   записано {report.imported}, ошибок {report.failed}, {report.rows_per_second:.0f} строк/с")
+
+    async with AsyncSessionLocal() as db:
+        report = await import_tasks(db, _read_file(args.path), import_format, args.chunk_rows, progress)
+
+    for error in report.errors:
+        print(f"❌ строка {error['line']}: {error['error']}")
+    if report.failed > len(report.errors):
+        print(f"   ... и ещё {report.failed - len(report.errors)} ошибок")
+
+    print(
+        f"✅ Импортировано {report.imported} из {report.read} записей "
+        f"за {report.seconds:.1f} с ({report.rows_per_second:.0f} строк/с)"
+    )
+    return 1 if report.failed else 0
+
+
+async def archive_tasks(args: argparse.Namespace) -> int:
+    """Перенести завершённые задачи старше --older-than-days в архив, не дожидаясь фонового прохода"""
+    archiver = ArchiveScheduler(after_days=args.older_than_days, batch_size=args.batch_size, max_batches=args.max_batches)
+    print(f"🗄️ Перенос в архив задач, завершённых больше {args.older_than_days:g} дн. назад, по {args.batch_size}...")
+
+    moved = await archiver.tick()
+    stats = archiver.stats
+    print(f"✅ Перенесено {moved} задач за {stats['last_duration_ms'] / 1000:.1f} с, в очереди ещё {stats['backlog']}")
+    return 0
+
+
+async def backfill_stats(args: argparse.Namespace) -> int:
+    """Собрать дневные итоги истории статистики по существующим задачам"""
+    print("📈 Пересборка дневных итогов по задачам и архиву...")
+    async with AsyncSessionLocal() as db:
+        result = await backfill_daily_stats(db)
+
+    print(f"✅ Просмотрено задач: {result['tasks']}, записано дней: {result['days']}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Служебные команды ToDo List API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser(
+        "reconcile-stats",
+        help="пересчитать счётчики статистики и сообщить о расхождениях"
+    )
+    reconcile.add_argument(
+        "--check",
+        action="store_true",
+        help="только проверить, не исправляя (код выхода 1 при расхождениях)"
+    )
+    reconcile.set_defaults(handler=reconcile_stats)
+
+    backfill = commands.add_parser(
+        "backfill-stats",
+        help="пересобрать дневные итоги для /stats/history по существующим задачам"
+    )
+    backfill.set_defaults(handler=backfill_stats)
+
+    explain = commands.add_parser(
+        "explain-check",
+        help="проверить через EXPLAIN, что запросы роутеров идут по индексам"
+    )
+    explain.add_argument("--rows", type=int, default=20000, help="сколько задач засеять (изменения откатываются)")
+    explain.set_defaults(handler=explain_check)
+
+    importer = commands.add_parser(
+        "import-tasks",
+        help="массово импортировать задачи из NDJSON или CSV (COPY в PostgreSQL)"
+    )
+    importer.add_argument("path", help="файл с задачами в формате TaskCreate")
+    importer.add_argument(
+        "--format",
+        choices=["ndjson", "csv"],
+        help="формат файла (по умолчанию — по расширению, иначе ndjson)"
+    )
+    importer.add_argument("--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS, help="строк в одной транзакции")
+    importer.set_defaults(handler=import_tasks_file)
+
+    archive = commands.add_parser(
+        "archive-tasks",
+        help="перенести давно завершённые задачи в архив (tasks_archive)"
+    )
+    archive.add_argument(
+        "--older-than-days",
+        type=float,
+        default=ARCHIVE_AFTER_DAYS,
+        help="возраст завершения в днях (по умолчанию ARCHIVE_AFTER_DAYS)"
+    )
+    archive.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="задач в одной транзакции")
+    archive.add_argument("--max-batches", type=int, default=1000, help="сколько пакетов перенести за запуск")
+    archive.set_defaults(handler=archive_tasks)
+
+    return parser
+
+
+async def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return await args.handler(args)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,30 @@
+"""Полнотекстовый поиск: колонка search_vector и GIN-индекс (только PostgreSQL)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from services.search import SEARCH_DDL
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # На других базах поиск работает через InvertedIndex в памяти
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for statement in SEARCH_DDL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_tasks_search_vector")
+    op.execute("ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector")
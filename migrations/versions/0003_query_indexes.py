@@ -0,0 +1,46 @@
+"""Индексы под запросы роутеров
+
+- ix_tasks_created_at_id — GET /tasks (ORDER BY created_at, id)
+- ix_tasks_quadrant_created_at_id — GET /tasks/quadrant/{quadrant}
+- ix_tasks_completed_created_at_id — GET /tasks/status/{status}
+- ix_tasks_pending_deadline — просроченные задачи в статистике (WHERE completed IS false)
+- ix_tasks_not_urgent_deadline — фоновый пересчёт срочности (WHERE is_urgent IS false)
+
+Проверка планов запросов: python manage.py explain-check
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_tasks_created_at_id", "tasks", ["created_at", "id"])
+    op.create_index("ix_tasks_quadrant_created_at_id", "tasks", ["quadrant", "created_at", "id"])
+    op.create_index("ix_tasks_completed_created_at_id", "tasks", ["completed", "created_at", "id"])
+    op.create_index(
+        "ix_tasks_pending_deadline", "tasks", ["completed", "deadline_at"],
+        postgresql_where=sa.text("completed IS false"),
+        sqlite_where=sa.text("completed IS 0"),
+    )
+    op.create_index(
+        "ix_tasks_not_urgent_deadline", "tasks", ["deadline_at"],
+        postgresql_where=sa.text("is_urgent IS false"),
+        sqlite_where=sa.text("is_urgent IS 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_not_urgent_deadline", table_name="tasks")
+    op.drop_index("ix_tasks_pending_deadline", table_name="tasks")
+    op.drop_index("ix_tasks_completed_created_at_id", table_name="tasks")
+    op.drop_index("ix_tasks_quadrant_created_at_id", table_name="tasks")
+    op.drop_index("ix_tasks_created_at_id", table_name="tasks")
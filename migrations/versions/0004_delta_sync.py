@@ -0,0 +1,50 @@
+"""Дельта-синхронизация: tasks.updated_at и следы удалённых задач
+
+- tasks.updated_at — время последнего изменения (существующим строкам проставляется момент миграции)
+- ix_tasks_updated_at_id — GET /tasks/changes (ORDER BY updated_at, id)
+- task_tombstones — ID и время удаления задач
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite не добавляет колонку с неконстантным значением по умолчанию:
+        # добавляем с константой и проставляем текущее время отдельно
+        op.add_column(
+            "tasks",
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default="1970-01-01 00:00:00", nullable=False),
+        )
+        op.execute("UPDATE tasks SET updated_at = CURRENT_TIMESTAMP")
+    else:
+        op.add_column(
+            "tasks",
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+    op.create_index("ix_tasks_updated_at_id", "tasks", ["updated_at", "id"])
+
+    op.create_table(
+        "task_tombstones",
+        sa.Column("task_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("task_id"),
+    )
+    op.create_index("ix_task_tombstones_deleted_at_task_id", "task_tombstones", ["deleted_at", "task_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_tombstones_deleted_at_task_id", table_name="task_tombstones")
+    op.drop_table("task_tombstones")
+    op.drop_index("ix_tasks_updated_at_id", table_name="tasks")
+    op.drop_column("tasks", "updated_at")
@@ -0,0 +1,71 @@
+"""Архив завершённых задач
+
+- ix_tasks_completed_at — фоновый архиватор (WHERE completed IS true, по completed_at)
+- tasks_archive — перенесённые задачи (те же колонки и archived_at) с индексами под списки
+- task_archive_rollup — итоги по архиву для статистики
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_tasks_completed_at", "tasks", ["completed_at"],
+        postgresql_where=sa.text("completed IS true"),
+        sqlite_where=sa.text("completed IS 1"),
+    )
+
+    op.create_table(
+        "tasks_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("is_important", sa.Boolean(), nullable=False),
+        sa.Column("is_urgent", sa.Boolean(), nullable=False),
+        sa.Column("quadrant", sa.String(length=2), nullable=False),
+        sa.Column("completed", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("deadline_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tasks_archive_created_at_id", "tasks_archive", ["created_at", "id"])
+    op.create_index("ix_tasks_archive_quadrant_created_at_id", "tasks_archive", ["quadrant", "created_at", "id"])
+
+    op.create_table(
+        "task_archive_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("total_tasks", sa.Integer(), nullable=False),
+        sa.Column("q1", sa.Integer(), nullable=False),
+        sa.Column("q2", sa.Integer(), nullable=False),
+        sa.Column("q3", sa.Integer(), nullable=False),
+        sa.Column("q4", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO task_archive_rollup (id, total_tasks, q1, q2, q3, q4) VALUES (1, 0, 0, 0, 0, 0)")
+
+
+def downgrade() -> None:
+    # Архивные задачи возвращаются в рабочую таблицу, чтобы не потерять их вместе с архивом
+    columns = (
+        "id, title, description, is_important, is_urgent, quadrant, completed, "
+        "created_at, completed_at, updated_at, deadline_at"
+    )
+    op.execute(f"INSERT INTO tasks ({columns}) SELECT {columns} FROM tasks_archive")
+    op.drop_table("task_archive_rollup")
+    op.drop_index("ix_tasks_archive_quadrant_created_at_id", table_name="tasks_archive")
+    op.drop_index("ix_tasks_archive_created_at_id", table_name="tasks_archive")
+    op.drop_table("tasks_archive")
+    op.drop_index("ix_tasks_completed_at", table_name="tasks")
@@ -0,0 +1,36 @@
+"""Дневные итоги для истории статистики
+
+- task_daily_stats — созданные и завершённые задачи по квадрантам, время до завершения и просрочка на конец дня
+
+Заполнить по существующим задачам: python manage.py backfill-stats
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "task_daily_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        *[
+            sa.Column(f"{kind}_q{number}", sa.Integer(), server_default="0", nullable=False)
+            for kind in ("created", "completed") for number in range(1, 5)
+        ],
+        sa.Column("completion_seconds", sa.Float(), server_default="0", nullable=False),
+        sa.Column("overdue", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("task_daily_stats")
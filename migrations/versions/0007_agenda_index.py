@@ -0,0 +1,28 @@
+"""Индекс под повестку
+
+- ix_tasks_pending_agenda — GET /tasks/agenda (WHERE completed IS false, ORDER BY deadline_at, id по каждой важности)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_tasks_pending_agenda", "tasks", ["is_important", "deadline_at", "id"],
+        postgresql_where=sa.text("completed IS false"),
+        sqlite_where=sa.text("completed IS 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_pending_agenda", table_name="tasks")
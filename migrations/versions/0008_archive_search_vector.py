@@ -0,0 +1,32 @@
+"""Поиск по архиву: колонка search_vector и GIN-индекс в tasks_archive (только PostgreSQL)
+
+- GET /tasks/search?include_archived=true ищет в архиве так же, как в tasks (миграция 0002)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from services.search import ARCHIVE_SEARCH_DDL
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # На других базах поиск работает через InvertedIndex в памяти
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for statement in ARCHIVE_SEARCH_DDL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_tasks_archive_search_vector")
+    op.execute("ALTER TABLE tasks_archive DROP COLUMN IF EXISTS search_vector")
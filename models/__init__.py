@@ -1,4 +1,8 @@
 from models.tasks import Task
+from models.counters import TaskCounters
+from models.tombstones import TaskTombstone
+from models.archive import ArchivedTask, TaskArchiveRollup
+from models.daily_stats import TaskDailyStats
 from database import Base
 
-__all__ = ["Task", "Base"]
+__all__ = ["Task", "TaskCounters", "TaskTombstone", "ArchivedTask", "TaskArchiveRollup", "TaskDailyStats", "Base"]
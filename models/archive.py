@@ -0,0 +1,57 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index
+from database import Base
+
+
+class ArchivedTask(Base):
+    """
+    Завершённая задача, перенесённая из tasks фоновым архиватором (services/archive.py).
+    Колонки те же, что у Task, ID сохраняется; archived_at — момент переноса.
+    Рабочая таблица tasks остаётся маленькой, а архив читается только с include_archived=true.
+    """
+    __tablename__ = "tasks_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    title = Column(Text, nullable=False)
+    description = Column(Text, nullable=True)
+    is_important = Column(Boolean, nullable=False)
+    is_urgent = Column(Boolean, nullable=False)
+    quadrant = Column(String(2), nullable=False)
+    completed = Column(Boolean, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    deadline_at = Column(DateTime(timezone=True), nullable=True)
+
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Те же ключи сортировки, что у рабочей таблицы: списки с include_archived
+    # сливают две упорядоченные выборки (UNION ALL ... ORDER BY created_at, id)
+    __table_args__ = (
+        Index("ix_tasks_archive_created_at_id", "created_at", "id"),
+        Index("ix_tasks_archive_quadrant_created_at_id", "quadrant", "created_at", "id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<ArchivedTask(id={self.id}, title='{self.title}', archived_at={self.archived_at})>"
+
+
+class TaskArchiveRollup(Base):
+    """
+    Итоги по архиву (одна строка с id=1): сколько задач перенесено всего и по квадрантам.
+    Обновляется в транзакции переноса; статистика добавляет её к подсчёту по tasks,
+    поэтому пересчёт счётчиков не сканирует архив.
+    """
+    __tablename__ = "task_archive_rollup"
+
+    id = Column(Integer, primary_key=True)
+
+    total_tasks = Column(Integer, nullable=False, default=0)
+
+    q1 = Column(Integer, nullable=False, default=0)
+    q2 = Column(Integer, nullable=False, default=0)
+    q3 = Column(Integer, nullable=False, default=0)
+    q4 = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<TaskArchiveRollup(total={self.total_tasks})>"
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, DateTime
+from database import Base
+
+
+class TaskCounters(Base):
+    """
+    Счётчики статистики задач (одна строка с id=1).
+    Обновляются в той же транзакции, что и изменение задачи,
+    поэтому GET /stats читает одну строку вместо всей таблицы.
+    """
+    __tablename__ = "task_counters"
+
+    id = Column(Integer, primary_key=True)
+
+    total_tasks = Column(Integer, nullable=False, default=0)
+
+    q1 = Column(Integer, nullable=False, default=0)
+    q2 = Column(Integer, nullable=False, default=0)
+    q3 = Column(Integer, nullable=False, default=0)
+    q4 = Column(Integer, nullable=False, default=0)
+
+    completed = Column(Integer, nullable=False, default=0)
+    pending = Column(Integer, nullable=False, default=0)
+
+    # Незавершенные задачи с дедлайном раньше overdue_watermark.
+    # Задачи, просрочившиеся после отметки, досчитываются запросом по диапазону deadline_at.
+    overdue = Column(Integer, nullable=False, default=0)
+    overdue_watermark = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<TaskCounters(total={self.total_tasks}, overdue={self.overdue}, watermark={self.overdue_watermark})>"
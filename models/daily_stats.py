@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, Float, Date
+from database import Base
+
+
+class TaskDailyStats(Base):
+    """
+    Итоги одного дня (UTC) для GET /stats/history.
+    created_* и completed_* по квадрантам увеличиваются в транзакции изменения задачи
+    (вместе со счётчиками task_counters), overdue — снимок фонового планировщика.
+    Собрать строки по существующим задачам: python manage.py backfill-stats.
+    """
+    __tablename__ = "task_daily_stats"
+
+    day = Column(Date, primary_key=True)
+
+    created_q1 = Column(Integer, nullable=False, default=0, server_default="0")
+    created_q2 = Column(Integer, nullable=False, default=0, server_default="0")
+    created_q3 = Column(Integer, nullable=False, default=0, server_default="0")
+    created_q4 = Column(Integer, nullable=False, default=0, server_default="0")
+
+    completed_q1 = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_q2 = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_q3 = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_q4 = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Сумма времени от создания до завершения задач, завершённых в этот день (секунды)
+    completion_seconds = Column(Float, nullable=False, default=0, server_default="0")
+
+    # Незавершённые задачи с прошедшим дедлайном на конец дня (NULL — снимка не было)
+    overdue = Column(Integer, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<TaskDailyStats(day={self.day}, overdue={self.overdue})>"
@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from database import Base
 
 
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Task(Base):
     """Модель задачи для матрицы Эйзенхауэра"""
     __tablename__ = "tasks"
@@ -47,8 +53,12 @@ class Task(Base):
         default=False
     )
 
+    # Время ставит приложение (в UTC с микросекундами): CURRENT_TIMESTAMP SQLite хранит секунды
+    # в другом текстовом формате, и сравнения в keyset-пагинации расходятся.
+    # server_default — для строк, записанных мимо SQLAlchemy (COPY при импорте)
     created_at = Column(
         DateTime(timezone=True),
+        default=utc_now,
         server_default=func.now(),
         nullable=False
     )
@@ -58,12 +68,62 @@ class Task(Base):
         nullable=True
     )
 
+    # Меняется при каждом изменении задачи (в том числе UPDATE без ORM); по нему работает GET /tasks/changes.
+    # server_default — для строк, записанных мимо SQLAlchemy (COPY при импорте)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=utc_now,
+        onupdate=utc_now,
+        server_default=func.now(),
+        nullable=False
+    )
+
     # НОВОЕ ПОЛЕ: Дедлайн задачи
     deadline_at = Column(
         DateTime(timezone=True),
         nullable=True
     )
 
+    # Индексы под реальные запросы роутеров (создаются миграциями в migrations/versions)
+    __table_args__ = (
+        # GET /tasks: keyset-пагинация ORDER BY created_at, id
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        # GET /tasks/quadrant/{quadrant}
+        Index("ix_tasks_quadrant_created_at_id", "quadrant", "created_at", "id"),
+        # GET /tasks/status/{status}
+        Index("ix_tasks_completed_created_at_id", "completed", "created_at", "id"),
+        # GET /tasks/changes: изменения после токена, ORDER BY updated_at, id
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        # Просроченные задачи в статистике: незавершенные, по диапазону дедлайна
+        Index(
+            "ix_tasks_pending_deadline", "completed", "deadline_at",
+            postgresql_where=completed.is_(False),
+            sqlite_where=completed.is_(False)
+        ),
+        # Фоновый пересчёт срочности: несрочные задачи, по диапазону дедлайна
+        Index(
+            "ix_tasks_not_urgent_deadline", "deadline_at",
+            postgresql_where=is_urgent.is_(False),
+            sqlite_where=is_urgent.is_(False)
+        ),
+        # GET /tasks/agenda: незавершённые задачи по важности и дедлайну
+        Index(
+            "ix_tasks_pending_agenda", "is_important", "deadline_at", "id",
+            postgresql_where=completed.is_(False),
+            sqlite_where=completed.is_(False)
+        ),
+        # Фоновый архиватор: завершённые задачи, по давности завершения
+        Index(
+            "ix_tasks_completed_at", "completed_at",
+            postgresql_where=completed.is_(True),
+            sqlite_where=completed.is_(True)
+        ),
+        # SQLite без AUTOINCREMENT отдаёт новой задаче ID удалённой или перенесённой в архив,
+        # если та была последней: ID совпал бы со следом удаления (синхронизация) и с ключом архива.
+        # В PostgreSQL ID берутся из последовательности и не повторяются
+        {"sqlite_autoincrement": True},
+    )
+
     def __repr__(self) -> str:
         return f"<Task(id={self.id}, title='{self.title}', quadrant='{self.quadrant}', deadline={self.deadline_at})>"
 
@@ -78,5 +138,6 @@ class Task(Base):
             "completed": self.completed,
             "created_at": self.created_at,
             "completed_at": self.completed_at,
-            "deadline_at": self.deadline_at
+            "deadline_at": self.deadline_at,
+            "updated_at": self.updated_at
         }
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, Index
+from database import Base
+
+
+class TaskTombstone(Base):
+    """
+    След удалённой задачи: по нему GET /tasks/changes сообщает клиентам об удалении.
+    Старше SYNC_TOMBSTONE_RETENTION_DAYS удаляются фоновым планировщиком.
+    """
+    __tablename__ = "task_tombstones"
+
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+
+    deleted_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_task_tombstones_deleted_at_task_id", "deleted_at", "task_id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<TaskTombstone(task_id={self.task_id}, deleted_at={self.deleted_at})>"
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from schemas import BatchCreateRequest, BatchUpdateRequest, BatchIdsRequest, BatchResponse
+from database import get_async_session
+from services import task_batch
+
+router = APIRouter(
+    prefix="/tasks/batch",
+    tags=["batch"],
+    responses={409: {"description": "Atomic batch rejected, nothing was applied"}},
+)
+
+
+def _batch_response(response: Response, results: list, applied: bool, atomic: bool) -> BatchResponse:
+    """Собирает ответ; отклонённый атомарный пакет возвращается со статусом 409"""
+    if not applied:
+        response.status_code = status.HTTP_409_CONFLICT
+
+    applied_count = sum(1 for item in results if item["ok"])
+    return BatchResponse(
+        atomic=atomic,
+        applied=applied_count,
+        failed=len(results) - applied_count,
+        results=results
+    )
+
+
+@router.post("", response_model=BatchResponse)
+async def create_tasks_batch(
+        request: BatchCreateRequest,
+        response: Response,
+        db: AsyncSession = Depends(get_async_session)
+) -> BatchResponse:
+    """
+    Создать несколько задач за один запрос.
+    Срочность и квадрант вычисляются так же, как в POST /tasks.
+    """
+    results, applied = await task_batch.create_tasks(db, request.items, request.atomic)
+    return _batch_response(response, results, applied, request.atomic)
+
+
+@router.put("", response_model=BatchResponse)
+async def update_tasks_batch(
+        request: BatchUpdateRequest,
+        response: Response,
+        db: AsyncSession = Depends(get_async_session)
+) -> BatchResponse:
+    """Обновить несколько задач: каждый элемент содержит id и поля TaskUpdate"""
+    results, applied = await task_batch.update_tasks(db, request.items, request.atomic)
+    return _batch_response(response, results, applied, request.atomic)
+
+
+@router.patch("/complete", response_model=BatchResponse)
+async def complete_tasks_batch(
+        request: BatchIdsRequest,
+        response: Response,
+        db: AsyncSession = Depends(get_async_session)
+) -> BatchResponse:
+    """Отметить несколько задач как завершенные"""
+    results, applied = await task_batch.complete_tasks(db, request.ids, request.atomic)
+    return _batch_response(response, results, applied, request.atomic)
+
+
+@router.post("/delete", response_model=BatchResponse)
+async def delete_tasks_batch(
+        request: BatchIdsRequest,
+        response: Response,
+        db: AsyncSession = Depends(get_async_session)
+) -> BatchResponse:
+    """Удалить несколько задач"""
+    results, applied = await task_batch.delete_tasks(db, request.ids, request.atomic)
+    return _batch_response(response, results, applied, request.atomic)
@@ -0,0 +1,71 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from services.events import (
+    CHANGE_FEED_HEARTBEAT_SECONDS,
+    Subscription,
+    TaskEvent,
+    change_broker,
+    format_sse,
+)
+
+router = APIRouter(
+    prefix="/tasks/events",
+    tags=["events"],
+)
+
+# Клиент должен перечитать списки: запрошенного Last-Event-ID уже нет в истории
+RESET_EVENT = b"event: reset\ndata: {}\n\n"
+
+
+async def _event_stream(
+        request: Request,
+        subscription: Subscription,
+        replay: Optional[list[TaskEvent]]
+) -> AsyncIterator[bytes]:
+    try:
+        yield b"retry: 3000\n\n"
+        if replay is None:
+            yield RESET_EVENT
+        else:
+            for item in replay:
+                yield format_sse(item)
+
+        while True:
+            if subscription.overflowed and subscription.queue.empty():
+                # Клиент не успевал читать: закрываем поток, EventSource переподключится с Last-Event-ID
+                return
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), CHANGE_FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield b": ping\n\n"
+                continue
+            yield format_sse(item)
+    finally:
+        change_broker.unsubscribe(subscription)
+
+
+@router.get("", response_class=StreamingResponse)
+async def task_events(
+        request: Request,
+        last_event_id: Optional[str] = Query(None, description="ID последнего полученного события"),
+        last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+) -> StreamingResponse:
+    """
+    Лента изменений задач (Server-Sent Events) вместо опроса списков.
+
+    События: created, updated, completed, deleted (в data — событие с задачей) и imported
+    (массовый импорт — перечитайте списки). После переподключения с Last-Event-ID
+    пропущенные события досылаются из истории; если их там уже нет, приходит событие reset.
+    """
+    subscription, replay = change_broker.subscribe(last_event_id_header or last_event_id)
+    return StreamingResponse(
+        _event_stream(request, subscription, replay),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from models import Task
-from database import get_async_session
-from datetime import datetime, timezone
+from database import get_read_session
+from services.cache import cached_response, response_cache
+from services.counters import read_counters
+from services.history import stats_history, validate_history_range
+from services.requadrant import requadrant_scheduler
+from services.archive import archive_scheduler
+from services.warmup import health_prober
 
 router = APIRouter(
     prefix="/stats",
@@ -13,46 +18,55 @@ router = APIRouter(
 
 @router.get("", response_model=dict)
 async def get_tasks_stats(
-        db: AsyncSession = Depends(get_async_session)
+        request: Request,
+        db: AsyncSession = Depends(get_read_session)
 ) -> dict:
     """
     Получить статистику задач.
-    НОВОЕ: Добавлен подсчет просроченных задач (overdue_tasks).
+    Значения берутся из таблицы счётчиков task_counters, которую обновляют
+    эндпоинты изменения задач, поэтому запрос не сканирует таблицу tasks.
+    Запрос только читает и может выполняться на реплике.
+    Ответ кэшируется; число просроченных задач может отставать не больше чем на TTL кэша.
     """
-    result = await db.execute(select(Task))
-    tasks = result.scalars().all()
-
-    total_tasks = len(tasks)
+    return await cached_response(request, dict, {"stats"}, lambda: read_counters(db))
 
-    by_quadrant = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
-    by_status = {"completed": 0, "pending": 0}
-    overdue_tasks = 0  # НОВОЕ: количество просроченных задач
 
-    now = datetime.now(timezone.utc)
-
-    for task in tasks:
-        # Подсчет по квадрантам
-        if task.quadrant in by_quadrant:
-            by_quadrant[task.quadrant] += 1
+@router.get("/history", response_model=dict)
+async def get_tasks_stats_history(
+        request: Request,
+        date_from: date | None = Query(None, alias="from", description="Первый день (YYYY-MM-DD), по умолчанию 30 дней назад"),
+        date_to: date | None = Query(None, alias="to", description="Последний день (YYYY-MM-DD), по умолчанию сегодня"),
+        granularity: str = Query("day", description="Детализация: day, week или month"),
+        db: AsyncSession = Depends(get_read_session)
+) -> dict:
+    """
+    Тренды по задачам: созданные и завершённые за период (всего и по квадрантам),
+    среднее время от создания до завершения и число просроченных задач на конец периода.
+    Значения читаются из дневных итогов task_daily_stats, а не считаются по таблице задач.
+    """
+    date_from, date_to = validate_history_range(date_from, date_to, granularity)
+    return await cached_response(
+        request, dict, {"stats"},
+        lambda: stats_history(db, date_from, date_to, granularity)
+    )
 
-        # Подсчет по статусу
-        if task.completed:
-            by_status["completed"] += 1
-        else:
-            by_status["pending"] += 1
 
-            # НОВОЕ: Проверка на просроченные задачи
-            if task.deadline_at:
-                deadline = task.deadline_at
-                if deadline.tzinfo is None:
-                    deadline = deadline.replace(tzinfo=timezone.utc)
+@router.get("/jobs", response_model=dict)
+async def get_jobs_stats() -> dict:
+    """Состояние фоновых задач: период, число проходов и затронутых строк"""
+    return {
+        "requadrant": requadrant_scheduler.stats,
+        "archive": archive_scheduler.stats,
+        "health_probe": health_prober.stats
+    }
 
-                if deadline < now:
-                    overdue_tasks += 1
 
+@router.get("/cache", response_model=dict)
+async def get_cache_stats() -> dict:
+    """Состояние кэша ответов: попадания, промахи, вытеснения и размер"""
     return {
-        "total_tasks": total_tasks,
-        "by_quadrant": by_quadrant,
-        "by_status": by_status,
-        "overdue_tasks": overdue_tasks  # НОВОЕ
+        **response_cache.stats,
+        "size": len(response_cache),
+        "max_entries": response_cache.max_entries,
+        "ttl_seconds": response_cache.ttl
     }
@@ -1,13 +1,30 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List
-from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from models import Task
-from schemas import TaskCreate, TaskUpdate, TaskResponse
-from database import get_async_session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from models import ArchivedTask, Task
+from schemas import TaskCreate, TaskUpdate, TaskResponse, TaskPage, TaskAgenda, TaskChanges, ImportResponse
+from database import get_async_session, get_read_session, get_read_session_factory
+from services.pagination import paginate_tasks, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.agenda import AGENDA_DEFAULT_LIMIT, AGENDA_MAX_LIMIT, agenda_tasks
+from services.counters import apply_counter_changes, row_state, task_state
+from services.urgency import calculate_urgency, calculate_quadrant
+from services.task_writes import (
+    complete_task_returning,
+    delete_task_returning,
+    task_update_values,
+    update_task_returning
+)
+from services.search import search_tasks_page, index_task, unindex_task
+from services.cache import cached_response, invalidate_tasks
+from services.serialization import render_task_page
+from services.export import EXPORT_FORMATS, export_query, stream_export
+from services.task_import import IMPORT_FORMATS, import_tasks
+from services.events import publish_task_events, task_event
+from services.sync import SYNC_SETTLE_SECONDS, changes_page, record_tombstones
+from services.write_coalescer import write_coalescer
 
 router = APIRouter(
     prefix="/tasks",
@@ -16,61 +33,33 @@ router = APIRouter(
 )
 
 
-def calculate_urgency(deadline_at: datetime | None) -> bool:
-    """
-    Определяет срочность задачи на основе дедлайна.
-    Возвращает True если дедлайн меньше 3 дней от текущего момента.
-
-    Args:
-        deadline_at: Дедлайн задачи (с timezone или без)
-
-    Returns:
-        bool: True если срочно (< 3 дней), False в остальных случаях
-    """
-    if deadline_at is None:
-        return False
-
-    # Получаем текущее время с timezone
-    now = datetime.now(timezone.utc)
-
-    # Если deadline без timezone, добавляем UTC
-    if deadline_at.tzinfo is None:
-        deadline_at = deadline_at.replace(tzinfo=timezone.utc)
-
-    # Разница между дедлайном и текущим временем
-    time_until_deadline = deadline_at - now
-
-    # Срочно если осталось меньше 3 дней
-    return time_until_deadline < timedelta(days=3)
-
-
-def calculate_quadrant(is_important: bool, is_urgent: bool) -> str:
-    """Определяет квадрант по матрице Эйзенхауэра"""
-    if is_important and is_urgent:
-        return "Q1"
-    elif is_important and not is_urgent:
-        return "Q2"
-    elif not is_important and is_urgent:
-        return "Q3"
-    else:
-        return "Q4"
-
-
-@router.get("", response_model=List[TaskResponse])
+@router.get("", response_model=TaskPage)
 async def get_all_tasks(
-        db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
-    """Получить все задачи"""
-    result = await db.execute(select(Task))
-    tasks = result.scalars().all()
-    return tasks
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+        after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+        fields: str | None = Query(None, description="Список полей через запятую, например id,title"),
+        include_archived: bool = Query(False, description="Добавить завершённые задачи из архива (только для чтения)"),
+        db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
+    """Получить все задачи (постранично, в порядке создания)"""
+    return await cached_response(
+        request, TaskPage, {"tasks"},
+        lambda: paginate_tasks(db, limit=limit, after=after, fields=fields, include_archived=include_archived),
+        render=render_task_page
+    )
 
 
-@router.get("/quadrant/{quadrant}", response_model=List[TaskResponse])
+@router.get("/quadrant/{quadrant}", response_model=TaskPage)
 async def get_tasks_by_quadrant(
         quadrant: str,
-        db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+        after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+        fields: str | None = Query(None, description="Список полей через запятую, например id,title"),
+        include_archived: bool = Query(False, description="Добавить завершённые задачи из архива (только для чтения)"),
+        db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
     """Получить задачи по квадранту (Q1, Q2, Q3, Q4)"""
     if quadrant not in ["Q1", "Q2", "Q3", "Q4"]:
         raise HTTPException(
@@ -78,43 +67,74 @@ async def get_tasks_by_quadrant(
             detail="Неверный квадрант. Используйте: Q1, Q2, Q3, Q4"
         )
 
-    result = await db.execute(
-        select(Task).where(Task.quadrant == quadrant)
+    return await cached_response(
+        request, TaskPage, {f"tasks:quadrant:{quadrant}"},
+        lambda: paginate_tasks(
+            db,
+            Task.quadrant == quadrant,
+            limit=limit, after=after, fields=fields, include_archived=include_archived
+        ),
+        render=render_task_page
     )
-    tasks = result.scalars().all()
-    return tasks
 
 
-@router.get("/search", response_model=List[TaskResponse])
+@router.get("/search", response_model=TaskPage)
 async def search_tasks(
         q: str = Query(..., min_length=2, description="Поисковый запрос"),
-        db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
-    """Поиск задач по названию или описанию"""
-    keyword = f"%{q.lower()}%"
-
-    result = await db.execute(
-        select(Task).where(
-            (Task.title.ilike(keyword)) |
-            (Task.description.ilike(keyword))
-        )
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+        after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+        fields: str | None = Query(None, description="Список полей через запятую, например id,title"),
+        include_archived: bool = Query(False, description="Искать и среди задач в архиве (только для чтения)"),
+        db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
+    """
+    Полнотекстовый поиск задач по названию и описанию.
+    Слова ищутся по префиксу, результаты отсортированы по релевантности,
+    у каждой задачи есть поле score.
+    """
+    page = await search_tasks_page(
+        db, q, limit=limit, after=after, fields=fields, include_archived=include_archived
     )
-    tasks = result.scalars().all()
 
-    if not tasks:
+    if not page["items"] and after is None:
         raise HTTPException(
             status_code=404,
             detail="По данному запросу ничего не найдено"
         )
 
-    return tasks
+    return page
+
+
+@router.get("/agenda", response_model=TaskAgenda)
+async def get_agenda(
+        request: Request,
+        limit: int = Query(AGENDA_DEFAULT_LIMIT, ge=1, le=AGENDA_MAX_LIMIT, description="Сколько задач вернуть"),
+        db: AsyncSession = Depends(get_read_session)
+) -> TaskAgenda:
+    """
+    Что делать дальше: первые limit незавершённых задач по приоритету —
+    Q1, затем Q2, Q3 и Q4, внутри квадранта по ближайшему дедлайну.
+    Квадрант считается по важности и дедлайну относительно текущего момента
+    (поле current_quadrant), а не по сохранённому флагу срочности.
+    Ответ кэшируется, поэтому граница срочности может сдвигаться с опозданием до TTL кэша.
+    """
+    return await cached_response(
+        request, TaskAgenda, {"tasks"},
+        lambda: agenda_tasks(db, limit),
+        render=render_task_page
+    )
 
 
-@router.get("/status/{status}", response_model=List[TaskResponse])
+@router.get("/status/{status}", response_model=TaskPage)
 async def get_tasks_by_status(
         status: str,
-        db: AsyncSession = Depends(get_async_session)
-) -> List[TaskResponse]:
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+        after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+        fields: str | None = Query(None, description="Список полей через запятую, например id,title"),
+        include_archived: bool = Query(False, description="Добавить завершённые задачи из архива (только для чтения)"),
+        db: AsyncSession = Depends(get_read_session)
+) -> TaskPage:
     """Получить задачи по статусу (completed/pending)"""
     if status not in ["completed", "pending"]:
         raise HTTPException(
@@ -124,28 +144,132 @@ async def get_tasks_by_status(
 
     is_completed = (status == "completed")
 
-    result = await db.execute(
-        select(Task).where(Task.completed == is_completed)
+    return await cached_response(
+        request, TaskPage, {f"tasks:status:{status}"},
+        lambda: paginate_tasks(
+            db,
+            Task.completed == is_completed,
+            limit=limit, after=after, fields=fields,
+            # В архиве только завершённые задачи
+            include_archived=include_archived and is_completed
+        ),
+        render=render_task_page
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_tasks(
+        format: str = Query("ndjson", description="Формат выгрузки: ndjson или csv"),
+        quadrant: str | None = Query(None, description="Только задачи квадранта (Q1, Q2, Q3, Q4)"),
+        status: str | None = Query(None, description="Только задачи со статусом (completed/pending)"),
+        include_archived: bool = Query(False, description="Добавить завершённые задачи из архива (только для чтения)"),
+        session_factory: async_sessionmaker = Depends(get_read_session_factory)
+) -> StreamingResponse:
+    """
+    Выгрузить задачи потоком в NDJSON (по объекту на строку) или CSV.
+    Строки читаются серверным курсором и отправляются кусками,
+    поэтому память воркера не зависит от размера таблицы.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail="Недопустимый формат. Используйте: ndjson или csv"
+        )
+
+    conditions = []
+    if quadrant is not None:
+        if quadrant not in ["Q1", "Q2", "Q3", "Q4"]:
+            raise HTTPException(
+                status_code=400,
+                detail="Неверный квадрант. Используйте: Q1, Q2, Q3, Q4"
+            )
+        conditions.append(Task.quadrant == quadrant)
+
+    if status is not None:
+        if status not in ["completed", "pending"]:
+            raise HTTPException(
+                status_code=400,
+                detail="Недопустимый статус. Используйте: completed или pending"
+            )
+        conditions.append(Task.completed == (status == "completed"))
+        # В архиве только завершённые задачи
+        include_archived = include_archived and status == "completed"
+
+    media_type, filename = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(session_factory, export_query(*conditions, include_archived=include_archived), format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
-    tasks = result.scalars().all()
-    return tasks
+
+
+@router.get("/changes", response_model=TaskChanges)
+async def get_task_changes(
+        request: Request,
+        since: str | None = Query(None, description="next_token из предыдущего ответа (без него — все задачи)"),
+        limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Сколько изменений вернуть"),
+        db: AsyncSession = Depends(get_read_session)
+) -> dict:
+    """
+    Дельта-синхронизация: задачи, созданные или изменённые после токена since, и ID удалённых.
+    Клиент сначала применяет удаления, затем сохраняет задачи по ID, и повторяет запрос
+    с next_token, пока has_more=True. Устаревший токен — ответ 410 (нужна полная синхронизация).
+    """
+    # Реплика может отставать: токен отодвигается ещё и на её возможное отставание
+    settle_seconds = SYNC_SETTLE_SECONDS + getattr(request.state, "replica_lag", 0.0)
+    return await changes_page(db, since, limit, settle_seconds)
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_tasks_stream(
+        request: Request,
+        format: str = Query("ndjson", description="Формат тела запроса: ndjson или csv"),
+        db: AsyncSession = Depends(get_async_session)
+) -> dict:
+    """
+    Массовый импорт задач из тела запроса (NDJSON или CSV с заголовком).
+    Тело читается потоком и записывается кусками; строки с ошибками пропускаются
+    и перечисляются в ответе. Срочность и квадрант вычисляются как в POST /tasks.
+    """
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail="Недопустимый формат. Используйте: ndjson или csv"
+        )
+
+    report = await import_tasks(db, request.stream(), format)
+    return report.as_dict()
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task_by_id(
         task_id: int,
-        db: AsyncSession = Depends(get_async_session)
+        request: Request,
+        include_archived: bool = Query(False, description="Искать задачу и в архиве (только для чтения)"),
+        db: AsyncSession = Depends(get_read_session)
 ) -> TaskResponse:
-    """Получить задачу по ID"""
-    result = await db.execute(
-        select(Task).where(Task.id == task_id)
-    )
-    task = result.scalar_one_or_none()
+    """
+    Получить задачу по ID (с include_archived — и перенесённую в архив).
+    Задача из архива только для чтения: PUT, PATCH и DELETE для неё отвечают 404.
+    """
+    async def load_task() -> Task | ArchivedTask:
+        result = await db.execute(
+            select(Task).where(Task.id == task_id)
+        )
+        task = result.scalar_one_or_none()
 
-    if not task:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+        if not task and include_archived:
+            result = await db.execute(
+                select(ArchivedTask).where(ArchivedTask.id == task_id)
+            )
+            task = result.scalar_one_or_none()
 
-    return task
+        if not task:
+            raise HTTPException(status_code=404, detail="Задача не найдена")
+
+        return task
+
+    return await cached_response(request, TaskResponse, {f"task:{task_id}"}, load_task)
 
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
@@ -158,7 +282,11 @@ async def create_task(
     Срочность (is_urgent) определяется автоматически на основе deadline_at:
     - Если дедлайн < 3 дней → срочно
     - Если дедлайн >= 3 дней или не указан → не срочно
+    С WRITE_COALESCE_ENABLED задача записывается общим пакетом с другими запросами.
     """
+    if write_coalescer.enabled:
+        return await write_coalescer.create(task)
+
     # НОВОЕ: Автоматически определяем срочность из deadline_at
     is_urgent = calculate_urgency(task.deadline_at)
 
@@ -176,8 +304,13 @@ async def create_task(
     )
 
     db.add(new_task)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_task)
+    await apply_counter_changes(db, [(None, task_state(new_task))])
+    await publish_task_events(db, [task_event("created", new_task.to_dict())])
+    await db.commit()
+    index_task(new_task.id, new_task.title, new_task.description)
+    invalidate_tasks([(new_task.id, None, task_state(new_task))])
 
     return new_task
 
@@ -191,32 +324,23 @@ async def update_task(
     """
     Обновить задачу.
     При изменении deadline_at срочность пересчитывается автоматически.
+    Задача меняется одним UPDATE ... RETURNING, квадрант считается в самом запросе.
+    Задачи из архива только для чтения: для них ответ 404.
     """
-    result = await db.execute(
-        select(Task).where(Task.id == task_id)
-    )
-    task = result.scalar_one_or_none()
-
-    if not task:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
-
     # Получаем только те поля, которые были переданы
     update_data = task_update.model_dump(exclude_unset=True)
 
-    # Обновляем поля
-    for field, value in update_data.items():
-        setattr(task, field, value)
-
-    # НОВОЕ: Пересчитываем срочность если изменился deadline_at
-    if "deadline_at" in update_data:
-        task.is_urgent = calculate_urgency(task.deadline_at)
-
-    # Пересчитываем квадрант если изменились важность или срочность
-    if "is_important" in update_data or "deadline_at" in update_data:
-        task.quadrant = calculate_quadrant(task.is_important, task.is_urgent)
+    updated = await update_task_returning(db, task_id, task_update_values(update_data))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
 
+    task, before = updated
+    after = row_state(task)
+    await apply_counter_changes(db, [(before, after)])
+    await publish_task_events(db, [task_event("updated", task)])
     await db.commit()
-    await db.refresh(task)
+    index_task(task["id"], task["title"], task["description"])
+    invalidate_tasks([(task["id"], before, after)])
 
     return task
 
@@ -226,20 +350,23 @@ async def complete_task(
         task_id: int,
         db: AsyncSession = Depends(get_async_session)
 ) -> TaskResponse:
-    """Отметить задачу как завершенную"""
-    result = await db.execute(
-        select(Task).where(Task.id == task_id)
-    )
-    task = result.scalar_one_or_none()
+    """
+    Отметить задачу как завершенную.
+    Задачи из архива уже завершены и только для чтения: для них ответ 404.
+    """
+    if write_coalescer.enabled:
+        return await write_coalescer.complete(task_id)
 
-    if not task:
+    completed = await complete_task_returning(db, task_id)
+    if completed is None:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
-    task.completed = True
-    task.completed_at = datetime.now(timezone.utc)
-
+    task, before = completed
+    after = row_state(task)
+    await apply_counter_changes(db, [(before, after)])
+    await publish_task_events(db, [task_event("completed", task)])
     await db.commit()
-    await db.refresh(task)
+    invalidate_tasks([(task["id"], before, after)])
 
     return task
 
@@ -249,25 +376,24 @@ async def delete_task(
         task_id: int,
         db: AsyncSession = Depends(get_async_session)
 ) -> dict:
-    """Удалить задачу"""
-    result = await db.execute(
-        select(Task).where(Task.id == task_id)
-    )
-    task = result.scalar_one_or_none()
-
-    if not task:
+    """
+    Удалить задачу.
+    Задачи из архива только для чтения: для них ответ 404.
+    """
+    deleted = await delete_task_returning(db, task_id)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
-    deleted_task_info = {
-        "id": task.id,
-        "title": task.title
-    }
-
-    await db.delete(task)
+    before = row_state(deleted)
+    await record_tombstones(db, [deleted["id"]])
+    await apply_counter_changes(db, [(before, None)])
+    await publish_task_events(db, [task_event("deleted", task_id=deleted["id"])])
     await db.commit()
+    unindex_task(deleted["id"])
+    invalidate_tasks([(deleted["id"], before, None)])
 
     return {
         "message": "Задача успешно удалена",
-        "id": deleted_task_info["id"],
-        "title": deleted_task_info["title"]
+        "id": deleted["id"],
+        "title": deleted["title"]
     }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class TaskBase(BaseModel):
@@ -27,13 +27,96 @@ class TaskUpdate(BaseModel):
 
 
 class TaskResponse(TaskBase):
-    """Схема для ответа (что возвращает API)"""
+    """
+    Схема для ответа (что возвращает API).
+    Задачи из архива (include_archived=true) возвращаются в той же схеме, но только для чтения:
+    PUT, PATCH и DELETE для них отвечают 404.
+    """
     id: int = Field(..., description="ID задачи", examples=[1])
     is_urgent: bool = Field(..., description="Срочная задача? (вычисляется автоматически)")
     quadrant: str = Field(..., description="Квадрант: Q1, Q2, Q3, Q4", examples=["Q1"])
     completed: bool = Field(default=False, description="Задача завершена?")
     created_at: datetime = Field(..., description="Дата создания")
     completed_at: Optional[datetime] = Field(None, description="Дата завершения")
+    updated_at: datetime = Field(..., description="Дата последнего изменения")
 
     class Config:
         from_attributes = True  # Для работы с SQLAlchemy моделями
+
+
+class TaskPage(BaseModel):
+    """Страница списка задач (keyset-пагинация)"""
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        description="Задачи: все поля TaskResponse или только запрошенные в fields "
+                    "(задачи из архива с include_archived — только для чтения)"
+    )
+    next_cursor: Optional[str] = Field(None, description="Курсор для параметра after (None — это последняя страница)")
+
+
+class TaskAgenda(BaseModel):
+    """Повестка: первые незавершённые задачи по приоритету"""
+    items: List[Dict[str, Any]] = Field(..., description="Задачи (все поля TaskResponse и current_quadrant) в порядке приоритета")
+
+
+class TaskChanges(BaseModel):
+    """Изменения задач после токена синхронизации"""
+    tasks: List[Dict[str, Any]] = Field(..., description="Созданные и изменённые задачи (все поля TaskResponse)")
+    deleted: List[int] = Field(..., description="ID удалённых задач")
+    next_token: str = Field(..., description="Токен для следующего запроса (параметр since)")
+    has_more: bool = Field(..., description="Есть ещё изменения: сразу запросите следующую страницу с next_token")
+
+
+# Максимальное число элементов в одном пакетном запросе
+MAX_BATCH_SIZE = 500
+
+
+class BatchCreateRequest(BaseModel):
+    """Пакетное создание задач"""
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE, description="Задачи в формате TaskCreate")
+    atomic: bool = Field(True, description="True — всё или ничего, False — применить корректные элементы")
+
+
+class BatchUpdateRequest(BaseModel):
+    """Пакетное обновление задач"""
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE, description="Поля TaskUpdate и обязательный id")
+    atomic: bool = Field(True, description="True — всё или ничего, False — применить корректные элементы")
+
+
+class BatchIdsRequest(BaseModel):
+    """Пакетное завершение или удаление задач по ID"""
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE, description="ID задач")
+    atomic: bool = Field(True, description="True — всё или ничего, False — применить корректные элементы")
+
+
+class BatchItemResult(BaseModel):
+    """Результат обработки одного элемента пакета"""
+    index: int = Field(..., description="Позиция элемента в запросе")
+    ok: bool = Field(..., description="Изменение применено?")
+    id: Optional[int] = Field(None, description="ID задачи")
+    task: Optional[TaskResponse] = Field(None, description="Задача после изменения")
+    error: Optional[str] = Field(None, description="Причина ошибки")
+
+
+class BatchResponse(BaseModel):
+    """Ответ пакетного эндпоинта"""
+    atomic: bool
+    applied: int = Field(..., description="Сколько элементов применено")
+    failed: int = Field(..., description="Сколько элементов не применено")
+    results: List[BatchItemResult]
+
+
+class ImportRowError(BaseModel):
+    """Строка входных данных, не прошедшая разбор или валидацию"""
+    line: int = Field(..., description="Номер строки во входных данных (для CSV — первая строка записи)")
+    error: str = Field(..., description="Причина ошибки")
+
+
+class ImportResponse(BaseModel):
+    """Итог импорта задач"""
+    read: int = Field(..., description="Сколько записей прочитано")
+    imported: int = Field(..., description="Сколько задач записано")
+    failed: int = Field(..., description="Сколько записей пропущено из-за ошибок")
+    errors: List[ImportRowError] = Field(..., description="Первые ошибки (не больше IMPORT_MAX_ERRORS)")
+    seconds: float = Field(..., description="Длительность импорта")
+    rows_per_second: float = Field(..., description="Скорость записи, строк в секунду")
@@ -0,0 +1,208 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+from database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from services.metrics import Counter, Gauge, Histogram, registry
+
+# Соединений в пуле на воркер: столько запросов к базе могут идти одновременно, не ожидая pool_timeout
+POOL_CAPACITY = DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+# Контроль допуска: лишние запросы сразу получают 503, а не ждут соединение до DB_POOL_TIMEOUT
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Место для /health: проверка жива, даже когда чтения и записи упёрлись в лимит
+ADMISSION_HEALTH_LIMIT = int(os.getenv("ADMISSION_HEALTH_LIMIT", "1"))
+# Одновременных изменяющих запросов на воркер (по умолчанию треть пула)
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", str(max(POOL_CAPACITY // 3, 1))))
+# Одновременных чтений на воркер (по умолчанию остаток пула; с репликами можно поднять)
+ADMISSION_READ_LIMIT = int(os.getenv(
+    "ADMISSION_READ_LIMIT", str(max(POOL_CAPACITY - ADMISSION_WRITE_LIMIT - ADMISSION_HEALTH_LIMIT, 1))
+))
+# Сколько запросов может ждать в очереди полосы на одно место в ней
+ADMISSION_QUEUE_PER_SLOT = float(os.getenv("ADMISSION_QUEUE_PER_SLOT", "2"))
+# Самое долгое ожидание места в очереди (секунды); дольше — 503
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "0.5"))
+# Значение заголовка Retry-After у отклонённых запросов (секунды)
+ADMISSION_RETRY_AFTER_SECONDS = float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Пути, не берущие соединение из пула; лента изменений открыта часами и заняла бы место в полосе
+EXEMPT_PATHS = ("/", "/metrics", "/docs", "/redoc", "/openapi.json", "/api/v2/tasks/events")
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+admission_queue_wait_seconds = registry.register(Histogram(
+    "admission_queue_wait_seconds", "Ожидание места в полосе контроля допуска (допущенные и отклонённые запросы)"
+))
+admission_rejected_total = registry.register(Counter(
+    "admission_rejected_total", "Запросы, отклонённые с 503: очередь полосы полна (queue_full) или ожидание истекло (timeout)"
+))
+
+
+class AdmissionLane:
+    """
+    Полоса допуска: не больше limit запросов одновременно и не больше max_queue в очереди.
+    Освободившееся место передаётся первому в очереди (FIFO), поэтому новые запросы
+    не обгоняют ждущих. Ожидание ограничено timeout.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """Занимает место; возвращает None или причину отказа (queue_full, timeout)"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.max_queue or self.timeout <= 0:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            # Клиент ушёл: место, которое успели передать, возвращаем следующему
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._forget(waiter)
+            raise
+
+        if waiter.done():
+            return None
+        self._forget(waiter)
+        return "timeout"
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """Передаёт место первому ждущему или освобождает его"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionController:
+    """
+    Ограничение одновременной работы с базой на воркер по полосам read, write и health.
+
+    У каждой полосы свой лимит, сумма лимитов не больше пула соединений: запросы
+    ждут недолго в очереди полосы, а не до DB_POOL_TIMEOUT в пуле, и поток чтений
+    не вытесняет записи и /health. Запрос сверх очереди или не дождавшийся места
+    за timeout сразу получает 503 с Retry-After.
+    """
+
+    def __init__(
+            self,
+            read_limit: int = ADMISSION_READ_LIMIT,
+            write_limit: int = ADMISSION_WRITE_LIMIT,
+            health_limit: int = ADMISSION_HEALTH_LIMIT,
+            queue_per_slot: float = ADMISSION_QUEUE_PER_SLOT,
+            timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            retry_after: float = ADMISSION_RETRY_AFTER_SECONDS,
+            enabled: bool = ADMISSION_ENABLED
+    ) -> None:
+        self.enabled = enabled
+        self.retry_after = retry_after
+        self.lanes: Dict[str, AdmissionLane] = {
+            name: AdmissionLane(name, limit, math.ceil(limit * queue_per_slot), timeout)
+            for name, limit in (("read", read_limit), ("write", write_limit), ("health", health_limit))
+        }
+
+    @staticmethod
+    def lane_for(method: str, path: str) -> Optional[str]:
+        """Полоса запроса; None — запрос не обращается к пулу и идёт без очереди"""
+        if path in EXEMPT_PATHS or path.startswith("/docs/"):
+            return None
+        if path == "/health":
+            return "health"
+        return "read" if method in READ_METHODS else "write"
+
+
+class AdmissionMiddleware:
+    """
+    ASGI-middleware контроля допуска. Место в полосе держится до конца ответа,
+    включая потоковые (выгрузка читает базу, пока отдаёт тело).
+    """
+
+    def __init__(self, app, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        lane_name = self.controller.lane_for(scope["method"], scope["path"])
+        if lane_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        lane = self.controller.lanes[lane_name]
+        started = time.perf_counter()
+        rejected = await lane.acquire()
+        admission_queue_wait_seconds.observe(time.perf_counter() - started, lane=lane_name)
+        if rejected is not None:
+            admission_rejected_total.inc(lane=lane_name, reason=rejected)
+            await self._reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
+
+    async def _reject(self, send) -> None:
+        body = orjson.dumps({"detail": "Сервер перегружен, повторите запрос позже"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(self.controller.retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+admission_controller = AdmissionController()
+
+
+def _lane_state() -> List[Tuple[Dict[str, str], float]]:
+    values = []
+    for name, lane in admission_controller.lanes.items():
+        values.extend([
+            ({"lane": name, "state": "limit"}, lane.limit),
+            ({"lane": name, "state": "in_flight"}, lane.in_flight),
+            ({"lane": name, "state": "queued"}, lane.queued),
+        ])
+    return values
+
+
+registry.register(Gauge(
+    "admission_lane_requests",
+    "Полосы контроля допуска: limit, in_flight (выполняются) и queued (ждут места)",
+    _lane_state
+))
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Select, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from services.pagination import TASK_FIELDS
+from services.urgency import URGENCY_WINDOW
+
+# Размер повестки по умолчанию и верхняя граница для параметра limit
+AGENDA_DEFAULT_LIMIT = 10
+AGENDA_MAX_LIMIT = 100
+
+
+def _tiers(now: datetime) -> List[tuple]:
+    """
+    Уровни приоритета по убыванию: (квадрант на текущий момент, важность, условие на дедлайн).
+    Срочность считается от now, а не по сохранённому is_urgent, который обновляется
+    фоновым планировщиком с задержкой. Внутри уровня раньше идут задачи с ближайшим
+    дедлайном; задачи без дедлайна — отдельный уровень в конце своего квадранта.
+    """
+    soon = now + URGENCY_WINDOW
+    return [
+        ("Q1", True, Task.deadline_at < soon),
+        ("Q2", True, Task.deadline_at >= soon),
+        ("Q2", True, Task.deadline_at.is_(None)),
+        ("Q3", False, Task.deadline_at < soon),
+        ("Q4", False, Task.deadline_at >= soon),
+        ("Q4", False, Task.deadline_at.is_(None)),
+    ]
+
+
+def agenda_query(now: datetime, limit: int) -> Select:
+    """
+    Первые limit незавершённых задач по приоритету.
+
+    Каждый уровень — отдельная выборка ORDER BY deadline_at, id LIMIT limit по частичному
+    индексу ix_tasks_pending_agenda (is_important, deadline_at, id WHERE completed IS false),
+    уровни склеиваются UNION ALL и досортировываются по номеру уровня. База читает
+    не больше 6 * limit строк индекса, сколько бы задач ни было в таблице.
+    """
+    branches = []
+    for rank, (quadrant, is_important, deadline) in enumerate(_tiers(now)):
+        branch = (
+            select(
+                *[getattr(Task, name) for name in TASK_FIELDS],
+                literal(rank).label("rank"),
+                literal(quadrant).label("current_quadrant"),
+            )
+            .where(Task.completed.is_(False), Task.is_important == is_important, deadline)
+            .order_by(Task.deadline_at, Task.id)
+            .limit(limit)
+        )
+        # Каждая ветка — подзапрос: SQLite не разрешает ORDER BY и LIMIT внутри UNION
+        branches.append(select(*branch.subquery().c))
+
+    merged = union_all(*branches).subquery("agenda")
+    return select(*merged.c).order_by(merged.c.rank, merged.c.deadline_at, merged.c.id).limit(limit)
+
+
+async def agenda_tasks(db: AsyncSession, limit: int = AGENDA_DEFAULT_LIMIT, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Повестка "что делать дальше": {"items": [...]} в порядке приоритета.
+    У каждой задачи все поля TaskResponse и current_quadrant — квадрант на текущий момент.
+    """
+    now = now or datetime.now(timezone.utc)
+    rows = (await db.execute(agenda_query(now, limit))).all()
+    columns = [*TASK_FIELDS, "current_quadrant"]
+    return {"items": [{name: getattr(row, name) for name in columns} for row in rows]}
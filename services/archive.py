@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database import AsyncSessionLocal
+from models import ArchivedTask, Task, TaskArchiveRollup
+from services.cache import invalidate_tasks
+from services.counters import row_state
+from services.events import publish_task_events, task_event
+from services.metrics import Counter as MetricCounter, Gauge, Histogram, registry
+from services.search import archive_indexed_task
+from services.stats import QUADRANTS
+
+logger = logging.getLogger(__name__)
+
+# Завершённые задачи старше этого числа дней (по completed_at) переносятся в архив
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+# Сколько задач переносится одной транзакцией
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+# Пауза между пакетами: архиватор не занимает базу и пул соединений подряд
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.getenv("ARCHIVE_BATCH_PAUSE_SECONDS", "0.5"))
+# Сколько пакетов за один проход; остаток переносится в следующих проходах
+ARCHIVE_MAX_BATCHES_PER_RUN = int(os.getenv("ARCHIVE_MAX_BATCHES_PER_RUN", "100"))
+# Период фонового архиватора (секунды); 0 отключает его
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+ROLLUP_ROW_ID = 1
+
+tasks_table = Task.__table__
+archive_table = ArchivedTask.__table__
+rollup_table = TaskArchiveRollup.__table__
+
+# Колонки, которые переносятся из tasks в tasks_archive без изменений
+ARCHIVE_COLUMNS = tuple(column.name for column in archive_table.c if column.name != "archived_at")
+
+archive_tasks_moved_total = registry.register(MetricCounter(
+    "archive_tasks_moved_total", "Число завершённых задач, перенесённых в архив"
+))
+archive_batch_duration_seconds = registry.register(Histogram(
+    "archive_batch_duration_seconds", "Время переноса одного пакета задач в архив"
+))
+
+
+def _due(cutoff: datetime) -> list:
+    return [tasks_table.c.completed.is_(True), tasks_table.c.completed_at < cutoff]
+
+
+def archive_candidates_query(cutoff: datetime, batch_size: int) -> Select:
+    """
+    ID следующего пакета: завершённые до cutoff, по индексу ix_tasks_completed_at.
+    На PostgreSQL строки блокируются с SKIP LOCKED: архиваторы разных воркеров
+    берут разные пакеты и не ждут строк, которые сейчас меняет пользователь.
+    """
+    return (
+        select(tasks_table.c.id)
+        .where(*_due(cutoff))
+        .order_by(tasks_table.c.completed_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def archive_backlog_query(cutoff: datetime) -> Select:
+    """Сколько задач ждёт переноса"""
+    return select(func.count()).select_from(tasks_table).where(*_due(cutoff))
+
+
+async def _add_to_rollup(db: AsyncSession, quadrants: Counter) -> None:
+    values = {"total_tasks": rollup_table.c.total_tasks + sum(quadrants.values())}
+    for quadrant in QUADRANTS:
+        if quadrants[quadrant]:
+            values[quadrant.lower()] = rollup_table.c[quadrant.lower()] + quadrants[quadrant]
+
+    result = await db.execute(update(rollup_table).where(rollup_table.c.id == ROLLUP_ROW_ID).values(**values))
+    if result.rowcount == 0:
+        # Строку итогов создаёт миграция 0005; без неё (create_all) — первый пакет
+        await db.execute(insert(rollup_table).values(
+            id=ROLLUP_ROW_ID,
+            total_tasks=sum(quadrants.values()),
+            **{quadrant.lower(): quadrants[quadrant] for quadrant in QUADRANTS}
+        ))
+
+
+async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Переносит один пакет завершённых задач в tasks_archive и фиксирует транзакцию.
+
+    DELETE ... RETURNING забирает строки из tasks (условие проверяется ещё раз:
+    задачу могли вернуть в работу), те же строки записываются в архив, а итоги
+    по квадрантам добавляются в task_archive_rollup. Счётчики статистики не меняются:
+    архивная задача по-прежнему учитывается как завершённая.
+    Возвращает число перенесённых задач.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        delete(tasks_table)
+        .where(tasks_table.c.id.in_(archive_candidates_query(cutoff, batch_size)), *_due(cutoff))
+        .returning(*[tasks_table.c[name] for name in ARCHIVE_COLUMNS])
+    )
+    rows = [dict(row) for row in result.mappings()]
+    if not rows:
+        await db.rollback()
+        return 0
+
+    await db.execute(insert(archive_table), [{**row, "archived_at": now} for row in rows])
+    await _add_to_rollup(db, Counter(row["quadrant"] for row in rows))
+    # Задача не удалена, а ушла из рабочих списков: клиенту достаточно ID
+    await publish_task_events(db, [task_event("archived", task_id=row["id"]) for row in rows])
+    await db.commit()
+
+    for row in rows:
+        archive_indexed_task(row["id"])
+    invalidate_tasks((row["id"], row_state(row), None) for row in rows)
+    return len(rows)
+
+
+class ArchiveScheduler:
+    """
+    Фоновый перенос завершённых задач старше after_days в архив.
+
+    Раз в interval секунд переносит до max_batches пакетов по batch_size задач
+    с паузой pause между ними. Ход работы (очередь на перенос, перенесено за проход
+    и всего, скорость, ошибки) доступен в stats и в /metrics.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker = AsyncSessionLocal,
+            interval: float = ARCHIVE_INTERVAL_SECONDS,
+            after_days: float = ARCHIVE_AFTER_DAYS,
+            batch_size: int = ARCHIVE_BATCH_SIZE,
+            pause: float = ARCHIVE_BATCH_PAUSE_SECONDS,
+            max_batches: int = ARCHIVE_MAX_BATCHES_PER_RUN
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_batches = max_batches
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "interval_seconds": interval,
+            "after_days": after_days,
+            "batch_size": batch_size,
+            "pause_seconds": pause,
+            "running": False,
+            "in_progress": False,
+            "runs": 0,
+            "errors": 0,
+            "batches_total": 0,
+            "moved_total": 0,
+            "backlog": None,
+            "last_moved": 0,
+            "last_rows_per_second": None,
+            "last_run_at": None,
+            "last_duration_ms": None,
+            "last_error": None,
+        }
+
+    async def tick(self) -> int:
+        """Один проход: до max_batches пакетов с паузой между ними"""
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.after_days)
+
+        started = time.perf_counter()
+        moved = 0
+        self.stats["in_progress"] = True
+        try:
+            async with self.session_factory() as db:
+                backlog = (await db.execute(archive_backlog_query(cutoff))).scalar_one()
+            self.stats["backlog"] = backlog
+
+            for batch in range(self.max_batches):
+                if backlog <= 0:
+                    break
+                if batch:
+                    await asyncio.sleep(self.pause)
+
+                batch_started = time.perf_counter()
+                async with self.session_factory() as db:
+                    rows = await archive_batch(db, cutoff, self.batch_size)
+                archive_batch_duration_seconds.observe(time.perf_counter() - batch_started)
+                if not rows:
+                    break
+
+                moved += rows
+                backlog -= rows
+                archive_tasks_moved_total.inc(rows)
+                self.stats.update(
+                    batches_total=self.stats["batches_total"] + 1,
+                    moved_total=self.stats["moved_total"] + rows,
+                    backlog=max(backlog, 0),
+                    last_moved=moved,
+                )
+        finally:
+            self.stats["in_progress"] = False
+
+        seconds = time.perf_counter() - started
+        self.stats.update(
+            runs=self.stats["runs"] + 1,
+            last_moved=moved,
+            last_rows_per_second=round(moved / seconds, 1) if seconds > 0 else None,
+            last_run_at=now.isoformat(),
+            last_duration_ms=round(seconds * 1000, 2),
+        )
+        if moved:
+            logger.info("Архив: перенесено задач %d, в очереди ещё %d", moved, self.stats["backlog"])
+        return moved
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = repr(exc)
+                logger.exception("Ошибка фонового переноса задач в архив")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="archive-scheduler")
+        self.stats["running"] = True
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.stats["running"] = False
+
+
+archive_scheduler = ArchiveScheduler()
+
+
+def _archive_progress() -> List[Tuple[Dict[str, str], float]]:
+    backlog = archive_scheduler.stats["backlog"]
+    return [({}, backlog)] if backlog is not None else []
+
+
+registry.register(Gauge(
+    "archive_backlog_tasks",
+    "Завершённые задачи старше ARCHIVE_AFTER_DAYS, ещё не перенесённые в архив (на момент последнего пакета)",
+    _archive_progress
+))
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from services.counters import TaskState
+from services.serialization import render_json
+
+# Размер кэша ответов (число записей) и время жизни записи в секундах.
+# Кэш живёт в памяти процесса: при нескольких воркерах чужие записи устаревают не дольше TTL.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: str
+    tags: FrozenSet[str]
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    LRU-кэш готовых JSON-ответов с TTL и инвалидацией по тегам.
+
+    Каждая запись помечена тегами данных, из которых она собрана
+    ("tasks", "tasks:quadrant:Q1", "task:42", "stats"); изменения задач
+    сбрасывают только записи с затронутыми тегами.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL_SECONDS) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._keys_by_tag: Dict[str, set] = {}
+        # Версия растёт при каждой инвалидации; по ней отбрасываются ответы,
+        # собранные до изменения данных, но дошедшие до кэша после него
+        self._version = 0
+        self._recent_invalidations: deque = deque(maxlen=1024)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def set(self, key: str, body: bytes, tags: Iterable[str], started_version: int) -> CacheEntry:
+        """Сохраняет ответ, если его данные не менялись с момента started_version"""
+        tags = frozenset(tags)
+        entry = CacheEntry(
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            tags=tags,
+            expires_at=time.monotonic() + self.ttl
+        )
+
+        if self._invalidated_since(started_version, tags):
+            return entry
+
+        self._remove(key)
+        self._entries[key] = entry
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+        return entry
+
+    def version_at(self, moment: float) -> int:
+        """
+        Версия кэша на момент moment (time.monotonic()). Если история инвалидаций
+        короче, возвращается версия, с которой ничего не закэшируется.
+        """
+        for version, _, invalidated_at in reversed(self._recent_invalidations):
+            if invalidated_at <= moment:
+                return version
+        if len(self._recent_invalidations) == self._recent_invalidations.maxlen:
+            return self._recent_invalidations[0][0] - 1
+        return 0
+
+    def _invalidated_since(self, version: int, tags: FrozenSet[str]) -> bool:
+        """Сбрасывались ли теги после version (если история короче — считаем, что да)"""
+        if self._version == version:
+            return False
+        for invalidated_version, invalidated_tags, _ in reversed(self._recent_invalidations):
+            if invalidated_version <= version:
+                return False
+            if tags & invalidated_tags:
+                return True
+        return len(self._recent_invalidations) == self._recent_invalidations.maxlen
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = frozenset(tags)
+        self._version += 1
+        self._recent_invalidations.append((self._version, tags, time.monotonic()))
+        for tag in tags:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+                self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+response_cache = ResponseCache()
+
+
+def task_tags(task_id: Optional[int], state: Optional[TaskState]) -> set:
+    """
+    Теги ответов, в которые попадает задача в данном состоянии.
+    task_id=None — для новых задач, ID которых неизвестны (импорт через COPY).
+    """
+    tags = {"tasks", "stats"}
+    if task_id is not None:
+        tags.add(f"task:{task_id}")
+    if state is not None:
+        tags.add(f"tasks:quadrant:{state.quadrant}")
+        tags.add(f"tasks:status:{'completed' if state.completed else 'pending'}")
+    return tags
+
+
+def invalidate_tasks(changes: Iterable[Tuple[Optional[int], Optional[TaskState], Optional[TaskState]]]) -> None:
+    """
+    Сбрасывает кэш после изменения задач: changes — тройки (id, было, стало).
+    Вызывается после commit.
+    """
+    tags = set()
+    for task_id, before, after in changes:
+        tags |= task_tags(task_id, before) | task_tags(task_id, after)
+    if tags:
+        response_cache.invalidate(tags)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return etag in candidates
+
+
+async def cached_response(
+        request: Request,
+        model: Any,
+        tags: Iterable[str],
+        produce: Callable[[], Awaitable[Any]],
+        render: Optional[Callable[[Any], bytes]] = None
+) -> Response:
+    """
+    Отдаёт ответ из кэша или собирает его через produce() и кэширует.
+    Тело сериализует render (по умолчанию render_json по model).
+    Ответ содержит сильный ETag; при совпадении If-None-Match возвращается 304 без тела.
+    """
+    query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+    key = f"{request.url.path}?{query}"
+
+    entry = response_cache.get(key)
+    cache_status = "HIT"
+    if entry is None:
+        cache_status = "MISS"
+        # Реплика может не видеть записей за последние replica_lag секунд:
+        # такой ответ не кэшируется, если его теги сбрасывались в этом окне
+        replica_lag = getattr(request.state, "replica_lag", 0.0)
+        if replica_lag:
+            started_version = response_cache.version_at(time.monotonic() - replica_lag)
+        else:
+            started_version = response_cache.version
+        data = await produce()
+        body = render(data) if render is not None else render_json(model, data)
+        entry = response_cache.set(key, body, tags, started_version)
+
+    headers = {"ETag": entry.etag, "X-Cache": cache_status}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
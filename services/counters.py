@@ -0,0 +1,250 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import ColumnElement, Select, case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task, TaskCounters
+from services.history import record_daily_changes
+from services.stats import QUADRANTS, compute_task_stats
+
+COUNTER_ROW_ID = 1
+
+# Как часто фоновый планировщик сдвигает отметку просрочки (overdue_watermark)
+OVERDUE_WATERMARK_MAX_AGE = timedelta(minutes=1)
+
+
+class TaskState(NamedTuple):
+    """Поля задачи, от которых зависят счётчики (created_at — для времени до завершения в дневных итогах)"""
+    quadrant: str
+    completed: bool
+    deadline_at: Optional[datetime]
+    created_at: Optional[datetime] = None
+
+
+def task_state(task: Task) -> TaskState:
+    """Снимок состояния задачи для подсчёта изменений счётчиков"""
+    return TaskState(task.quadrant, bool(task.completed), task.deadline_at, task.created_at)
+
+
+def row_state(row: Mapping[str, Any]) -> TaskState:
+    """То же для строки из RETURNING или SELECT по колонкам (created_at может не быть в выборке)"""
+    return TaskState(row["quadrant"], bool(row["completed"]), row["deadline_at"], row.get("created_at"))
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _overdue_delta(steps: Counter) -> Optional[ColumnElement]:
+    """
+    Изменение счётчика просрочки: задача учитывается, если её дедлайн раньше overdue_watermark.
+    steps — сумма знаков по каждому дедлайну. Результат — ступенчатая функция отметки,
+    поэтому это один плоский CASE от поздних дедлайнов к ранним, а не сумма CASE на каждую задачу
+    (глубокое выражение на большом пакете упирается в предел рекурсии при компиляции).
+    """
+    running, total = [], 0
+    for deadline in sorted(deadline for deadline, sign in steps.items() if sign):
+        total += steps[deadline]
+        running.append((deadline, total))
+
+    if not running:
+        return None
+    return case(
+        *[(TaskCounters.overdue_watermark > deadline, value) for deadline, value in reversed(running)],
+        else_=0
+    )
+
+
+async def apply_counter_changes(
+        db: AsyncSession,
+        changes: Iterable[Tuple[Optional[TaskState], Optional[TaskState]]]
+) -> None:
+    """
+    Применяет изменения задач к счётчикам одним UPDATE.
+
+    changes — пары (было, стало): (None, state) для созданной задачи,
+    (state, None) для удалённой. Вызывается до commit, поэтому счётчики
+    меняются в той же транзакции, что и сами задачи. Там же пополняются
+    дневные итоги истории (record_daily_changes).
+    """
+    changes = list(changes)
+    await record_daily_changes(db, changes)
+
+    deltas = Counter()
+    overdue_steps = Counter()
+
+    for before, after in changes:
+        if before == after:
+            continue
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            deltas["total_tasks"] += sign
+            if state.quadrant in QUADRANTS:
+                deltas[state.quadrant.lower()] += sign
+            deltas["completed" if state.completed else "pending"] += sign
+
+            # Просрочка считается относительно отметки, хранящейся в строке счётчиков
+            if not state.completed and state.deadline_at is not None:
+                overdue_steps[_as_utc(state.deadline_at)] += sign
+
+    values = {
+        name: getattr(TaskCounters, name) + delta
+        for name, delta in deltas.items() if delta
+    }
+    overdue_delta = _overdue_delta(overdue_steps)
+    if overdue_delta is not None:
+        values["overdue"] = TaskCounters.overdue + overdue_delta
+
+    if not values:
+        return
+
+    # Если строки счётчиков ещё нет, ничего не обновится:
+    # её соберёт с нуля фоновый планировщик (refresh_counters) или manage.py reconcile-stats
+    await db.execute(
+        update(TaskCounters)
+        .where(TaskCounters.id == COUNTER_ROW_ID)
+        .values(**values)
+    )
+
+
+def newly_overdue_query(since: datetime, now: datetime) -> Select:
+    """Число незавершенных задач, дедлайн которых наступил в интервале [since, now)"""
+    return select(func.count()).select_from(Task).where(
+        Task.completed.is_(False),
+        Task.deadline_at >= since,
+        Task.deadline_at < now
+    )
+
+
+async def _count_newly_overdue(db: AsyncSession, since: datetime, now: datetime) -> int:
+    result = await db.execute(newly_overdue_query(since, now))
+    return result.scalar_one()
+
+
+def _counters_to_stats(counters: TaskCounters, overdue: int) -> dict:
+    return {
+        "total_tasks": counters.total_tasks,
+        "by_quadrant": {quadrant: getattr(counters, quadrant.lower()) for quadrant in QUADRANTS},
+        "by_status": {"completed": counters.completed, "pending": counters.pending},
+        "overdue_tasks": overdue
+    }
+
+
+async def rebuild_counters(db: AsyncSession) -> TaskCounters:
+    """Пересчитывает счётчики с нуля по таблице задач и сохраняет их"""
+    now = datetime.now(timezone.utc)
+    stats = await compute_task_stats(db, now)
+
+    counters = await db.get(TaskCounters, COUNTER_ROW_ID, with_for_update=True)
+    if counters is None:
+        counters = TaskCounters(id=COUNTER_ROW_ID)
+        db.add(counters)
+
+    counters.total_tasks = stats["total_tasks"]
+    for quadrant in QUADRANTS:
+        setattr(counters, quadrant.lower(), stats["by_quadrant"][quadrant])
+    counters.completed = stats["by_status"]["completed"]
+    counters.pending = stats["by_status"]["pending"]
+    counters.overdue = stats["overdue_tasks"]
+    counters.overdue_watermark = now
+
+    await db.commit()
+    return counters
+
+
+async def read_counters(db: AsyncSession) -> dict:
+    """
+    Статистика задач из таблицы счётчиков.
+
+    Читает одну строку и досчитывает задачи, просрочившиеся после
+    отметки overdue_watermark, по индексируемому диапазону deadline_at.
+    Ничего не пишет, поэтому может выполняться на реплике; если строки
+    счётчиков ещё нет, статистика считается агрегатом по таблице задач.
+    """
+    counters = await db.get(TaskCounters, COUNTER_ROW_ID)
+    now = datetime.now(timezone.utc)
+    if counters is None:
+        return await compute_task_stats(db, now)
+
+    newly_overdue = await _count_newly_overdue(db, _as_utc(counters.overdue_watermark), now)
+    return _counters_to_stats(counters, counters.overdue + newly_overdue)
+
+
+async def refresh_counters(db: AsyncSession) -> None:
+    """
+    Обслуживание счётчиков на основной базе (вызывается фоновым планировщиком):
+    собирает строку, если её нет, и раз в OVERDUE_WATERMARK_MAX_AGE сдвигает
+    отметку просрочки вперёд, чтобы диапазон в read_counters оставался коротким.
+    Фиксирует транзакцию.
+    """
+    # Строка блокируется до подсчёта, как у писателей (apply_counter_changes): создание, завершение
+    # или удаление задачи не может зафиксироваться между подсчётом и сдвигом отметки и выпасть
+    # из счётчика просрочки. Другой воркер ждёт блокировки и видит уже сдвинутую отметку
+    counters = await db.get(TaskCounters, COUNTER_ROW_ID, with_for_update=True, populate_existing=True)
+    if counters is None:
+        try:
+            await rebuild_counters(db)
+        except IntegrityError:
+            # Строку параллельно создал другой процесс
+            await db.rollback()
+        return
+
+    now = datetime.now(timezone.utc)
+    watermark = _as_utc(counters.overdue_watermark)
+    if now - watermark < OVERDUE_WATERMARK_MAX_AGE:
+        # Снимаем блокировку
+        await db.commit()
+        return
+
+    newly_overdue = await _count_newly_overdue(db, watermark, now)
+    await db.execute(
+        update(TaskCounters)
+        .where(TaskCounters.id == COUNTER_ROW_ID)
+        .values(overdue=TaskCounters.overdue + newly_overdue, overdue_watermark=now)
+    )
+    await db.commit()
+
+
+async def reconcile_counters(db: AsyncSession, fix: bool = True) -> dict:
+    """
+    Сравнивает счётчики с пересчётом с нуля.
+
+    Возвращает расхождения вида {"by_quadrant.Q1": {"stored": 10, "actual": 12}}.
+    При fix=True сохраняет пересчитанные значения.
+    """
+    counters = await db.get(TaskCounters, COUNTER_ROW_ID, with_for_update=True)
+    now = datetime.now(timezone.utc)
+
+    if counters is None:
+        stored = None
+    else:
+        watermark = _as_utc(counters.overdue_watermark)
+        newly_overdue = await _count_newly_overdue(db, watermark, now)
+        stored = _counters_to_stats(counters, counters.overdue + newly_overdue)
+
+    actual = await compute_task_stats(db, now)
+
+    drift = {}
+    for key, value in actual.items():
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                stored_value = stored[key][sub_key] if stored else None
+                if stored_value != sub_value:
+                    drift[f"{key}.{sub_key}"] = {"stored": stored_value, "actual": sub_value}
+        else:
+            stored_value = stored[key] if stored else None
+            if stored_value != value:
+                drift[key] = {"stored": stored_value, "actual": value}
+
+    if fix:
+        await rebuild_counters(db)
+    else:
+        await db.rollback()
+
+    return drift
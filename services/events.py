@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import orjson
+from sqlalchemy import event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних событий хранится для продолжения по Last-Event-ID
+CHANGE_FEED_HISTORY = int(os.getenv("CHANGE_FEED_HISTORY", "1000"))
+# Очередь одного подписчика: кто не успевает её разбирать, отключается и переподключается
+CHANGE_FEED_SUBSCRIBER_BUFFER = int(os.getenv("CHANGE_FEED_SUBSCRIBER_BUFFER", "256"))
+# Комментарий-пинг в открытом потоке, чтобы прокси не закрывали соединение
+CHANGE_FEED_HEARTBEAT_SECONDS = float(os.getenv("CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+# auto — LISTEN/NOTIFY на PostgreSQL и брокер в процессе для остальных баз; memory — всегда в процессе
+CHANGE_FEED_BACKEND = os.getenv("CHANGE_FEED_BACKEND", "auto")
+# LISTEN требует сессионного соединения: через pgBouncer в режиме транзакций он не работает,
+# поэтому слушателю можно дать отдельную строку подключения (по умолчанию DATABASE_URL)
+CHANGE_FEED_DATABASE_URL = os.getenv("CHANGE_FEED_DATABASE_URL") or os.getenv("DATABASE_URL")
+
+NOTIFY_CHANNEL = "task_events"
+PENDING_EVENTS_KEY = "pending_task_events"
+
+_sequence = itertools.count(1)
+
+
+@dataclass
+class TaskEvent:
+    """Изменение задачи для ленты: created, updated, completed, deleted, imported или archived"""
+    id: str
+    type: str
+    task_id: Optional[int] = None
+    task: Optional[Dict[str, Any]] = None
+
+    def to_json(self) -> bytes:
+        return orjson.dumps(
+            {"id": self.id, "type": self.type, "task_id": self.task_id, "task": self.task},
+            option=orjson.OPT_UTC_Z
+        )
+
+    @classmethod
+    def from_json(cls, payload: str | bytes) -> "TaskEvent":
+        return cls(**orjson.loads(payload))
+
+
+def task_event(event_type: str, task: Optional[Mapping[str, Any]] = None, task_id: Optional[int] = None) -> TaskEvent:
+    """
+    Событие с новым ID. ID уникален между воркерами (миллисекунды, PID, номер),
+    продолжение идёт по позиции ID в истории, а не по сравнению значений.
+    """
+    event_id = f"{time.time_ns() // 1_000_000}-{os.getpid()}-{next(_sequence)}"
+    if task is not None:
+        task = dict(task)
+        task_id = task["id"]
+    return TaskEvent(event_id, event_type, task_id, task)
+
+
+class Subscription:
+    """Подписчик ленты с ограниченной очередью"""
+
+    def __init__(self, buffer: int) -> None:
+        self.queue: asyncio.Queue[TaskEvent] = asyncio.Queue(maxsize=buffer)
+        self.overflowed = False
+
+
+class ChangeBroker:
+    """
+    Раздаёт события подписчикам текущего процесса и хранит последние CHANGE_FEED_HISTORY событий.
+
+    Публикующий никогда не ждёт подписчиков: если очередь подписчика заполнена,
+    он помечается overflowed и отключается, а клиент переподключается с Last-Event-ID
+    и дочитывает пропущенное из истории.
+    """
+
+    def __init__(self, history: int = CHANGE_FEED_HISTORY, buffer: int = CHANGE_FEED_SUBSCRIBER_BUFFER) -> None:
+        self.buffer = buffer
+        self.history: deque[TaskEvent] = deque(maxlen=history)
+        self.subscribers: set[Subscription] = set()
+        # True, пока работает слушатель LISTEN: тогда события идут через NOTIFY
+        self.notify = False
+        self.stats = {"published": 0, "dropped_subscribers": 0, "resets": 0}
+
+    def deliver(self, events: Iterable[TaskEvent]) -> None:
+        for item in events:
+            self.history.append(item)
+            self.stats["published"] += 1
+            for subscription in list(self.subscribers):
+                try:
+                    subscription.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    subscription.overflowed = True
+                    self.subscribers.discard(subscription)
+                    self.stats["dropped_subscribers"] += 1
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> tuple[Subscription, Optional[List[TaskEvent]]]:
+        """
+        Регистрирует подписчика. Возвращает его и события после last_event_id
+        (None, если такого ID в истории уже нет — клиенту нужно перечитать списки).
+        """
+        replay: Optional[List[TaskEvent]] = []
+        if last_event_id:
+            ids = [item.id for item in self.history]
+            if last_event_id in ids:
+                replay = list(self.history)[ids.index(last_event_id) + 1:]
+            else:
+                replay = None
+
+        subscription = Subscription(self.buffer)
+        self.subscribers.add(subscription)
+        return subscription, replay
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def reset(self) -> None:
+        """События могли потеряться (переподключение слушателя): история сбрасывается, подписчики отключаются"""
+        self.history.clear()
+        self.stats["resets"] += 1
+        for subscription in list(self.subscribers):
+            subscription.overflowed = True
+            self.subscribers.discard(subscription)
+
+
+change_broker = ChangeBroker()
+
+
+async def publish_task_events(db: AsyncSession, events: List[TaskEvent]) -> None:
+    """
+    Публикует события в транзакции изменения; вызывается до commit.
+    PostgreSQL: pg_notify в той же транзакции (доставляется всем воркерам только после commit).
+    Иначе события ждут commit сессии и раздаются в процессе; при rollback отбрасываются.
+    """
+    if not events:
+        return
+
+    if change_broker.notify and db.get_bind().dialect.name == "postgresql":
+        await db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": NOTIFY_CHANNEL, "payloads": [item.to_json().decode() for item in events]}
+        )
+        return
+
+    db.sync_session.info.setdefault(PENDING_EVENTS_KEY, []).extend(events)
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_after_commit(session: Session) -> None:
+    events = session.info.pop(PENDING_EVENTS_KEY, None)
+    if events:
+        change_broker.deliver(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+class PostgresListener:
+    """
+    Отдельное соединение asyncpg с LISTEN task_events: события от всех воркеров
+    попадают в брокер этого процесса. При обрыве соединения переподключается
+    с паузой, а брокер сбрасывается — за время обрыва события могли потеряться.
+    """
+
+    def __init__(self, database_url: str, broker: ChangeBroker = change_broker) -> None:
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.broker = broker
+        self._connection = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self.dsn)
+        self._connection.add_termination_listener(self._on_terminated)
+        await self._connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        self.broker.notify = True
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            self.broker.deliver([TaskEvent.from_json(payload)])
+        except Exception:
+            logger.exception("Некорректное событие в канале %s", channel)
+
+    def _on_terminated(self, connection) -> None:
+        if self._stopping:
+            return
+        logger.warning("Соединение LISTEN %s потеряно, переподключение", NOTIFY_CHANNEL)
+        self.broker.notify = False
+        self.broker.reset()
+        self._reconnect = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        delay = 1.0
+        while not self._stopping:
+            try:
+                await self.start()
+                logger.info("Соединение LISTEN %s восстановлено", NOTIFY_CHANNEL)
+                return
+            except Exception:
+                logger.exception("Не удалось переподключиться к LISTEN %s", NOTIFY_CHANNEL)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self.broker.notify = False
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+
+
+_listener: Optional[PostgresListener] = None
+
+
+async def start_change_feed(dialect_name: str) -> str:
+    """Запускает доставку событий между воркерами; возвращает название режима"""
+    global _listener
+    if CHANGE_FEED_BACKEND == "memory" or dialect_name != "postgresql" or not CHANGE_FEED_DATABASE_URL:
+        return "memory"
+
+    listener = PostgresListener(CHANGE_FEED_DATABASE_URL)
+    try:
+        await listener.start()
+    except Exception:
+        # Лента продолжит работать в пределах процесса
+        logger.exception("Не удалось запустить LISTEN %s", NOTIFY_CHANNEL)
+        return "memory"
+    _listener = listener
+    return "postgres"
+
+
+async def stop_change_feed() -> None:
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
+
+
+def format_sse(item: TaskEvent) -> bytes:
+    """Событие в формате text/event-stream"""
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (item.id.encode(), item.type.encode(), item.to_json())
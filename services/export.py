@@ -0,0 +1,81 @@
+import csv
+import io
+import os
+from typing import Any, AsyncIterator, List, Mapping
+
+import orjson
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from services.pagination import TASK_FIELDS, ordered_tasks_query
+
+# Сколько строк драйвер отдаёт за раз из серверного курсора (и сколько строк в одном куске ответа)
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "tasks.ndjson"),
+    "csv": ("text/csv; charset=utf-8", "tasks.csv"),
+}
+
+
+def export_query(*conditions, include_archived: bool = False) -> Select:
+    """Все поля задач в порядке создания (тот же индекс, что у постраничных списков)"""
+    return (
+        ordered_tasks_query(list(TASK_FIELDS), list(conditions), include_archived=include_archived)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+
+
+def _ndjson_chunk(rows: List[Mapping[str, Any]]) -> bytes:
+    # Каждая строка кодируется так же, как элементы списков (render_task_page).
+    # Ключи берутся из TASK_FIELDS: у колонок UNION с архивом имена — подклассы str, их orjson не принимает
+    return b"".join(
+        orjson.dumps({name: row[name] for name in TASK_FIELDS}, option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunk(rows: List[Mapping[str, Any]], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(TASK_FIELDS)
+    writer.writerows([_csv_value(row[name]) for name in TASK_FIELDS] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_export(
+        session_factory: async_sessionmaker,
+        stmt: Select,
+        export_format: str
+) -> AsyncIterator[bytes]:
+    """
+    Отдаёт выгрузку кусками по EXPORT_CHUNK_ROWS строк.
+
+    Строки читаются через серверный курсор (AsyncSession.stream + yield_per),
+    поэтому в памяти воркера одновременно находится только один кусок.
+    Сессия открывается здесь же: генератор работает уже после выхода из эндпоинта.
+    """
+    async with session_factory() as db:
+        result = await db.stream(stmt)
+        first = True
+        async for partition in result.mappings().partitions():
+            if export_format == "csv":
+                yield _csv_chunk(partition, header=first)
+            else:
+                yield _ndjson_chunk(partition)
+            first = False
+
+        if first and export_format == "csv":
+            # Пустая выгрузка: только заголовок
+            yield _csv_chunk([], header=True)
@@ -0,0 +1,277 @@
+import os
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ArchivedTask, Task, TaskDailyStats
+from services.stats import QUADRANTS
+
+# Самый длинный период, который можно запросить в GET /stats/history (дни)
+STATS_HISTORY_MAX_DAYS = int(os.getenv("STATS_HISTORY_MAX_DAYS", "1100"))
+# Период по умолчанию, если from не передан (дни, включая to)
+STATS_HISTORY_DEFAULT_DAYS = int(os.getenv("STATS_HISTORY_DEFAULT_DAYS", "30"))
+# Сколько строк читается за раз при сборе итогов по существующим задачам
+BACKFILL_CHUNK_ROWS = 5000
+
+GRANULARITIES = ("day", "week", "month")
+
+daily_table = TaskDailyStats.__table__
+
+# Колонки, которые увеличиваются при изменении задач
+COUNTER_COLUMNS = (
+    *[f"created_{quadrant.lower()}" for quadrant in QUADRANTS],
+    *[f"completed_{quadrant.lower()}" for quadrant in QUADRANTS],
+    "completion_seconds",
+)
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _day(value: datetime) -> date:
+    return _as_utc(value).astimezone(timezone.utc).date()
+
+
+def _upsert(db: AsyncSession, values: Dict[str, Any], set_) -> Any:
+    """INSERT ... ON CONFLICT (day) DO UPDATE для PostgreSQL и SQLite; None для остальных баз"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    stmt = dialect_insert(daily_table).values(**values)
+    return stmt.on_conflict_do_update(index_elements=[daily_table.c.day], set_=set_(stmt.excluded))
+
+
+async def _add_to_day(db: AsyncSession, day: date, amounts: Counter) -> None:
+    amounts = {name: value for name, value in amounts.items() if value}
+    if not amounts:
+        return
+
+    stmt = _upsert(
+        db, {"day": day, **amounts},
+        lambda excluded: {name: daily_table.c[name] + excluded[name] for name in amounts}
+    )
+    if stmt is not None:
+        await db.execute(stmt)
+        return
+
+    result = await db.execute(
+        update(daily_table)
+        .where(daily_table.c.day == day)
+        .values(**{name: daily_table.c[name] + value for name, value in amounts.items()})
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(daily_table).values(day=day, **amounts))
+
+
+async def record_daily_changes(db: AsyncSession, changes: Iterable[Tuple[Any, Any]], now: Optional[datetime] = None) -> None:
+    """
+    Пополняет итоги текущего дня по парам (было, стало) из apply_counter_changes (до commit).
+
+    Итоги — это события дня: созданная задача учитывается в квадранте при создании,
+    завершение (переход незавершённой задачи в завершённые) — в квадранте на момент
+    завершения вместе со временем от создания. Удаление и повторное открытие прошлые
+    дни не меняют. Задачи, созданные сразу завершёнными (импорт), завершением не считаются.
+    """
+    now = now or datetime.now(timezone.utc)
+    amounts = Counter()
+    for before, after in changes:
+        if after is None or after.quadrant not in QUADRANTS:
+            continue
+        if before is None:
+            amounts[f"created_{after.quadrant.lower()}"] += 1
+        elif after.completed and not before.completed:
+            amounts[f"completed_{after.quadrant.lower()}"] += 1
+            if after.created_at is not None:
+                amounts["completion_seconds"] += max((now - _as_utc(after.created_at)).total_seconds(), 0.0)
+
+    await _add_to_day(db, _day(now), amounts)
+
+
+async def record_overdue_snapshot(db: AsyncSession, overdue: int, now: Optional[datetime] = None) -> None:
+    """Запоминает текущее число просроченных задач как значение сегодняшнего дня (без commit)"""
+    day = _day(now or datetime.now(timezone.utc))
+    stmt = _upsert(db, {"day": day, "overdue": overdue}, lambda excluded: {"overdue": excluded.overdue})
+    if stmt is not None:
+        await db.execute(stmt)
+        return
+
+    result = await db.execute(update(daily_table).where(daily_table.c.day == day).values(overdue=overdue))
+    if result.rowcount == 0:
+        await db.execute(insert(daily_table).values(day=day, overdue=overdue))
+
+
+def _period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _empty_point(period: date) -> Dict[str, Any]:
+    return {
+        "period": period.isoformat(),
+        "created": 0,
+        "completed": 0,
+        "created_by_quadrant": {quadrant: 0 for quadrant in QUADRANTS},
+        "completed_by_quadrant": {quadrant: 0 for quadrant in QUADRANTS},
+        "avg_completion_seconds": None,
+        "overdue_tasks": None,
+    }
+
+
+def validate_history_range(
+        date_from: Optional[date],
+        date_to: Optional[date],
+        granularity: str
+) -> Tuple[date, date]:
+    """Проверяет параметры GET /stats/history; возвращает (from, to) с подставленными значениями по умолчанию"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail="Недопустимая детализация. Используйте: day, week или month"
+        )
+
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=STATS_HISTORY_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="Дата from позже даты to")
+    if (date_to - date_from).days + 1 > STATS_HISTORY_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком длинный период: не больше {STATS_HISTORY_MAX_DAYS} дней"
+        )
+    return date_from, date_to
+
+
+async def stats_history(db: AsyncSession, date_from: date, date_to: date, granularity: str) -> Dict[str, Any]:
+    """
+    Тренды за [date_from, date_to] по дневным итогам: один запрос по первичному ключу day,
+    не больше STATS_HISTORY_MAX_DAYS строк. Дни группируются в недели (с понедельника)
+    или месяцы; периоды без событий возвращаются с нулями. overdue_tasks периода —
+    последний снимок внутри него (None, если снимков не было).
+    """
+    rows = (await db.execute(
+        select(daily_table)
+        .where(daily_table.c.day >= date_from, daily_table.c.day <= date_to)
+        .order_by(daily_table.c.day)
+    )).mappings().all()
+
+    points: Dict[date, Dict[str, Any]] = {}
+    period = _period_start(date_from, granularity)
+    while period <= date_to:
+        points[period] = _empty_point(period)
+        period = _next_period(period, granularity)
+
+    seconds: Dict[date, float] = defaultdict(float)
+    for row in rows:
+        period = _period_start(row["day"], granularity)
+        point = points[period]
+        for quadrant in QUADRANTS:
+            point["created_by_quadrant"][quadrant] += row[f"created_{quadrant.lower()}"]
+            point["completed_by_quadrant"][quadrant] += row[f"completed_{quadrant.lower()}"]
+        seconds[period] += row["completion_seconds"]
+        if row["overdue"] is not None:
+            point["overdue_tasks"] = row["overdue"]
+
+    for period, point in points.items():
+        point["created"] = sum(point["created_by_quadrant"].values())
+        point["completed"] = sum(point["completed_by_quadrant"].values())
+        if point["completed"]:
+            point["avg_completion_seconds"] = round(seconds[period] / point["completed"], 1)
+
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "granularity": granularity,
+        "points": list(points.values()),
+    }
+
+
+async def backfill_daily_stats(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Пересобирает дневные итоги по существующим задачам (рабочая таблица и архив) и фиксирует транзакцию.
+
+    Задачи читаются одним проходом серверным курсором; в памяти — только итоги по дням.
+    Созданные считаются по created_at и текущему квадранту, завершённые — по completed_at
+    (задачи без completed_at пропускаются). Просрочка на конец каждого дня собирается
+    из интервалов [max(создание, дедлайн), завершение) разностным массивом по дням.
+    Удалённые задачи восстановить нельзя, поэтому итоги прошлых дней могут стать меньше
+    накопленных. Все строки task_daily_stats заменяются.
+    """
+    now = now or datetime.now(timezone.utc)
+    today = _day(now)
+    amounts: Dict[date, Counter] = defaultdict(Counter)
+    overdue_steps: Counter = Counter()
+    scanned = 0
+
+    for model in (Task, ArchivedTask):
+        result = await db.stream(
+            select(model.quadrant, model.completed, model.created_at, model.completed_at, model.deadline_at)
+            .execution_options(yield_per=BACKFILL_CHUNK_ROWS)
+        )
+        async for partition in result.partitions():
+            for quadrant, completed, created_at, completed_at, deadline_at in partition:
+                scanned += 1
+                if quadrant not in QUADRANTS:
+                    continue
+                amounts[_day(created_at)][f"created_{quadrant.lower()}"] += 1
+
+                finished_at = completed_at if completed else None
+                if finished_at is not None:
+                    day = _day(finished_at)
+                    amounts[day][f"completed_{quadrant.lower()}"] += 1
+                    amounts[day]["completion_seconds"] += max(
+                        (_as_utc(finished_at) - _as_utc(created_at)).total_seconds(), 0.0
+                    )
+
+                if deadline_at is None or (completed and finished_at is None):
+                    continue
+                overdue_from = max(_as_utc(created_at), _as_utc(deadline_at))
+                if overdue_from >= now or (finished_at is not None and _as_utc(finished_at) <= overdue_from):
+                    continue
+                overdue_steps[_day(overdue_from)] += 1
+                if finished_at is not None:
+                    overdue_steps[_day(finished_at)] -= 1
+
+    days = set(amounts) | set(overdue_steps)
+    rows: List[Dict[str, Any]] = []
+    if days:
+        running = 0
+        day = min(days)
+        while day <= max(max(days), today):
+            running += overdue_steps.get(day, 0)
+            values = amounts.get(day, Counter())
+            rows.append({
+                "day": day,
+                **{name: values.get(name, 0) for name in COUNTER_COLUMNS},
+                "overdue": running,
+            })
+            day += timedelta(days=1)
+
+    await db.execute(delete(daily_table))
+    for start in range(0, len(rows), BACKFILL_CHUNK_ROWS):
+        await db.execute(insert(daily_table), rows[start:start + BACKFILL_CHUNK_ROWS])
+    await db.commit()
+
+    return {"tasks": scanned, "days": len(rows)}
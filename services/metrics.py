@@ -0,0 +1,305 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+# Запрос, выполнивший больше запросов к БД, попадает в лог и получает заголовок X-DB-Queries
+QUERY_COUNT_WARN_THRESHOLD = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", "20"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(values: Dict[str, str]) -> Labels:
+    return tuple(sorted(values.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик с метками (тип counter в формате Prometheus)"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(labels)} {_format_number(value)}" for labels, value in items]
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (тип histogram)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # Для каждого набора меток: счётчики корзин (+Inf последней), сумма и число наблюдений
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()]
+
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels, ('le', _format_number(float(bound))))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Значение, снимаемое в момент чтения /metrics (тип gauge)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], List[Tuple[Dict[str, str], float]]]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(_labels(labels))} {_format_number(value)}"
+            for labels, value in self.collect()
+        ]
+
+
+class Registry:
+    """Набор метрик, который отдаётся на /metrics в текстовом формате Prometheus"""
+
+    def __init__(self) -> None:
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Число HTTP-запросов по маршруту, методу и статусу"
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса"
+))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "Время выполнения одного SQL-запроса по типу (SELECT, UPDATE, ...)"
+))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "Число SQL-запросов за один HTTP-запрос", COUNT_BUCKETS
+))
+db_time_per_request_seconds = registry.register(Histogram(
+    "db_time_per_request_seconds", "Суммарное время SQL-запросов за один HTTP-запрос"
+))
+db_rows_per_request = registry.register(Histogram(
+    "db_rows_per_request", "Число строк, прочитанных или изменённых за один HTTP-запрос", ROW_BUCKETS
+))
+db_pool_checkout_wait_seconds = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Ожидание свободного соединения в пуле"
+))
+db_pool_checkout_timeouts_total = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Число запросов соединения, не дождавшихся его за pool_timeout"
+))
+
+_pools: List[Tuple[str, "InstrumentedAsyncQueuePool"]] = []
+
+
+def _pool_state() -> List[Tuple[Dict[str, str], float]]:
+    values = []
+    for name, pool in _pools:
+        capacity = pool.size() + pool._max_overflow
+        checked_out = pool.checkedout()
+        values.extend([
+            ({"engine": name, "state": "size"}, pool.size()),
+            ({"engine": name, "state": "max_overflow"}, pool._max_overflow),
+            ({"engine": name, "state": "checked_out"}, checked_out),
+            ({"engine": name, "state": "idle"}, pool.checkedin()),
+            ({"engine": name, "state": "overflow"}, max(pool.overflow(), 0)),
+            ({"engine": name, "state": "saturation"}, round(checked_out / capacity, 4) if capacity > 0 else 0.0),
+        ])
+    return values
+
+
+registry.register(Gauge(
+    "db_pool_connections",
+    "Состояние пула соединений: size, max_overflow, checked_out, idle, overflow и saturation (доля занятых)",
+    _pool_state
+))
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который замеряет время выдачи соединения (ожидание, подключение, pre_ping)"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            db_pool_checkout_timeouts_total.inc()
+            raise
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started)
+
+
+@dataclass
+class RequestStats:
+    """Счётчики SQL одного HTTP-запроса"""
+    queries: int = 0
+    db_seconds: float = 0.0
+    rows: int = 0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def _verb(statement: Optional[str]) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement and statement.strip() else "UNKNOWN"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Время начала хранится по контексту выполнения: запись снимает after_cursor_execute
+    # или handle_error, поэтому упавший запрос не сдвигает замеры следующих
+    conn.info.setdefault("query_started", {})[id(context)] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("query_started", {}).pop(id(context), None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    db_query_duration_seconds.observe(elapsed, statement=_verb(statement))
+
+    stats = current_request_stats.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    # rowcount: asyncpg сообщает его и для SELECT (по статусу команды), SQLite — только для изменений
+    rowcount = getattr(cursor, "rowcount", -1)
+    stats.rows += max(rowcount, 0)
+
+
+def _handle_error(exception_context) -> None:
+    """Упавший запрос: снимает его время начала и учитывает его в запросах HTTP-запроса"""
+    connection = exception_context.connection
+    if connection is None or connection.closed:
+        return
+    started = connection.info.get("query_started", {}).pop(id(exception_context.execution_context), None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    db_query_duration_seconds.observe(elapsed, statement=_verb(exception_context.statement))
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine: AsyncEngine, name: str = "default") -> None:
+    """Подключает к движку замеры SQL-запросов и (для InstrumentedAsyncQueuePool) состояния пула"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+    if isinstance(engine.pool, InstrumentedAsyncQueuePool):
+        _pools.append((name, engine.pool))
+
+
+def route_label(scope: dict) -> str:
+    """
+    Шаблон маршрута для метки (/api/v2/tasks/{task_id}), чтобы ID не плодили ряды метрик.
+    Путь маршрута может не содержать префикса include_router — он берётся из фактического пути.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path_segments = scope["path"].split("/")
+    route_segments = route.path.split("/")
+    prefix = path_segments[:max(len(path_segments) - len(route_segments) + 1, 0)]
+    return "/".join(prefix) + route.path if prefix != [""] else route.path
+
+
+def record_request(method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> bool:
+    """
+    Сохраняет метрики завершённого HTTP-запроса.
+    Возвращает True, если запрос превысил QUERY_COUNT_WARN_THRESHOLD.
+    """
+    http_requests_total.inc(method=method, route=route, status=str(status_code))
+    http_request_duration_seconds.observe(seconds, method=method, route=route)
+    db_queries_per_request.observe(stats.queries, route=route)
+    db_time_per_request_seconds.observe(stats.db_seconds, route=route)
+    db_rows_per_request.observe(stats.rows, route=route)
+
+    if stats.queries > QUERY_COUNT_WARN_THRESHOLD:
+        logger.warning(
+            "%s %s выполнил %d SQL-запросов (порог %d), %.1f мс в БД",
+            method, route, stats.queries, QUERY_COUNT_WARN_THRESHOLD, stats.db_seconds * 1000
+        )
+        return True
+    return False
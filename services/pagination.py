@@ -0,0 +1,184 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Column, Select, and_, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.visitors import replacement_traverse
+
+from models import ArchivedTask, Task
+from schemas import TaskResponse
+
+# Размер страницы по умолчанию и верхняя граница для параметра limit
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Поля, которые можно запросить через fields= (в порядке схемы ответа)
+TASK_FIELDS: Tuple[str, ...] = tuple(TaskResponse.model_fields)
+
+
+def pack_cursor(*values: Any) -> str:
+    """Упаковывает позицию в списке в непрозрачный курсор (base64 от JSON)"""
+    raw = json.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def unpack_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Распаковывает курсор, выданный pack_cursor.
+    При подделанном или испорченном курсоре возвращает 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return values
+
+
+def encode_cursor(created_at: datetime, task_id: int) -> str:
+    """Курсор позиции (created_at, id) для keyset-пагинации"""
+    return pack_cursor(created_at.isoformat(), task_id)
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбирает курсор encode_cursor обратно в (created_at, id)"""
+    created_at, task_id = unpack_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Разбирает параметр fields=id,title,... в список колонок.
+    None означает "все поля".
+    """
+    if not fields:
+        return None
+
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in TASK_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(TASK_FIELDS)}"
+        )
+
+    # Сохраняем порядок схемы и убираем дубликаты
+    return [name for name in TASK_FIELDS if name in requested]
+
+
+def on_archive(clause):
+    """То же условие, но по колонкам tasks_archive вместо tasks"""
+    tasks_table, archive_table = Task.__table__, ArchivedTask.__table__
+
+    def replace(element):
+        if isinstance(element, Column) and element.table is tasks_table:
+            return archive_table.c[element.name]
+        return None
+
+    return replacement_traverse(clause, {}, replace)
+
+
+def _ordered(table, columns: List[str], conditions: List[Any], limit: Optional[int]) -> Select:
+    stmt = (
+        select(*[table.c[name] for name in columns])
+        .where(*conditions)
+        .order_by(table.c.created_at, table.c.id)
+    )
+    return stmt.limit(limit) if limit is not None else stmt
+
+
+def ordered_tasks_query(
+        columns: List[str],
+        conditions: List[Any],
+        limit: Optional[int] = None,
+        include_archived: bool = False
+) -> Select:
+    """
+    Колонки задач по условиям в порядке (created_at, id).
+
+    С include_archived к задачам добавляется архив: UNION ALL двух выборок, каждая
+    со своими условиями, порядком и limit по индексам (created_at, id) своей таблицы,
+    поэтому база сливает две короткие упорядоченные выборки, а не сортирует архив целиком.
+    """
+    stmt = _ordered(Task.__table__, columns, conditions, limit)
+    if not include_archived:
+        return stmt
+
+    archived = _ordered(ArchivedTask.__table__, columns, [on_archive(condition) for condition in conditions], limit)
+    # Каждая ветка — подзапрос: SQLite не разрешает ORDER BY и LIMIT внутри UNION
+    merged = union_all(*[select(*branch.subquery().c) for branch in (stmt, archived)]).subquery("all_tasks")
+    stmt = select(*merged.c).order_by(merged.c.created_at, merged.c.id)
+    return stmt.limit(limit) if limit is not None else stmt
+
+
+def build_page_query(
+        *conditions,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        include_archived: bool = False,
+) -> Select:
+    """
+    Запрос одной страницы задач по (created_at, id).
+    Выбирает limit + 1 строку, чтобы понять, есть ли следующая страница.
+    Выбираются отдельные колонки (по умолчанию все поля TaskResponse), а не ORM-объекты.
+    С include_archived в страницу попадают и задачи из архива (см. ordered_tasks_query).
+    """
+    # created_at и id нужны для курсора, даже если клиент их не просил
+    selected = list(dict.fromkeys(list(columns or TASK_FIELDS) + ["created_at", "id"]))
+    conditions = list(conditions)
+
+    if after is not None:
+        cursor_created_at, cursor_id = decode_cursor(after)
+        conditions.append(
+            or_(
+                Task.created_at > cursor_created_at,
+                and_(Task.created_at == cursor_created_at, Task.id > cursor_id),
+            )
+        )
+
+    return ordered_tasks_query(selected, conditions, limit + 1, include_archived)
+
+
+async def paginate_tasks(
+        db: AsyncSession,
+        *conditions,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+        include_archived: bool = False,
+) -> Dict[str, Any]:
+    """
+    Keyset-пагинация задач по (created_at, id).
+
+    Выбирает не больше limit строк после курсора after, при необходимости
+    только колонки из fields. Возвращает {"items": [...], "next_cursor": ...};
+    next_cursor равен None, если это последняя страница.
+
+    Строки не превращаются в ORM-объекты и не валидируются через TaskResponse:
+    колонки уже имеют типы схемы, а элементы собираются в порядке её полей,
+    так что страницу можно сразу кодировать через render_task_page.
+    """
+    columns = parse_fields(fields) or list(TASK_FIELDS)
+    result = await db.execute(build_page_query(
+        *conditions, limit=limit, after=after, columns=columns, include_archived=include_archived
+    ))
+
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{name: getattr(row, name) for name in columns} for row in rows]
+    last = (rows[-1].created_at, rows[-1].id) if rows else None
+
+    next_cursor = encode_cursor(*last) if has_more and last else None
+
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,146 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import insert, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ArchivedTask, Task
+from services.agenda import agenda_query
+from services.archive import ARCHIVE_COLUMNS, archive_candidates_query
+from services.counters import newly_overdue_query
+from services.pagination import build_page_query
+from services.requadrant import requadrant_statement
+from services.search import build_search_query
+from services.sync import changed_tasks_query
+from services.task_batch import complete_statement, delete_statement, insert_statement, lock_rows_query
+from services.task_writes import complete_values, task_update_values, update_statement
+from services.task_writes import delete_statement as delete_task_statement
+from services.urgency import calculate_urgency, calculate_quadrant
+
+
+async def seed_tasks(db: AsyncSession, rows: int, chunk: int = 5000) -> None:
+    """Заполняет таблицу правдоподобными задачами (без commit)"""
+    now = datetime.now(timezone.utc)
+    words = ["отчёт", "релиз", "встреча", "звонок", "бюджет", "review", "deploy", "invoice"]
+
+    for start in range(0, rows, chunk):
+        batch = []
+        for _ in range(min(chunk, rows - start)):
+            is_important = random.random() < 0.5
+            deadline_at = now + timedelta(days=random.uniform(-90, 90)) if random.random() < 0.8 else None
+            is_urgent = calculate_urgency(deadline_at, now)
+            completed = random.random() < 0.5
+            batch.append({
+                "title": " ".join(random.sample(words, 2)),
+                "description": " ".join(random.sample(words, 4)),
+                "is_important": is_important,
+                "is_urgent": is_urgent,
+                "quadrant": calculate_quadrant(is_important, is_urgent),
+                "completed": completed,
+                "created_at": now - timedelta(days=random.uniform(0, 365)),
+                "completed_at": now if completed else None,
+                "deadline_at": deadline_at,
+            })
+        await db.execute(insert(Task), batch)
+
+
+async def seed_archive(db: AsyncSession) -> None:
+    """Копирует завершённые задачи в архив, чтобы у планировщика была статистика и по нему (без commit)"""
+    await db.execute(
+        insert(ArchivedTask).from_select(
+            [*ARCHIVE_COLUMNS, "archived_at"],
+            select(*[getattr(Task, name) for name in ARCHIVE_COLUMNS], literal(datetime.now(timezone.utc)))
+            .where(Task.completed.is_(True))
+        )
+    )
+
+
+def router_queries(dialect_name: str) -> List[Tuple[str, Any]]:
+    """Запросы, которые выполняют роутеры и фоновые задачи, в том виде, в каком их строит код"""
+    now = datetime.now(timezone.utc)
+    queries = [
+        ("GET /tasks", build_page_query()),
+        ("GET /tasks/quadrant/{quadrant}", build_page_query(Task.quadrant == "Q1")),
+        ("GET /tasks/status/{status}", build_page_query(Task.completed == True)),  # noqa: E712
+        ("GET /tasks/{task_id}", select(Task).where(Task.id == 1)),
+        ("GET /stats (newly overdue)", newly_overdue_query(now - timedelta(minutes=1), now)),
+        ("requadrant tick", requadrant_statement(now, now - timedelta(minutes=1))),
+        ("GET /tasks/changes", changed_tasks_query((now, 0), 500)),
+        ("GET /tasks?include_archived=true", build_page_query(include_archived=True)),
+        (
+            "GET /tasks/quadrant/{quadrant}?include_archived=true",
+            build_page_query(Task.quadrant == "Q1", include_archived=True)
+        ),
+        ("archive batch", archive_candidates_query(now - timedelta(days=90), 1000)),
+        ("GET /tasks/agenda", agenda_query(now, 10)),
+    ]
+    if dialect_name == "postgresql":
+        queries.append(("GET /tasks/search", build_search_query(["отчёт"], 50)))
+        queries.append((
+            "GET /tasks/search?include_archived=true",
+            build_search_query(["отчёт"], 50, include_archived=True)
+        ))
+    return queries
+
+
+def _postgres_scans(plan: Dict[str, Any]) -> List[str]:
+    """Типы узлов плана, читающих таблицы tasks и tasks_archive"""
+    scans = []
+    if plan.get("Relation Name") in ("tasks", "tasks_archive"):
+        scans.append(plan["Node Type"])
+    for child in plan.get("Plans", []):
+        scans.extend(_postgres_scans(child))
+    return scans
+
+
+async def explain(db: AsyncSession, stmt: Any) -> Tuple[bool, str]:
+    """Возвращает (использует ли запрос индексы для таблиц задач, текст плана)"""
+    dialect = db.get_bind().dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+    if dialect.name == "postgresql":
+        raw = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar_one()
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+        scans = _postgres_scans(plan)
+        return bool(scans) and "Seq Scan" not in scans, ", ".join(scans)
+
+    rows = (await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+    details = [row[-1] for row in rows if "tasks" in row[-1]]
+    uses_index = bool(details) and all("USING" in detail for detail in details)
+    return uses_index, "; ".join(details)
+
+
+async def check_query_plans(db: AsyncSession, rows: int = 20000) -> List[Dict[str, Any]]:
+    """
+    Засевает таблицу задачами, собирает статистику планировщика и проверяет
+    через EXPLAIN, что каждый запрос роутеров идёт по индексу.
+    Все изменения откатываются.
+    """
+    try:
+        await seed_tasks(db, rows)
+        await seed_archive(db)
+        await db.execute(text("ANALYZE tasks, tasks_archive" if db.get_bind().dialect.name == "postgresql" else "ANALYZE"))
+
+        report = []
+        for name, stmt in router_queries(db.get_bind().dialect.name):
+            uses_index, plan = await explain(db, stmt)
+            report.append({"query": name, "uses_index": uses_index, "plan": plan})
+        return report
+    finally:
+        await db.rollback()
+
+
+def write_statements(dialect_name: str) -> List[Tuple[str, Any]]:
+    """Запросы изменения задач из роутеров /tasks и /tasks/batch (и группировки записей)"""
+    now = datetime.now(timezone.utc)
+    return [
+        ("POST /tasks, POST /tasks/batch", insert_statement()),
+        ("PUT /tasks/{task_id}", update_statement(dialect_name, 1, task_update_values({"title": ""}))),
+        ("PATCH /tasks/{task_id}/complete", update_statement(dialect_name, 1, complete_values(now))),
+        ("DELETE /tasks/{task_id}", delete_task_statement(1)),
+        ("PUT /tasks/batch (FOR UPDATE)", lock_rows_query([1])),
+        ("PATCH /tasks/batch/complete", complete_statement([1], now)),
+        ("POST /tasks/batch/delete", delete_statement([1])),
+    ]
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Update, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database import AsyncSessionLocal
+from models import Task
+from services.cache import invalidate_tasks
+from services.counters import TaskState, apply_counter_changes, read_counters, refresh_counters
+from services.events import publish_task_events, task_event
+from services.history import record_overdue_snapshot
+from services.sync import prune_tombstones
+from services.urgency import URGENCY_WINDOW, quadrant_case
+
+logger = logging.getLogger(__name__)
+
+# Период фонового пересчёта срочности (секунды); 0 отключает планировщик
+REQUADRANT_INTERVAL_SECONDS = float(os.getenv("REQUADRANT_INTERVAL_SECONDS", "60"))
+
+tasks_table = Task.__table__
+
+
+def requadrant_statement(now: datetime, since: Optional[datetime] = None) -> Update:
+    """
+    UPDATE ... RETURNING, который делает срочными задачи с дедлайном ближе URGENCY_WINDOW
+    и переводит их из Q2 в Q1 и из Q4 в Q3.
+
+    Если передан since (момент предыдущего прохода), рассматривается только
+    диапазон дедлайнов, переступивших порог с тех пор; без since — все задачи до порога.
+    """
+    conditions = [
+        tasks_table.c.is_urgent.is_(False),
+        tasks_table.c.deadline_at < now + URGENCY_WINDOW,
+    ]
+    if since is not None:
+        conditions.append(tasks_table.c.deadline_at >= since + URGENCY_WINDOW)
+
+    return (
+        update(tasks_table)
+        .where(*conditions)
+        .values(
+            is_urgent=True,
+            quadrant=quadrant_case(tasks_table.c.is_important, True)
+        )
+        .returning(*tasks_table.c)
+    )
+
+
+async def requadrant_due_tasks(
+        db: AsyncSession,
+        now: datetime,
+        since: Optional[datetime] = None
+) -> int:
+    """
+    Пересчитывает срочность одним UPDATE (см. requadrant_statement),
+    поправляет счётчики статистики и фиксирует транзакцию.
+    Возвращает число изменённых строк.
+    """
+    result = await db.execute(requadrant_statement(now, since))
+    rows = result.all()
+
+    # До прохода задача была несрочной, значит её квадрант был Q2 или Q4
+    changes = [
+        (
+            row.id,
+            TaskState("Q2" if row.is_important else "Q4", row.completed, row.deadline_at),
+            TaskState(row.quadrant, row.completed, row.deadline_at)
+        )
+        for row in rows
+    ]
+    await apply_counter_changes(db, [(before, after) for _, before, after in changes])
+    await publish_task_events(db, [task_event("updated", row._mapping) for row in rows])
+    await db.commit()
+    invalidate_tasks(changes)
+
+    return len(rows)
+
+
+class RequadrantScheduler:
+    """
+    Фоновая задача, которая раз в interval секунд пересчитывает срочность
+    и обслуживает счётчики статистики (refresh_counters), снимок просрочки для истории
+    (record_overdue_snapshot) и следы удалённых задач (prune_tombstones).
+    Состояние (число проходов, затронутых строк, ошибки) доступно в stats.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker = AsyncSessionLocal,
+            interval: float = REQUADRANT_INTERVAL_SECONDS
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._last_run_at: Optional[datetime] = None
+        self.stats = {
+            "interval_seconds": interval,
+            "running": False,
+            "runs": 0,
+            "errors": 0,
+            "rows_updated_total": 0,
+            "last_rows_updated": 0,
+            "last_run_at": None,
+            "last_duration_ms": None,
+            "last_error": None,
+        }
+
+    async def tick(self) -> int:
+        """Один проход планировщика"""
+        now = datetime.now(timezone.utc)
+        # Перекрытие на один период страхует от расхождения часов приложения и БД
+        since = self._last_run_at - timedelta(seconds=self.interval) if self._last_run_at else None
+
+        started = time.perf_counter()
+        async with self.session_factory() as db:
+            rows = await requadrant_due_tasks(db, now, since)
+            await refresh_counters(db)
+            overdue = (await read_counters(db))["overdue_tasks"]
+            await record_overdue_snapshot(db, overdue, now)
+            pruned = await prune_tombstones(db, now)
+            await db.commit()
+
+        self._last_run_at = now
+        self.stats.update(
+            runs=self.stats["runs"] + 1,
+            rows_updated_total=self.stats["rows_updated_total"] + rows,
+            last_rows_updated=rows,
+            last_run_at=now.isoformat(),
+            last_duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        if rows:
+            logger.info("Пересчёт срочности: обновлено задач %d", rows)
+        if pruned:
+            logger.info("Удалено устаревших следов удалённых задач: %d", pruned)
+        return rows
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = repr(exc)
+                logger.exception("Ошибка фонового пересчёта срочности")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="requadrant-scheduler")
+        self.stats["running"] = True
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.stats["running"] = False
+
+
+requadrant_scheduler = RequadrantScheduler()
@@ -0,0 +1,406 @@
+import asyncio
+import bisect
+import math
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DDL, Select, and_, event, func, literal_column, or_, select, union_all
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ArchivedTask, Task, TaskArchiveRollup, TaskTombstone
+from schemas import TaskResponse
+from services.pagination import TASK_FIELDS, pack_cursor, parse_fields, unpack_cursor
+from services.sync import SYNC_SETTLE_SECONDS
+
+# Конфигурация без стемминга: одинаково работает для русских и английских задач
+# и корректно обрабатывает поиск по префиксу
+SEARCH_CONFIG = "simple"
+
+tasks_table = Task.__table__
+archive_table = ArchivedTask.__table__
+
+
+def search_ddl(table: str) -> List[str]:
+    """Postgres: поддерживаемая базой колонка tsvector и GIN-индекс по ней для таблицы задач"""
+    return [
+        f"""
+    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('{SEARCH_CONFIG}', coalesce(title, '') || ' ' || coalesce(description, ''))
+        ) STORED
+    """,
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)",
+    ]
+
+
+# В рабочей базе их создают миграции 0002 (tasks) и 0008 (tasks_archive), здесь — для init_db (create_all)
+SEARCH_DDL = search_ddl(tasks_table.name)
+ARCHIVE_SEARCH_DDL = search_ddl(archive_table.name)
+
+for table, statements in ((tasks_table, SEARCH_DDL), (archive_table, ARCHIVE_SEARCH_DDL)):
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+search_vector = literal_column("tasks.search_vector", type_=TSVECTOR)
+archive_search_vector = literal_column("tasks_archive.search_vector", type_=TSVECTOR)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Разбивает текст на слова в нижнем регистре"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс в памяти процесса — запасной поиск для SQLite
+    и других баз без полнотекстового поиска.
+
+    Ранжирование BM25, поиск по префиксу для каждого слова запроса,
+    все слова запроса обязательны (как & в to_tsquery).
+    Индекс строится при первом поиске. Изменения своего процесса попадают в него сразу
+    (index_task, unindex_task), изменения других воркеров — перед каждым поиском (refresh).
+    Задачи из архива тоже в индексе, но находятся только с include_archived.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._build_lock = asyncio.Lock()
+        # До какого момента индекс знает об изменениях в базе и сколько задач было в архиве
+        self.synced_at: Optional[datetime] = None
+        self.archived_total: Optional[int] = None
+        self.clear()
+
+    def clear(self) -> None:
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Dict[str, int]] = {}
+        self._doc_length: Dict[int, int] = {}
+        self._total_length = 0
+        self._sorted_terms: List[str] = []
+        self._terms_dirty = False
+        self._archived: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, task_id: int, title: Optional[str], description: Optional[str], archived: bool = False) -> None:
+        """Добавляет или переиндексирует задачу (archived — задача из tasks_archive)"""
+        self.remove(task_id)
+        if archived:
+            self._archived.add(task_id)
+
+        terms: Dict[str, int] = defaultdict(int)
+        for token in tokenize(title) + tokenize(description):
+            terms[token] += 1
+
+        for term, frequency in terms.items():
+            if term not in self._postings:
+                self._terms_dirty = True
+            self._postings[term][task_id] = frequency
+
+        self._doc_terms[task_id] = dict(terms)
+        self._doc_length[task_id] = sum(terms.values())
+        self._total_length += self._doc_length[task_id]
+
+    def archive(self, task_id: int) -> None:
+        """Отмечает задачу перенесённой в архив"""
+        if task_id in self._doc_terms:
+            self._archived.add(task_id)
+
+    def remove(self, task_id: int) -> None:
+        self._archived.discard(task_id)
+        terms = self._doc_terms.pop(task_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(task_id, None)
+            if not postings:
+                del self._postings[term]
+                self._terms_dirty = True
+        self._total_length -= self._doc_length.pop(task_id)
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Все термы индекса, начинающиеся с prefix"""
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        end = bisect.bisect_left(self._sorted_terms, prefix + "\uffff")
+        return self._sorted_terms[start:end]
+
+    def search(self, query: str, include_archived: bool = False) -> List[Tuple[float, int]]:
+        """Возвращает [(score, task_id)] по убыванию релевантности, при равенстве — по id"""
+        tokens = tokenize(query)
+        if not tokens or not self._doc_terms:
+            return []
+
+        documents = len(self._doc_terms)
+        average_length = self._total_length / documents or 1.0
+        scores: Optional[Dict[int, float]] = None
+
+        for token in tokens:
+            token_scores: Dict[int, float] = defaultdict(float)
+            for term in self._expand(token):
+                postings = self._postings[term]
+                idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                for task_id, frequency in postings.items():
+                    length = self._doc_length[task_id]
+                    norm = frequency + self.K1 * (1 - self.B + self.B * length / average_length)
+                    token_scores[task_id] = max(
+                        token_scores[task_id],
+                        idf * frequency * (self.K1 + 1) / norm
+                    )
+
+            if scores is None:
+                scores = dict(token_scores)
+            else:
+                scores = {
+                    task_id: score + token_scores[task_id]
+                    for task_id, score in scores.items() if task_id in token_scores
+                }
+            if not scores:
+                return []
+
+        if not include_archived:
+            scores = {task_id: score for task_id, score in scores.items() if task_id not in self._archived}
+        return sorted(((score, task_id) for task_id, score in scores.items()), key=lambda item: (-item[0], item[1]))
+
+    async def build(self, db: AsyncSession, chunk_size: int = 5000) -> None:
+        """Строит индекс по задачам и архиву, читая таблицы порциями"""
+        async with self._build_lock:
+            if self.ready:
+                return
+            self.clear()
+            started = datetime.now(timezone.utc)
+            self.archived_total = await _archived_total(db)
+            result = await db.stream(
+                select(Task.id, Task.title, Task.description).execution_options(yield_per=chunk_size)
+            )
+            async for task_id, title, description in result:
+                self.add(task_id, title, description)
+            result = await db.stream(
+                select(ArchivedTask.id, ArchivedTask.title, ArchivedTask.description)
+                .execution_options(yield_per=chunk_size)
+            )
+            async for task_id, title, description in result:
+                self.add(task_id, title, description, archived=True)
+            self.synced_at = started
+            self.ready = True
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """
+        Подтягивает изменения других процессов с прошлой синхронизации: задачи по updated_at,
+        удаления по следам task_tombstones (оба запроса — по индексам), перенос в архив —
+        по task_archive_rollup (архив читается, только если итог изменился).
+        Окно смещено на SYNC_SETTLE_SECONDS назад, как у GET /tasks/changes: метку времени
+        строка получает до commit. Повторное добавление той же задачи безопасно.
+        """
+        async with self._build_lock:
+            now = datetime.now(timezone.utc)
+            since = self.synced_at - timedelta(seconds=SYNC_SETTLE_SECONDS)
+
+            changed = await db.execute(
+                select(Task.id, Task.title, Task.description).where(Task.updated_at >= since)
+            )
+            for task_id, title, description in changed:
+                self.add(task_id, title, description)
+
+            deleted = await db.execute(select(TaskTombstone.task_id).where(TaskTombstone.deleted_at >= since))
+            for task_id in deleted.scalars():
+                self.remove(task_id)
+
+            archived_total = await _archived_total(db)
+            if archived_total != self.archived_total:
+                archived = await db.execute(
+                    select(ArchivedTask.id, ArchivedTask.title, ArchivedTask.description)
+                    .where(ArchivedTask.archived_at >= since)
+                )
+                for task_id, title, description in archived:
+                    self.add(task_id, title, description, archived=True)
+                self.archived_total = archived_total
+
+            self.synced_at = now
+
+
+async def _archived_total(db: AsyncSession) -> Optional[int]:
+    return await db.scalar(select(TaskArchiveRollup.total_tasks))
+
+
+# Общий индекс процесса (используется, только если база не Postgres)
+search_index = InvertedIndex()
+
+
+def index_task(task_id: int, title: Optional[str], description: Optional[str]) -> None:
+    """Обновляет запасной индекс после создания или изменения задачи"""
+    if search_index.ready:
+        search_index.add(task_id, title, description)
+
+
+def unindex_task(task_id: int) -> None:
+    """Убирает удалённую задачу из запасного индекса"""
+    if search_index.ready:
+        search_index.remove(task_id)
+
+
+def archive_indexed_task(task_id: int) -> None:
+    """Отмечает в запасном индексе задачу, перенесённую в архив"""
+    if search_index.ready:
+        search_index.archive(task_id)
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """Разбирает курсор поиска обратно в (score, id); подделанный курсор — 400"""
+    score, task_id = unpack_cursor(cursor, 2)
+    if (
+            isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score)
+            or isinstance(task_id, bool) or not isinstance(task_id, int)
+    ):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return score, task_id
+
+
+def _serialize(rows: List[Dict[str, Any]], columns: Optional[List[str]], scores: List[float]) -> List[Dict[str, Any]]:
+    items = []
+    for row, score in zip(rows, scores):
+        if columns is None:
+            item = TaskResponse.model_validate(dict(row)).model_dump()
+        else:
+            item = {name: row[name] for name in columns}
+        item["score"] = score
+        items.append(item)
+    return items
+
+
+def _matches(table, vector, query, selected: List[str], position: Optional[Tuple[float, int]]) -> Tuple[Select, Any]:
+    """Совпадения в одной таблице (tasks или tasks_archive) после позиции (score, id) и выражение ранга"""
+    rank = func.ts_rank(vector, query)
+    stmt = select(*[table.c[name] for name in selected], table.c.id.label("_id"), rank.label("_score"))
+    stmt = stmt.where(vector.op("@@")(query))
+
+    if position is not None:
+        cursor_score, cursor_id = position
+        stmt = stmt.where(or_(rank < cursor_score, and_(rank == cursor_score, table.c.id > cursor_id)))
+    return stmt, rank
+
+
+def build_search_query(
+        tokens: List[str],
+        limit: int,
+        after: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        include_archived: bool = False
+) -> Select:
+    """
+    Postgres: поиск по search_vector с ранжированием ts_rank и курсором (score, id).
+    С include_archived совпадения из tasks_archive (свой search_vector и GIN-индекс)
+    добавляются через UNION ALL и ранжируются вместе с задачами.
+    """
+    # Каждое слово ищется по префиксу: "молок" найдёт "молоко"
+    query = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{token}:*" for token in tokens))
+    position = decode_search_cursor(after) if after is not None else None
+    selected = columns if columns is not None else list(TASK_FIELDS)
+
+    stmt, rank = _matches(tasks_table, search_vector, query, selected, position)
+    if not include_archived:
+        return stmt.order_by(rank.desc(), tasks_table.c.id).limit(limit + 1)
+
+    archived, _ = _matches(archive_table, archive_search_vector, query, selected, position)
+    found = union_all(stmt, archived).subquery("found")
+    return select(*found.c).order_by(found.c._score.desc(), found.c._id).limit(limit + 1)
+
+
+async def _search_postgres(
+        db: AsyncSession,
+        tokens: List[str],
+        limit: int,
+        after: Optional[str],
+        columns: Optional[List[str]],
+        include_archived: bool
+) -> Dict[str, Any]:
+    stmt = build_search_query(tokens, limit, after, columns, include_archived)
+    rows = (await db.execute(stmt)).mappings().all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = _serialize(rows, columns, [row["_score"] for row in rows])
+    next_cursor = pack_cursor(rows[-1]["_score"], rows[-1]["_id"]) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def _search_inverted(
+        db: AsyncSession,
+        query: str,
+        limit: int,
+        after: Optional[str],
+        columns: Optional[List[str]],
+        include_archived: bool
+) -> Dict[str, Any]:
+    if not search_index.ready:
+        await search_index.build(db)
+    else:
+        await search_index.refresh(db)
+
+    ranked = search_index.search(query, include_archived)
+    if after is not None:
+        cursor_score, cursor_id = decode_search_cursor(after)
+        ranked = [
+            (score, task_id) for score, task_id in ranked
+            if score < cursor_score or (score == cursor_score and task_id > cursor_id)
+        ]
+
+    has_more = len(ranked) > limit
+    ranked = ranked[:limit]
+    if not ranked:
+        return {"items": [], "next_cursor": None}
+
+    selected = columns if columns is not None else list(TASK_FIELDS)
+    ids = [task_id for _, task_id in ranked]
+    rows_by_id = {}
+    for table in (tasks_table, archive_table) if include_archived else (tasks_table,):
+        result = await db.execute(
+            select(*[table.c[name] for name in selected], table.c.id.label("_id"))
+            .where(table.c.id.in_([task_id for task_id in ids if task_id not in rows_by_id]))
+        )
+        rows_by_id.update({row["_id"]: row for row in result.mappings()})
+
+    # Задача могла быть удалена другим процессом — просто пропускаем её
+    ranked = [(score, task_id) for score, task_id in ranked if task_id in rows_by_id]
+    items = _serialize([rows_by_id[task_id] for _, task_id in ranked], columns, [score for score, _ in ranked])
+    next_cursor = pack_cursor(*ranked[-1]) if has_more and ranked else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def search_tasks_page(
+        db: AsyncSession,
+        q: str,
+        limit: int,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+        include_archived: bool = False
+) -> Dict[str, Any]:
+    """
+    Полнотекстовый поиск задач с ранжированием и keyset-пагинацией по (score, id).
+
+    Postgres: tsvector + GIN-индекс, ts_rank. Остальные базы: InvertedIndex в памяти.
+    Каждый элемент ответа дополнительно содержит поле score.
+    С include_archived ищутся и задачи из архива (только для чтения).
+    """
+    columns = parse_fields(fields)
+    tokens = tokenize(q)
+    if not tokens:
+        return {"items": [], "next_cursor": None}
+
+    if db.get_bind().dialect.name == "postgresql":
+        return await _search_postgres(db, tokens, limit, after, columns, include_archived)
+    return await _search_inverted(db, q, limit, after, columns, include_archived)
@@ -0,0 +1,41 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict
+
+import orjson
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def render_json(model: Any, data: Any) -> bytes:
+    """
+    Сериализует ответ так же, как FastAPI для response_model:
+    валидация моделью, JSON-режим pydantic и компактный json.dumps.
+    """
+    adapter = _adapter(model)
+    value = adapter.validate_python(data, from_attributes=True)
+    return json.dumps(
+        adapter.dump_python(value, mode="json"),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def render_task_page(page: Dict[str, Any]) -> bytes:
+    """
+    Быстрый путь для страниц paginate_tasks: строки уже собраны из колонок
+    в порядке полей TaskResponse, поэтому повторная валидация не нужна
+    и словарь сразу кодируется orjson.
+
+    Результат побайтно совпадает с render_json(TaskPage, page): строки,
+    bool, int, None и datetime (UTC как "Z") orjson пишет так же, как pydantic + json.dumps.
+    Числа с плавающей точкой (score в поиске) записываются иначе
+    ("1e-5" вместо "1e-05"), поэтому такие страницы идут через render_json.
+    """
+    return orjson.dumps(page, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task, TaskArchiveRollup
+
+QUADRANTS = ("Q1", "Q2", "Q3", "Q4")
+
+
+def _archived(column):
+    """Значение из строки итогов архива (0, если архиватор ещё не запускался)"""
+    return func.coalesce(select(func.sum(column)).scalar_subquery(), 0)
+
+
+async def compute_task_stats(db: AsyncSession, now: datetime | None = None) -> dict:
+    """
+    Считает статистику задач одним агрегирующим запросом.
+    По сети возвращается одна строка со счётчиками, а не вся таблица.
+
+    Задачи, перенесённые в архив, берутся из строки итогов task_archive_rollup
+    подзапросами в том же запросе (один снимок с таблицей tasks): все они
+    завершены и не просрочены.
+
+    Формат ответа совпадает с GET /api/v2/stats.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    pending = Task.completed.is_(False)
+
+    stmt = select(
+        func.count().label("total"),
+        *[
+            func.count().filter(Task.quadrant == quadrant).label(quadrant)
+            for quadrant in QUADRANTS
+        ],
+        func.count().filter(Task.completed.is_(True)).label("completed"),
+        func.count().filter(pending).label("pending"),
+        func.count().filter(
+            pending,
+            Task.deadline_at.is_not(None),
+            Task.deadline_at < now
+        ).label("overdue"),
+        _archived(TaskArchiveRollup.total_tasks).label("archived"),
+        *[
+            _archived(getattr(TaskArchiveRollup, quadrant.lower())).label(f"archived_{quadrant}")
+            for quadrant in QUADRANTS
+        ],
+    ).select_from(Task)
+
+    row = (await db.execute(stmt)).one()
+
+    return {
+        "total_tasks": row.total + row.archived,
+        "by_quadrant": {
+            quadrant: getattr(row, quadrant) + getattr(row, f"archived_{quadrant}")
+            for quadrant in QUADRANTS
+        },
+        "by_status": {"completed": row.completed + row.archived, "pending": row.pending},
+        "overdue_tasks": row.overdue
+    }
@@ -0,0 +1,146 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, and_, delete, insert, or_, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task, TaskTombstone
+from services.pagination import TASK_FIELDS, pack_cursor, unpack_cursor
+
+# Токен следующей синхронизации отстаёт от текущего момента на это время:
+# строка, которой updated_at проставили до commit (долгая транзакция, расхождение часов
+# воркеров, отставание реплики), попадёт в следующую синхронизацию. Повторы безопасны —
+# клиент применяет изменения по ID.
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "10"))
+# Сколько хранятся следы удалённых задач; более старый токен требует полной синхронизации
+SYNC_TOMBSTONE_RETENTION_DAYS = float(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+tombstones_table = TaskTombstone.__table__
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite отдаёт время без часового пояса; хранится всегда UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def encode_sync_token(changed_at: datetime, task_id: int) -> str:
+    """Позиция (время изменения, id) в ленте изменений"""
+    return pack_cursor("sync", changed_at.isoformat(), task_id)
+
+
+def decode_sync_token(token: str) -> Tuple[datetime, int]:
+    marker, changed_at, task_id = unpack_cursor(token, 3)
+    try:
+        if marker != "sync":
+            raise ValueError(marker)
+        return _as_utc(datetime.fromisoformat(changed_at)), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный токен синхронизации")
+
+
+def _upsert(db: AsyncSession):
+    """INSERT ... ON CONFLICT DO UPDATE там, где он есть: в SQLite-базах, созданных до AUTOINCREMENT, ID удалённой задачи мог достаться новой"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(tombstones_table)
+
+    stmt = dialect_insert(tombstones_table)
+    return stmt.on_conflict_do_update(
+        index_elements=[tombstones_table.c.task_id],
+        set_={"deleted_at": stmt.excluded.deleted_at}
+    )
+
+
+async def record_tombstones(db: AsyncSession, task_ids: Iterable[int], deleted_at: Optional[datetime] = None) -> None:
+    """Оставляет следы удалённых задач; вызывается в транзакции удаления"""
+    deleted_at = deleted_at or datetime.now(timezone.utc)
+    rows = [{"task_id": task_id, "deleted_at": deleted_at} for task_id in task_ids]
+    if rows:
+        await db.execute(_upsert(db), rows)
+
+
+async def prune_tombstones(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Удаляет следы старше SYNC_TOMBSTONE_RETENTION_DAYS (без commit)"""
+    now = now or datetime.now(timezone.utc)
+    result = await db.execute(
+        delete(tombstones_table)
+        .where(tombstones_table.c.deleted_at < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS))
+    )
+    return result.rowcount
+
+
+def _after(column, id_column, position: Optional[Tuple[datetime, int]]):
+    if position is None:
+        return true()
+    changed_at, task_id = position
+    return or_(column > changed_at, and_(column == changed_at, id_column > task_id))
+
+
+def changed_tasks_query(position: Optional[Tuple[datetime, int]], limit: int) -> Select:
+    """Задачи, изменённые после позиции (updated_at, id), по индексу ix_tasks_updated_at_id"""
+    return (
+        select(*[getattr(Task, name) for name in TASK_FIELDS])
+        .where(_after(Task.updated_at, Task.id, position))
+        .order_by(Task.updated_at, Task.id)
+        .limit(limit + 1)
+    )
+
+
+async def changes_page(
+        db: AsyncSession,
+        since: Optional[str],
+        limit: int,
+        settle_seconds: float = SYNC_SETTLE_SECONDS
+) -> Dict[str, Any]:
+    """
+    Изменённые задачи и ID удалённых после токена since (без since — все задачи).
+
+    Задачи (индекс по updated_at, id) и следы удалений (по deleted_at, task_id) читаются
+    двумя запросами по limit + 1 строке и сливаются по времени изменения.
+    Пока изменения не кончились, next_token указывает на последнее отданное изменение
+    и has_more=True. На последней странице next_token — момент now - settle_seconds,
+    поэтому недавние изменения придут ещё раз, но не потеряются.
+    """
+    now = datetime.now(timezone.utc)
+    position = decode_sync_token(since) if since else None
+    if position is not None and position[0] < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+        raise HTTPException(
+            status_code=410,
+            detail="Токен устарел: следы удалений уже очищены, выполните полную синхронизацию (без since)"
+        )
+
+    tasks = (await db.execute(changed_tasks_query(position, limit))).mappings().all()
+    tombstones = (await db.execute(
+        select(tombstones_table.c.task_id, tombstones_table.c.deleted_at)
+        .where(_after(tombstones_table.c.deleted_at, tombstones_table.c.task_id, position))
+        .order_by(tombstones_table.c.deleted_at, tombstones_table.c.task_id)
+        .limit(limit + 1)
+    )).all()
+
+    merged: List[Tuple[datetime, int, Optional[Dict[str, Any]]]] = sorted(
+        [(_as_utc(row["updated_at"]), row["id"], dict(row)) for row in tasks]
+        + [(_as_utc(row.deleted_at), row.task_id, None) for row in tombstones],
+        key=lambda item: (item[0], item[1])
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    if has_more:
+        next_token = encode_sync_token(merged[-1][0], merged[-1][1])
+    else:
+        next_token = encode_sync_token(now - timedelta(seconds=settle_seconds), 0)
+
+    return {
+        "tasks": [row for _, _, row in merged if row is not None],
+        "deleted": [task_id for _, task_id, row in merged if row is None],
+        "next_token": next_token,
+        "has_more": has_more,
+    }
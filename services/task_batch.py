@@ -0,0 +1,337 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Delete, Insert, Select, Update, case, delete, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from schemas import TaskCreate, TaskUpdate, TaskResponse
+from services.cache import invalidate_tasks
+from services.counters import apply_counter_changes, row_state
+from services.events import publish_task_events, task_event
+from services.sync import record_tombstones
+from services.urgency import calculate_urgency, calculate_quadrant
+from services.search import index_task, unindex_task
+
+tasks_table = Task.__table__
+
+# Поля, которые TaskUpdate может менять (плюс вычисляемые срочность и квадрант)
+UPDATABLE_FIELDS = tuple(TaskUpdate.model_fields) + ("is_urgent", "quadrant")
+
+REJECTED = "Не применено: пакет отклонён из-за ошибок в других элементах"
+
+
+def validation_error_text(exc: ValidationError) -> str:
+    """Ошибки pydantic одной строкой: поле: сообщение; ..."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def new_task_row(task: TaskCreate, now: datetime) -> Dict[str, Any]:
+    """Колонки новой задачи: срочность и квадрант считаются относительно now"""
+    is_urgent = calculate_urgency(task.deadline_at, now)
+    return {
+        "title": task.title,
+        "description": task.description,
+        "is_important": task.is_important,
+        "is_urgent": is_urgent,
+        "quadrant": calculate_quadrant(task.is_important, is_urgent),
+        "completed": False,
+        "deadline_at": task.deadline_at
+    }
+
+
+def _ok(index: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "ok": True,
+        "id": row["id"],
+        "task": TaskResponse.model_validate(row),
+        "error": None
+    }
+
+
+def _fail(index: int, error: str, task_id: int | None = None) -> Dict[str, Any]:
+    return {"index": index, "ok": False, "id": task_id, "task": None, "error": error}
+
+
+def _validate(items: List[Dict[str, Any]], model: Type[BaseModel]) -> Tuple[list, dict]:
+    """Валидирует элементы по отдельности: ошибка одного не роняет весь запрос"""
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as exc:
+            errors[index] = _fail(index, validation_error_text(exc), item.get("id") if isinstance(item, dict) else None)
+    return valid, errors
+
+
+def _reject_all(count: int, errors: dict) -> Tuple[List[Dict[str, Any]], bool]:
+    """Ответ для атомарного пакета с ошибками: ничего не применено"""
+    return [errors.get(index) or _fail(index, REJECTED) for index in range(count)], False
+
+
+def _dedupe_ids(pairs: List[Tuple[int, int]], errors: dict) -> List[Tuple[int, int]]:
+    """Оставляет первое вхождение каждого ID, повторы помечает ошибкой"""
+    seen, unique = set(), []
+    for index, task_id in pairs:
+        if task_id in seen:
+            errors[index] = _fail(index, "ID повторяется в пакете", task_id)
+        else:
+            seen.add(task_id)
+            unique.append((index, task_id))
+    return unique
+
+
+def insert_statement() -> Insert:
+    """Многострочный INSERT ... RETURNING новых задач (строки — параметрами execute)"""
+    return insert(tasks_table).returning(*tasks_table.c, sort_by_parameter_order=True)
+
+
+def lock_rows_query(ids: List[int]) -> Select:
+    """SELECT ... FOR UPDATE текущих строк пакета"""
+    return select(*tasks_table.c).where(tasks_table.c.id.in_(ids)).with_for_update()
+
+
+def complete_statement(ids: List[int], now: datetime) -> Update:
+    """UPDATE ... WHERE id IN (...) RETURNING, отмечающий задачи завершёнными"""
+    return (
+        update(tasks_table)
+        .where(tasks_table.c.id.in_(ids))
+        .values(completed=True, completed_at=now)
+        .returning(*tasks_table.c)
+    )
+
+
+def delete_statement(ids: List[int]) -> Delete:
+    """DELETE ... WHERE id IN (...) RETURNING"""
+    return delete(tasks_table).where(tasks_table.c.id.in_(ids)).returning(*tasks_table.c)
+
+
+async def _lock_rows(db: AsyncSession, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Читает текущие строки одним SELECT ... FOR UPDATE"""
+    result = await db.execute(lock_rows_query(ids))
+    return {row["id"]: dict(row) for row in result.mappings()}
+
+
+async def _finish(
+        db: AsyncSession,
+        count: int,
+        results: Dict[int, Dict[str, Any]],
+        errors: dict,
+        atomic: bool,
+        event_type: str
+) -> Tuple[List[Dict[str, Any]], bool]:
+    if atomic and errors:
+        await db.rollback()
+        return _reject_all(count, errors)
+
+    await publish_task_events(db, [
+        task_event(event_type, task_id=item["id"]) if event_type == "deleted"
+        else task_event(event_type, item["task"].model_dump())
+        for _, item in sorted(results.items())
+    ])
+    await db.commit()
+    results.update(errors)
+    return [results[index] for index in range(count)], True
+
+
+def _reindex(results: List[Dict[str, Any]]) -> None:
+    for item in results:
+        if item["ok"]:
+            index_task(item["id"], item["task"].title, item["task"].description)
+
+
+async def create_tasks(
+        db: AsyncSession,
+        items: List[Dict[str, Any]],
+        atomic: bool
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Создаёт задачи одним многострочным INSERT ... RETURNING.
+    Срочность и квадрант считаются за один проход относительно общего момента now.
+    """
+    valid, errors = _validate(items, TaskCreate)
+    if atomic and errors:
+        return _reject_all(len(items), errors)
+
+    now = datetime.now(timezone.utc)
+    rows = [new_task_row(task, now) for _, task in valid]
+
+    results, cache_changes = {}, []
+    if rows:
+        created = await db.execute(insert_statement(), rows)
+        created_rows = [dict(row) for row in created.mappings()]
+        await apply_counter_changes(db, [(None, row_state(row)) for row in created_rows])
+        results = {index: _ok(index, row) for (index, _), row in zip(valid, created_rows)}
+        cache_changes = [(row["id"], None, row_state(row)) for row in created_rows]
+
+    outcome, applied = await _finish(db, len(items), results, errors, atomic, "created")
+    if applied:
+        _reindex(outcome)
+        invalidate_tasks(cache_changes)
+    return outcome, applied
+
+
+async def update_tasks(
+        db: AsyncSession,
+        items: List[Dict[str, Any]],
+        atomic: bool
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Обновляет задачи: один SELECT ... FOR UPDATE за текущими строками
+    и один UPDATE ... SET col = CASE id ... END RETURNING на весь пакет.
+    Правила пересчёта срочности и квадранта те же, что в update_task.
+    """
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+            errors[index] = _fail(index, "id: обязательное целое поле")
+            continue
+        try:
+            update_data = TaskUpdate.model_validate(item).model_dump(exclude_unset=True)
+        except ValidationError as exc:
+            errors[index] = _fail(index, validation_error_text(exc), item["id"])
+            continue
+        valid.append((index, item["id"], update_data))
+
+    unique = set(_dedupe_ids([(index, task_id) for index, task_id, _ in valid], errors))
+    valid = [entry for entry in valid if (entry[0], entry[1]) in unique]
+    if atomic and errors:
+        return _reject_all(len(items), errors)
+
+    current = await _lock_rows(db, [task_id for _, task_id, _ in valid]) if valid else {}
+
+    now = datetime.now(timezone.utc)
+    changes, new_rows = [], {}
+    for index, task_id, update_data in valid:
+        row = current.get(task_id)
+        if row is None:
+            errors[index] = _fail(index, "Задача не найдена", task_id)
+            continue
+
+        new_row = dict(row)
+        new_row.update(update_data)
+        if "deadline_at" in update_data:
+            new_row["is_urgent"] = calculate_urgency(new_row["deadline_at"], now)
+        if "is_important" in update_data or "deadline_at" in update_data:
+            new_row["quadrant"] = calculate_quadrant(new_row["is_important"], new_row["is_urgent"])
+
+        changes.append((task_id, row_state(row), row_state(new_row)))
+        new_rows[task_id] = (index, new_row)
+
+    if atomic and errors:
+        await db.rollback()
+        return _reject_all(len(items), errors)
+
+    results = {}
+    if new_rows:
+        id_column = tasks_table.c.id
+        values = {
+            name: case(
+                {
+                    task_id: literal(new_row[name], tasks_table.c[name].type)
+                    for task_id, (_, new_row) in new_rows.items()
+                },
+                value=id_column,
+                else_=tasks_table.c[name]
+            )
+            for name in UPDATABLE_FIELDS
+        }
+        updated = await db.execute(
+            update(tasks_table)
+            .where(id_column.in_(list(new_rows)))
+            .values(**values)
+            .returning(*tasks_table.c)
+        )
+        await apply_counter_changes(db, [(before, after) for _, before, after in changes])
+        for row in updated.mappings():
+            index = new_rows[row["id"]][0]
+            results[index] = _ok(index, dict(row))
+
+    outcome, applied = await _finish(db, len(items), results, errors, atomic, "updated")
+    if applied:
+        _reindex(outcome)
+        invalidate_tasks(changes)
+    return outcome, applied
+
+
+async def complete_tasks(
+        db: AsyncSession,
+        ids: List[int],
+        atomic: bool
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Отмечает задачи завершёнными одним UPDATE ... WHERE id IN (...) RETURNING"""
+    errors = {}
+    pairs = _dedupe_ids(list(enumerate(ids)), errors)
+    if atomic and errors:
+        return _reject_all(len(ids), errors)
+
+    current = await _lock_rows(db, [task_id for _, task_id in pairs])
+    for index, task_id in pairs:
+        if task_id not in current:
+            errors[index] = _fail(index, "Задача не найдена", task_id)
+
+    if atomic and errors:
+        await db.rollback()
+        return _reject_all(len(ids), errors)
+
+    results, cache_changes = {}, []
+    if current:
+        updated = await db.execute(complete_statement(list(current), datetime.now(timezone.utc)))
+        updated_rows = {row["id"]: dict(row) for row in updated.mappings()}
+        cache_changes = [
+            (task_id, row_state(current[task_id]), row_state(row))
+            for task_id, row in updated_rows.items()
+        ]
+        await apply_counter_changes(db, [(before, after) for _, before, after in cache_changes])
+        results = {
+            index: _ok(index, updated_rows[task_id])
+            for index, task_id in pairs if task_id in updated_rows
+        }
+
+    outcome, applied = await _finish(db, len(ids), results, errors, atomic, "completed")
+    if applied:
+        invalidate_tasks(cache_changes)
+    return outcome, applied
+
+
+async def delete_tasks(
+        db: AsyncSession,
+        ids: List[int],
+        atomic: bool
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Удаляет задачи одним DELETE ... RETURNING.
+    Предварительный SELECT не нужен: RETURNING отдаёт удалённые строки для счётчиков.
+    """
+    errors = {}
+    pairs = _dedupe_ids(list(enumerate(ids)), errors)
+    if atomic and errors:
+        return _reject_all(len(ids), errors)
+
+    deleted = await db.execute(delete_statement([task_id for _, task_id in pairs]))
+    deleted_rows = {row["id"]: dict(row) for row in deleted.mappings()}
+
+    results = {}
+    for index, task_id in pairs:
+        row = deleted_rows.get(task_id)
+        if row is None:
+            errors[index] = _fail(index, "Задача не найдена", task_id)
+        else:
+            results[index] = _ok(index, row)
+
+    if not (atomic and errors):
+        await record_tombstones(db, deleted_rows)
+        await apply_counter_changes(db, [(row_state(row), None) for row in deleted_rows.values()])
+
+    outcome, applied = await _finish(db, len(ids), results, errors, atomic, "deleted")
+    if applied:
+        for item in outcome:
+            if item["ok"]:
+                unindex_task(item["id"])
+        invalidate_tasks((task_id, row_state(row), None) for task_id, row in deleted_rows.items())
+    return outcome, applied
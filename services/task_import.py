@@ -0,0 +1,234 @@
+import csv
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from schemas import TaskCreate
+from services.cache import invalidate_tasks
+from services.counters import apply_counter_changes, row_state
+from services.events import publish_task_events, task_event
+from services.search import index_task
+from services.task_batch import new_task_row, validation_error_text
+
+logger = logging.getLogger(__name__)
+
+tasks_table = Task.__table__
+
+# Сколько строк валидируется и записывается за раз (каждый кусок — отдельная транзакция)
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+# Сколько ошибочных строк попадает в отчёт (считаются все)
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Колонки, которые заполняет импорт; id и created_at — значения по умолчанию в базе
+IMPORT_COLUMNS = ("title", "description", "is_important", "is_urgent", "quadrant", "completed", "deadline_at")
+
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+@dataclass
+class ImportReport:
+    """Ход и итог импорта"""
+    read: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.imported / self.seconds if self.seconds > 0 else 0.0
+
+    def add_error(self, line: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "read": self.read,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Режет поток байтов на строки (номер строки, байты без перевода строки)"""
+    pending, number = b"", 0
+    async for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            number += 1
+            yield number, line.rstrip(b"\r")
+    if pending.strip():
+        yield number + 1, pending.rstrip(b"\r")
+
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    async for number, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield number, None, f"некорректный JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "строка должна быть JSON-объектом"
+            continue
+        yield number, record, None
+
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """
+    CSV с заголовком. Запись может занимать несколько строк (перевод строки в кавычках):
+    строки копятся, пока число кавычек нечётное.
+    Пустые значения становятся None, лишние колонки (например, id из выгрузки) игнорируются.
+    """
+    header, buffer, start = None, [], 0
+    async for number, line in _lines(chunks):
+        try:
+            text = line.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError as exc:
+            yield number, None, f"некорректная кодировка (нужна UTF-8): {exc}"
+            continue
+
+        if not buffer:
+            start = number
+        buffer.append(text)
+        record_text = "\n".join(buffer)
+        if record_text.count('"') % 2:
+            continue
+        buffer = []
+        if not record_text.strip():
+            continue
+
+        try:
+            values = next(csv.reader([record_text]))
+        except csv.Error as exc:
+            yield start, None, f"некорректная строка CSV: {exc}"
+            continue
+
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield start, None, f"ожидалось колонок: {len(header)}, получено: {len(values)}"
+            continue
+        yield start, {name: value if value != "" else None for name, value in zip(header, values)}, None
+
+    if buffer:
+        yield start, None, "незакрытая кавычка в конце файла"
+
+
+async def _load_rows(db: AsyncSession, rows: List[Dict[str, Any]]) -> Optional[List[int]]:
+    """
+    Записывает строки куска. PostgreSQL — COPY через asyncpg (copy_records_to_table)
+    в транзакции сессии; ID при этом не возвращаются. Остальные базы — многострочный INSERT.
+
+    Драйвер asyncpg в SQLAlchemy открывает транзакцию (BEGIN) только перед первым запросом
+    через сессию, а COPY идёт мимо неё: вызывающий должен выполнить запрос до _load_rows,
+    иначе COPY зафиксируется сам по себе, отдельно от остальной записи куска.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            tasks_table.name,
+            records=[tuple(row[name] for name in IMPORT_COLUMNS) for row in rows],
+            columns=list(IMPORT_COLUMNS)
+        )
+        return None
+
+    result = await db.execute(
+        insert(tasks_table).returning(tasks_table.c.id, sort_by_parameter_order=True),
+        rows
+    )
+    return list(result.scalars())
+
+
+async def _write_chunk(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Один кусок — одна транзакция: изменения счётчиков, строки задач и событие.
+    UPDATE счётчиков идёт первым: он открывает транзакцию до COPY (см. _load_rows);
+    кусок не пуст, поэтому total_tasks меняется и UPDATE выполняется всегда.
+    """
+    states = [row_state(row) for row in rows]
+    await apply_counter_changes(db, [(None, state) for state in states])
+    ids = await _load_rows(db, rows)
+    # Одно событие на кусок: подписчикам проще перечитать списки, чем разбирать тысячи событий
+    await publish_task_events(db, [task_event("imported")])
+    await db.commit()
+
+    if ids is not None:
+        for task_id, row in zip(ids, rows):
+            index_task(task_id, row["title"], row["description"])
+    invalidate_tasks((None, None, state) for state in set(states))
+
+
+async def import_tasks(
+        db: AsyncSession,
+        chunks: AsyncIterator[bytes],
+        import_format: str,
+        chunk_rows: int = IMPORT_CHUNK_ROWS,
+        on_progress: Optional[Callable[[ImportReport], None]] = None
+) -> ImportReport:
+    """
+    Импортирует задачи из потока NDJSON или CSV.
+
+    Строки валидируются по TaskCreate и копятся в кусок по chunk_rows; срочность и квадрант
+    считаются теми же функциями, что и в POST /tasks, относительно одного момента на кусок.
+    Ошибочные строки пропускаются и попадают в отчёт с номером строки входных данных.
+    Уже записанные куски остаются в базе, если импорт прервался.
+    """
+    records = _csv_records(chunks) if import_format == "csv" else _ndjson_records(chunks)
+    report = ImportReport()
+    started = time.perf_counter()
+    pending: List[TaskCreate] = []
+
+    async def flush() -> None:
+        now = datetime.now(timezone.utc)
+        rows = [new_task_row(task, now) for task in pending]
+        await _write_chunk(db, rows)
+        report.imported += len(rows)
+        report.seconds = time.perf_counter() - started
+        pending.clear()
+        logger.info(
+            "Импорт задач: записано %d, ошибок %d, %.0f строк/с",
+            report.imported, report.failed, report.rows_per_second
+        )
+        if on_progress is not None:
+            on_progress(report)
+
+    async for number, record, error in records:
+        report.read += 1
+        if error is not None:
+            report.add_error(number, error)
+            continue
+        try:
+            pending.append(TaskCreate.model_validate(record))
+        except ValidationError as exc:
+            report.add_error(number, validation_error_text(exc))
+            continue
+        if len(pending) >= chunk_rows:
+            await flush()
+
+    if pending:
+        await flush()
+
+    report.seconds = time.perf_counter() - started
+    return report
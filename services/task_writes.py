@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Delete, Update, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from services.counters import TaskState, row_state
+from services.urgency import calculate_urgency, quadrant_case
+
+tasks_table = Task.__table__
+
+# Колонки, от которых зависят счётчики: их значения до изменения нужны вместе с новой строкой
+STATE_COLUMNS = ("quadrant", "completed", "deadline_at")
+
+
+def task_update_values(update_data: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Значения SET для UPDATE задачи по полям TaskUpdate.
+    Срочность считается по новому дедлайну, квадрант — CASE по колонкам строки,
+    если важность или срочность не передавались (правила те же, что в calculate_quadrant).
+    """
+    values = dict(update_data)
+
+    if "deadline_at" in update_data:
+        values["is_urgent"] = calculate_urgency(update_data["deadline_at"], now)
+
+    if "is_important" in update_data or "deadline_at" in update_data:
+        values["quadrant"] = quadrant_case(
+            values.get("is_important", tasks_table.c.is_important),
+            values.get("is_urgent", tasks_table.c.is_urgent)
+        )
+
+    return values
+
+
+def update_with_old_state(task_id: int, values: Dict[str, Any]) -> Update:
+    """
+    UPDATE ... FROM (SELECT ... FOR UPDATE) для PostgreSQL: новая строка и колонки состояния
+    до изменения (old_quadrant, old_completed, old_deadline_at) одним запросом
+    """
+    old = (
+        select(tasks_table.c.id, *[tasks_table.c[name] for name in STATE_COLUMNS])
+        .where(tasks_table.c.id == task_id)
+        .with_for_update()
+        .subquery("old")
+    )
+    return (
+        update(tasks_table)
+        .where(tasks_table.c.id == old.c.id)
+        .values(**values)
+        .returning(*tasks_table.c, *[old.c[name].label(f"old_{name}") for name in STATE_COLUMNS])
+    )
+
+
+def update_statement(dialect_name: str, task_id: int, values: Dict[str, Any]) -> Update:
+    """
+    UPDATE задачи, который выполняет update_task_returning: в PostgreSQL — update_with_old_state,
+    в остальных базах — UPDATE ... RETURNING новой строки
+    """
+    if dialect_name == "postgresql":
+        return update_with_old_state(task_id, values)
+    return (
+        update(tasks_table)
+        .where(tasks_table.c.id == task_id)
+        .values(**values)
+        .returning(*tasks_table.c)
+    )
+
+
+def complete_values(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Значения SET для завершения задачи"""
+    return {"completed": True, "completed_at": now or datetime.now(timezone.utc)}
+
+
+async def update_task_returning(
+        db: AsyncSession,
+        task_id: int,
+        values: Dict[str, Any]
+) -> Optional[Tuple[Dict[str, Any], TaskState]]:
+    """
+    Обновляет задачу одним UPDATE ... RETURNING без предварительного SELECT.
+    Возвращает (строку после изменения, состояние до изменения) или None, если задачи нет.
+
+    В PostgreSQL старые значения приходят из того же запроса (update_with_old_state).
+    SQLite не разрешает ссылаться в RETURNING на таблицы из FROM, поэтому там старое
+    состояние читается отдельным SELECT (локальный файл, без сетевого round trip).
+
+    Один запрос — только сама задача: счётчики (apply_counter_changes), дневные итоги
+    и pg_notify вызывающий пишет следующими запросами той же транзакции.
+    """
+    if not values:
+        row = (await db.execute(select(*tasks_table.c).where(tasks_table.c.id == task_id))).mappings().one_or_none()
+        return (dict(row), row_state(row)) if row is not None else None
+
+    if db.get_bind().dialect.name == "postgresql":
+        result = await db.execute(update_statement("postgresql", task_id, values))
+        row = result.mappings().one_or_none()
+        if row is None:
+            return None
+        before = TaskState(row["old_quadrant"], bool(row["old_completed"]), row["old_deadline_at"])
+        return {column.name: row[column.name] for column in tasks_table.c}, before
+
+    current = (await db.execute(
+        select(*[tasks_table.c[name] for name in STATE_COLUMNS]).where(tasks_table.c.id == task_id)
+    )).mappings().one_or_none()
+    if current is None:
+        return None
+
+    result = await db.execute(update_statement(db.get_bind().dialect.name, task_id, values))
+    return dict(result.mappings().one()), row_state(current)
+
+
+async def complete_task_returning(db: AsyncSession, task_id: int) -> Optional[Tuple[Dict[str, Any], TaskState]]:
+    """Отмечает задачу завершенной; результат как у update_task_returning"""
+    return await update_task_returning(db, task_id, complete_values())
+
+
+def delete_statement(task_id: int) -> Delete:
+    """DELETE задачи с RETURNING id, title и колонок состояния"""
+    return (
+        delete(tasks_table)
+        .where(tasks_table.c.id == task_id)
+        .returning(tasks_table.c.id, tasks_table.c.title, *[tasks_table.c[name] for name in STATE_COLUMNS])
+    )
+
+
+async def delete_task_returning(db: AsyncSession, task_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Удаляет задачу одним DELETE ... RETURNING.
+    Возвращает id, title и колонки состояния удалённой строки или None, если задачи нет.
+    """
+    result = await db.execute(delete_statement(task_id))
+    row = result.mappings().one_or_none()
+    return dict(row) if row is not None else None
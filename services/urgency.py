@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import ColumnElement, and_, case, literal
+
+# Задача срочная, если до дедлайна осталось меньше этого времени
+URGENCY_WINDOW = timedelta(days=3)
+
+
+def calculate_urgency(deadline_at: datetime | None, now: datetime | None = None) -> bool:
+    """
+    Определяет срочность задачи на основе дедлайна.
+    Возвращает True если дедлайн меньше 3 дней от текущего момента.
+
+    Args:
+        deadline_at: Дедлайн задачи (с timezone или без)
+        now: Момент, относительно которого считается срочность (по умолчанию — текущий).
+             Пакетные операции передают одно значение на весь пакет.
+
+    Returns:
+        bool: True если срочно (< 3 дней), False в остальных случаях
+    """
+    if deadline_at is None:
+        return False
+
+    # Получаем текущее время с timezone
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    # Если deadline без timezone, добавляем UTC
+    if deadline_at.tzinfo is None:
+        deadline_at = deadline_at.replace(tzinfo=timezone.utc)
+
+    # Разница между дедлайном и текущим временем
+    time_until_deadline = deadline_at - now
+
+    # Срочно если осталось меньше 3 дней
+    return time_until_deadline < URGENCY_WINDOW
+
+
+def calculate_quadrant(is_important: bool, is_urgent: bool) -> str:
+    """Определяет квадрант по матрице Эйзенхауэра"""
+    if is_important and is_urgent:
+        return "Q1"
+    elif is_important and not is_urgent:
+        return "Q2"
+    elif not is_important and is_urgent:
+        return "Q3"
+    else:
+        return "Q4"
+
+
+def quadrant_case(is_important: Any, is_urgent: Any) -> ColumnElement:
+    """
+    SQL-аналог calculate_quadrant для UPDATE. Аргументы — колонки
+    (значения строки до изменения) или уже известные bool;
+    известные значения подставляются сразу, чтобы CASE остался коротким.
+    """
+    if isinstance(is_important, bool) and isinstance(is_urgent, bool):
+        return literal(calculate_quadrant(is_important, is_urgent))
+    if isinstance(is_urgent, bool):
+        return case(
+            (is_important, calculate_quadrant(True, is_urgent)),
+            else_=calculate_quadrant(False, is_urgent)
+        )
+    if isinstance(is_important, bool):
+        return case(
+            (is_urgent, calculate_quadrant(is_important, True)),
+            else_=calculate_quadrant(is_important, False)
+        )
+    return case(
+        (and_(is_important, is_urgent), "Q1"),
+        (is_important, "Q2"),
+        (is_urgent, "Q3"),
+        else_="Q4"
+    )
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Dialect
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from database import DB_POOL_MIN_CONNECTIONS, engine, replica_engines
+from services.metrics import Gauge, registry
+from services.query_plans import router_queries, write_statements
+
+logger = logging.getLogger(__name__)
+
+# Прогрев при запуске: открыть соединения пула и скомпилировать запросы роутеров до первых запросов
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Период фоновой проверки базы для /health (секунды); 0 — проверка на каждый вызов /health
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "5"))
+# Сколько ждать ответа базы при проверке (секунды)
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+
+# Длительность этапов запуска (секунды) для /metrics: import, connections, statements, startup
+startup_timings: Dict[str, float] = {}
+
+
+async def fill_pool(target: AsyncEngine, connections: int) -> int:
+    """
+    Открывает до connections соединений одновременно, проверяет каждое SELECT 1
+    и возвращает их в пул. Больше pool_size пул не удержит, поэтому значение ограничено им.
+    """
+    size = getattr(target.pool, "size", lambda: 1)()
+    connections = max(min(connections, size), 0)
+    results = await asyncio.gather(*(target.connect() for _ in range(connections)), return_exceptions=True)
+    opened = [result for result in results if not isinstance(result, BaseException)]
+    try:
+        for connection in opened:
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            await connection.close()
+    if len(opened) < len(results):
+        raise next(result for result in results if isinstance(result, BaseException))
+    return len(opened)
+
+
+def is_plain_select(stmt: Any) -> bool:
+    """SELECT без FOR UPDATE: его выполнение ничего не меняет и не блокирует строки"""
+    return bool(getattr(stmt, "is_select", False)) and getattr(stmt, "_for_update_arg", None) is None
+
+
+def compile_statements(dialect: Dialect, statements: List[Tuple[str, Any]]) -> int:
+    """
+    Компилирует запросы диалектом базы, не выполняя их: так готовятся изменяющие запросы
+    (UPDATE, DELETE, INSERT, SELECT ... FOR UPDATE) — их выполнение при запуске писало бы
+    в основную базу и брало блокировки в каждом воркере. Возвращает число скомпилированных запросов.
+    """
+    compiled = 0
+    for name, stmt in statements:
+        try:
+            stmt.compile(dialect=dialect)
+            compiled += 1
+        except Exception as exc:
+            logger.warning("Прогрев: запрос %s не скомпилирован: %r", name, exc)
+    return compiled
+
+
+async def warm_statements(target: AsyncEngine, statements: List[Tuple[str, Any]]) -> int:
+    """
+    Выполняет чтения роутеров и фоновых задач через сессию этого движка: SQLAlchemy
+    кладёт скомпилированный SQL в кэш движка, база читает нужные страницы индексов.
+    Изменяющие запросы не выполняются (см. compile_statements). Транзакция откатывается.
+    Возвращает число успешных запросов.
+    """
+    warmed = 0
+    async with AsyncSession(bind=target) as db:
+        for name, stmt in statements:
+            if not is_plain_select(stmt):
+                logger.warning("Прогрев: запрос %s изменяет данные и не выполняется", name)
+                continue
+            try:
+                (await db.execute(stmt)).all()
+                warmed += 1
+            except Exception as exc:
+                await db.rollback()
+                logger.warning("Прогрев: запрос %s не выполнен: %r", name, exc)
+        await db.rollback()
+    return warmed
+
+
+async def warm_up(connections: int = DB_POOL_MIN_CONNECTIONS) -> Dict[str, Any]:
+    """
+    Прогрев основной базы и реплик перед готовностью приложения: пул заполняется до connections
+    проверенных соединений, чтения из router_queries выполняются по разу, а изменяющие запросы
+    (фоновые UPDATE, SELECT ... FOR UPDATE архиватора, записи роутеров из write_statements)
+    только компилируются. Первые запросы после деплоя не платят за установку соединений и компиляцию SQL.
+    """
+    engines = [engine, *replica_engines]
+    report: Dict[str, Any] = {"engines": len(engines)}
+
+    started = time.perf_counter()
+    opened = await asyncio.gather(*(fill_pool(target, connections) for target in engines))
+    report["connections"] = sum(opened)
+    startup_timings["connections"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    statements = router_queries(engine.dialect.name)
+    reads = [(name, stmt) for name, stmt in statements if is_plain_select(stmt)]
+    writes = [(name, stmt) for name, stmt in statements if not is_plain_select(stmt)]
+    writes += write_statements(engine.dialect.name)
+    # Реплики обслуживают только чтения роутеров; чтения фоновых задач идут в основную базу
+    router_reads = [(name, stmt) for name, stmt in reads if name.startswith("GET")]
+    plans = [(engine, reads)] + [(replica, router_reads) for replica in replica_engines]
+    warmed = await asyncio.gather(*(warm_statements(target, queries) for target, queries in plans))
+    compiled = compile_statements(engine.dialect, writes)
+    report["statements"] = sum(warmed)
+    report["compiled"] = compiled
+    report["statements_failed"] = (
+        sum(len(queries) for _, queries in plans) - sum(warmed) + len(writes) - compiled
+    )
+    startup_timings["statements"] = time.perf_counter() - started
+
+    report["connections_ms"] = round(startup_timings["connections"] * 1000, 1)
+    report["statements_ms"] = round(startup_timings["statements"] * 1000, 1)
+    return report
+
+
+class HealthProber:
+    """
+    Фоновая проверка базы для /health: раз в interval секунд SELECT 1 с таймаутом timeout.
+    /health отдаёт последний результат и не открывает сессию на каждый вызов,
+    поэтому частые проверки балансировщика не занимают пул. При interval = 0 база
+    проверяется на каждый вызов, как раньше.
+    """
+
+    def __init__(
+            self,
+            target: AsyncEngine = engine,
+            interval: float = HEALTH_PROBE_INTERVAL_SECONDS,
+            timeout: float = HEALTH_PROBE_TIMEOUT_SECONDS
+    ) -> None:
+        self.target = target
+        self.interval = interval
+        self.timeout = timeout
+        self._task: Optional[asyncio.Task] = None
+        self.last: Optional[Dict[str, Any]] = None
+        self.stats = {
+            "interval_seconds": interval,
+            "running": False,
+            "probes": 0,
+            "failures": 0,
+            "last_error": None,
+        }
+
+    async def probe(self) -> Dict[str, Any]:
+        """Одна проверка базы; результат запоминается в last"""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._select_one(), self.timeout)
+            db_status = "connected"
+        except Exception as exc:
+            db_status = "disconnected"
+            self.stats["failures"] += 1
+            self.stats["last_error"] = repr(exc)
+
+        self.stats["probes"] += 1
+        self.last = {
+            "status": "healthy",
+            "database": db_status,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        return self.last
+
+    async def _select_one(self) -> None:
+        async with self.target.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def result(self) -> Dict[str, Any]:
+        """Последний результат проверки; без фоновой проверки — новая проверка"""
+        if self._task is None or self.last is None:
+            return await self.probe()
+        return self.last
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка фоновой проверки базы")
+
+    async def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        await self.probe()
+        self._task = asyncio.create_task(self._run(), name="health-prober")
+        self.stats["running"] = True
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.stats["running"] = False
+
+
+health_prober = HealthProber()
+
+
+def _startup_state() -> List[Tuple[Dict[str, str], float]]:
+    return [({"phase": phase}, round(seconds, 6)) for phase, seconds in startup_timings.items()]
+
+
+registry.register(Gauge(
+    "app_startup_seconds",
+    "Длительность этапов запуска: import (импорт приложения), connections и statements (прогрев), startup (lifespan)",
+    _startup_state
+))
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database import AsyncSessionLocal
+from schemas import TaskCreate, TaskResponse
+from services.metrics import COUNT_BUCKETS, Histogram, registry
+from services.task_batch import complete_tasks, create_tasks
+
+logger = logging.getLogger(__name__)
+
+# Группировка записей: POST /tasks и PATCH /tasks/{id}/complete из разных запросов
+# записываются одним многострочным запросом и одним COMMIT (по умолчанию выключена)
+WRITE_COALESCE_ENABLED = os.getenv("WRITE_COALESCE_ENABLED", "false").lower() == "true"
+# Сколько ждать попутчиков после первой операции пакета (секунды)
+WRITE_COALESCE_WINDOW_SECONDS = float(os.getenv("WRITE_COALESCE_WINDOW_SECONDS", "0.002"))
+# Пакет записывается сразу, набрав столько операций
+WRITE_COALESCE_MAX_BATCH = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "200"))
+# Сколько пакетов одного вида пишется одновременно; пока они пишутся, копится следующий
+WRITE_COALESCE_FLUSHERS = int(os.getenv("WRITE_COALESCE_FLUSHERS", "1"))
+
+write_coalesce_batch_size = registry.register(Histogram(
+    "write_coalesce_batch_size", "Операций в одном сгруппированном пакете записи", COUNT_BUCKETS
+))
+write_coalesce_wait_seconds = registry.register(Histogram(
+    "write_coalesce_wait_seconds", "Время от постановки операции в пакет до её результата (окно, очередь и запись)"
+))
+
+Pending = Tuple[Any, asyncio.Future]
+BatchWriter = Callable[[AsyncSession, List[Any]], Awaitable[List[Dict[str, Any]]]]
+
+
+async def _write_created(db: AsyncSession, tasks: List[TaskCreate]) -> List[Dict[str, Any]]:
+    outcome, _ = await create_tasks(db, [task.model_dump() for task in tasks], atomic=False)
+    return outcome
+
+
+async def _write_completed(db: AsyncSession, ids: List[int]) -> List[Dict[str, Any]]:
+    outcome, _ = await complete_tasks(db, ids, atomic=False)
+    return outcome
+
+
+class WriteCoalescer:
+    """
+    Групповая запись (group commit) одиночных созданий и завершений задач.
+
+    Операция встаёт в пакет своего вида; пакет записывается через window секунд после
+    первой операции или сразу, набрав max_batch. Запись — те же create_tasks и
+    complete_tasks, что у /tasks/batch (atomic=False): один INSERT/UPDATE ... RETURNING,
+    счётчики, события и один COMMIT на пакет. Каждый вызывающий получает свою задачу
+    или свою ошибку (404 для несуществующей задачи). Если пакет упал целиком (ошибка базы),
+    его операции повторяются по одной, чтобы ошибка досталась только своему запросу.
+    """
+
+    def __init__(
+            self,
+            session_factory: async_sessionmaker = AsyncSessionLocal,
+            window: float = WRITE_COALESCE_WINDOW_SECONDS,
+            max_batch: int = WRITE_COALESCE_MAX_BATCH,
+            flushers: int = WRITE_COALESCE_FLUSHERS,
+            enabled: bool = WRITE_COALESCE_ENABLED
+    ) -> None:
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self.enabled = enabled
+        self._writers: Dict[str, BatchWriter] = {"create": _write_created, "complete": _write_completed}
+        self._pending: Dict[str, List[Pending]] = {kind: [] for kind in self._writers}
+        self._timers: Dict[str, Optional[asyncio.TimerHandle]] = {kind: None for kind in self._writers}
+        self._flushers = {kind: asyncio.Semaphore(flushers) for kind in self._writers}
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def create(self, task: TaskCreate) -> TaskResponse:
+        item = await self._submit("create", task)
+        if not item["ok"]:
+            raise HTTPException(status_code=400, detail=item["error"])
+        return item["task"]
+
+    async def complete(self, task_id: int) -> TaskResponse:
+        item = await self._submit("complete", task_id)
+        if not item["ok"]:
+            raise HTTPException(status_code=404, detail=item["error"])
+        return item["task"]
+
+    async def _submit(self, kind: str, value: Any) -> Dict[str, Any]:
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        pending = self._pending[kind]
+        pending.append((value, waiter))
+        if len(pending) >= self.max_batch:
+            self._flush(kind)
+        elif self._timers[kind] is None:
+            self._timers[kind] = asyncio.get_running_loop().call_later(self.window, self._flush, kind)
+
+        try:
+            return await waiter
+        finally:
+            write_coalesce_wait_seconds.observe(time.perf_counter() - started, operation=kind)
+
+    def _flush(self, kind: str) -> None:
+        """Забирает накопленный пакет и запускает его запись"""
+        timer = self._timers[kind]
+        if timer is not None:
+            timer.cancel()
+            self._timers[kind] = None
+
+        batch, self._pending[kind] = self._pending[kind], []
+        if not batch:
+            return
+        flush = asyncio.create_task(self._write(kind, batch), name=f"write-coalescer-{kind}")
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
+
+    async def _write(self, kind: str, batch: List[Pending]) -> None:
+        async with self._flushers[kind]:
+            write_coalesce_batch_size.observe(len(batch), operation=kind)
+            try:
+                await self._write_group(kind, batch)
+            except Exception as exc:
+                if len(batch) == 1:
+                    _settle(batch[0][1], exc)
+                    return
+                logger.warning("Пакет записи %s (%d операций) не записан, повтор по одной: %r", kind, len(batch), exc)
+                for pending in batch:
+                    try:
+                        await self._write_group(kind, [pending])
+                    except Exception as single_exc:
+                        _settle(pending[1], single_exc)
+
+    async def _write_group(self, kind: str, batch: List[Pending]) -> None:
+        # Одна и та же задача в пакете завершений пишется один раз, результат получают все её запросы
+        values = list(dict.fromkeys(value for value, _ in batch)) if kind == "complete" else [value for value, _ in batch]
+        async with self.session_factory() as db:
+            outcome = await self._writers[kind](db, values)
+
+        if kind == "complete":
+            by_id = {value: item for value, item in zip(values, outcome)}
+            results = [by_id[value] for value, _ in batch]
+        else:
+            results = outcome
+        for (_, waiter), item in zip(batch, results):
+            _settle(waiter, item)
+
+    async def stop(self) -> None:
+        """Записывает накопленные операции и дожидается пакетов в работе"""
+        for kind in self._writers:
+            self._flush(kind)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+def _settle(waiter: asyncio.Future, result: Any) -> None:
+    # Клиент мог уйти, не дождавшись: операция всё равно записана
+    if waiter.done():
+        return
+    if isinstance(result, BaseException):
+        waiter.set_exception(result)
+    else:
+        waiter.set_result(result)
+
+
+write_coalescer = WriteCoalescer()
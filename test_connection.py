@@ -10,7 +10,9 @@ from sqlalchemy import text
 
 
 async def test_connection():
-    print("🔍 Проверка подключения к PostgreSQL через Supabase...")
+    is_postgres = engine.dialect.name == "postgresql"
+    target = "PostgreSQL через Supabase" if is_postgres else f"SQLite ({engine.url.database or 'в памяти'})"
+    print(f"🔍 Проверка подключения к {target}...")
 
     try:
         # Пытаемся подключиться
@@ -23,16 +25,20 @@ async def test_connection():
 
         print("\n✅ ВСЕ ПРОВЕРКИ ПРОЙДЕНЫ!")
         print("💡 База данных готова к работе.")
-        print("\n⚠️ ВНИМАНИЕ: Создайте таблицы вручную через Supabase SQL Editor")
-        print("   (см. инструкции в README.md)")
+        if is_postgres:
+            print("\n⚠️ ВНИМАНИЕ: Создайте таблицы вручную через Supabase SQL Editor")
+            print("   (см. инструкции в README.md)")
+        else:
+            print("\n💡 Таблицы SQLite создаются при запуске приложения (DB_CREATE_SCHEMA)")
 
     except Exception as e:
         print(f"\n❌ ОШИБКА ПОДКЛЮЧЕНИЯ:")
         print(f"   {e}")
         print("\nПроверьте:")
         print("   1. Правильно ли указан DATABASE_URL в .env")
-        print("   2. Доступен ли интернет")
-        print("   3. Работает ли Supabase проект")
+        if is_postgres:
+            print("   2. Доступен ли интернет")
+            print("   3. Работает ли Supabase проект")
 
     finally:
         # Закрываем соединение
@@ -0,0 +1,73 @@
+"""
+Общие фикстуры тестов. Каждый тест работает со своей базой SQLite (файл во временной папке),
+схема создаётся по моделям. Асинхронные тесты запускает плагин anyio (зависимость FastAPI):
+модули помечаются pytestmark = pytest.mark.anyio.
+
+Запуск из корня проекта:
+    python -m pytest -q
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+# Приложению нужен DATABASE_URL при импорте; тесты не трогают базу из .env
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite://"
+
+import httpx  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+
+import database  # noqa: E402
+from models import Base  # noqa: E402
+from services.cache import response_cache  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def database_url(tmp_path: Path) -> str:
+    return f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+async def test_engine(database_url: str):
+    """Движок на файле SQLite с таблицами по моделям (с теми же замерами, что у рабочего движка)"""
+    engine = database.create_engine(database_url, "test")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(test_engine) -> async_sessionmaker:
+    return async_sessionmaker(test_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+async def client(session_factory):
+    """
+    HTTP-клиент приложения (без lifespan): сессии записи и чтения — на тестовой базе,
+    кэш ответов очищается, чтобы тесты не видели ответов друг друга
+    """
+    from main import app
+
+    async def get_test_session():
+        async with session_factory() as session:
+            yield session
+
+    overrides = {
+        database.get_async_session: get_test_session,
+        database.get_read_session: get_test_session,
+        database.get_read_session_factory: lambda: session_factory,
+    }
+    app.dependency_overrides.update(overrides)
+    response_cache.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+    for dependency in overrides:
+        app.dependency_overrides.pop(dependency, None)
+    response_cache.clear()
@@ -0,0 +1,74 @@
+"""
+Задачи в архиве: видны с include_archived, но только для чтения — PUT, PATCH и DELETE
+отвечают 404 и архив не меняют. Это же сказано в описании эндпоинтов и схемы ответа.
+Поиск с include_archived находит и задачи из архива.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services.archive import archive_batch
+from services.search import build_search_query, search_index
+
+pytestmark = pytest.mark.anyio
+
+BASE = "/api/v2/tasks"
+
+
+async def test_archived_task_is_read_only(client, session_factory):
+    task = (await client.post(f"{BASE}/", json={"title": "В архив", "is_important": True})).json()
+    assert (await client.patch(f"{BASE}/{task['id']}/complete")).status_code == 200
+    async with session_factory() as db:
+        assert await archive_batch(db, datetime.now(timezone.utc) + timedelta(days=1)) == 1
+
+    url = f"{BASE}/{task['id']}"
+    assert (await client.get(url)).status_code == 404
+    archived = await client.get(url, params={"include_archived": "true"})
+    assert archived.status_code == 200 and archived.json()["completed"] is True
+
+    assert (await client.put(url, json={"title": "Изменить"})).status_code == 404
+    assert (await client.patch(f"{url}/complete")).status_code == 404
+    assert (await client.delete(url)).status_code == 404
+    assert (await client.get(url, params={"include_archived": "true"})).json()["title"] == "В архив"
+
+
+async def test_read_only_archive_is_documented(client):
+    schema = (await client.get("/openapi.json")).json()
+    paths = schema["paths"]
+    for method in ("put", "delete"):
+        assert "только для чтения" in paths["/api/v2/tasks/{task_id}"][method]["description"]
+    assert "только для чтения" in paths["/api/v2/tasks/{task_id}/complete"]["patch"]["description"]
+    assert "только для чтения" in schema["components"]["schemas"]["TaskResponse"]["description"]
+
+
+@pytest.mark.parametrize("indexed_before_archiving", [True, False])
+async def test_search_include_archived(client, session_factory, indexed_before_archiving):
+    search_index.ready = False
+    search_index.clear()
+    active = (await client.post(f"{BASE}/", json={"title": "Отчёт текущий", "is_important": True})).json()
+    done = (await client.post(f"{BASE}/", json={"title": "Отчёт прошлый", "is_important": True})).json()
+    assert (await client.patch(f"{BASE}/{done['id']}/complete")).status_code == 200
+    if indexed_before_archiving:
+        assert len((await client.get(f"{BASE}/search", params={"q": "отчёт"})).json()["items"]) == 2
+
+    async with session_factory() as db:
+        assert await archive_batch(db, datetime.now(timezone.utc) + timedelta(days=1)) == 1
+
+    found = (await client.get(f"{BASE}/search", params={"q": "отчёт"})).json()["items"]
+    assert [item["id"] for item in found] == [active["id"]]
+    found = (await client.get(f"{BASE}/search", params={"q": "отчёт", "include_archived": "true"})).json()["items"]
+    assert sorted(item["id"] for item in found) == [active["id"], done["id"]]
+    assert next(item for item in found if item["id"] == done["id"])["completed"] is True
+    # Только архив
+    found = (await client.get(f"{BASE}/search", params={"q": "прошлый", "include_archived": "true"})).json()
+    assert [item["id"] for item in found["items"]] == [done["id"]]
+    search_index.ready = False
+    search_index.clear()
+
+
+def test_postgresql_search_unions_archive():
+    sql = str(build_search_query(["отчёт"], 10, include_archived=True).compile(dialect=postgresql.dialect()))
+    assert "UNION ALL" in sql
+    assert "tasks_archive.search_vector @@" in sql and "tasks.search_vector @@" in sql
+    assert "ORDER BY found._score DESC, found._id" in sql
@@ -0,0 +1,67 @@
+"""
+Обслуживание счётчиков статистики: refresh_counters сдвигает отметку просрочки
+под блокировкой строки счётчиков и досчитывает задачи, просрочившиеся с прошлой отметки.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert, update
+from sqlalchemy.dialects import postgresql
+
+from models import Task, TaskCounters
+from services.counters import (
+    COUNTER_ROW_ID, apply_counter_changes, read_counters, rebuild_counters, refresh_counters, row_state
+)
+from services.stats import compute_task_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_refresh_counts_newly_overdue_tasks(session_factory):
+    now = datetime.now(timezone.utc)
+    async with session_factory() as db:
+        await rebuild_counters(db)
+        await db.execute(
+            update(TaskCounters).where(TaskCounters.id == COUNTER_ROW_ID)
+            .values(overdue_watermark=now - timedelta(hours=3))
+        )
+
+        rows = [
+            {"title": f"Задача {number}", "quadrant": "Q1", "is_important": True, "is_urgent": True,
+             "completed": number % 3 == 0, "deadline_at": now - timedelta(hours=2, minutes=number)}
+            for number in range(10)
+        ]
+        result = await db.execute(insert(Task).returning(Task.quadrant, Task.completed, Task.deadline_at), rows)
+        await apply_counter_changes(db, [(None, row_state(row)) for row in result.mappings()])
+        await db.commit()
+
+        await refresh_counters(db)
+        assert not db.in_transaction()
+
+        counters = await db.get(TaskCounters, COUNTER_ROW_ID, populate_existing=True)
+        assert counters.overdue == sum(1 for row in rows if not row["completed"])
+        assert counters.overdue_watermark.replace(tzinfo=timezone.utc) >= now
+        assert await read_counters(db) == await compute_task_stats(db)
+
+
+async def test_refresh_locks_counter_row_before_counting(session_factory):
+    async with session_factory() as db:
+        await rebuild_counters(db)
+        await db.execute(
+            update(TaskCounters).where(TaskCounters.id == COUNTER_ROW_ID)
+            .values(overdue_watermark=datetime.now(timezone.utc) - timedelta(hours=1))
+        )
+        await db.commit()
+
+        # Запросы в порядке выполнения, как их увидит PostgreSQL (SQLite FOR UPDATE не выводит)
+        statements = []
+
+        @event.listens_for(db.sync_session, "do_orm_execute")
+        def remember(orm_execute_state):
+            statements.append(str(orm_execute_state.statement.compile(dialect=postgresql.dialect())))
+
+        await refresh_counters(db)
+
+        assert "FROM task_counters" in statements[0] and "FOR UPDATE" in statements[0]
+        assert "count(*)" in statements[1]
+        assert statements[2].startswith("UPDATE task_counters")
@@ -0,0 +1,145 @@
+"""
+Потоковая выгрузка GET /tasks/export: 1M задач (вместе с архивом, то есть через UNION ALL
+из ordered_tasks_query) читаются серверным курсором, а пик памяти Python (tracemalloc)
+остаётся ограниченным и не зависит от размера выгрузки.
+
+Приложение вызывается напрямую по ASGI: httpx.ASGITransport собирает тело ответа целиком
+и сам занял бы память, пропорциональную выгрузке. Число строк — EXPORT_TEST_ROWS.
+"""
+import asyncio
+import os
+import time
+import tracemalloc
+
+import orjson
+import pytest
+from sqlalchemy import event, text
+
+from services.cache import response_cache
+from services.pagination import TASK_FIELDS
+
+pytestmark = pytest.mark.anyio
+
+EXPORT_TEST_ROWS = int(os.getenv("EXPORT_TEST_ROWS", "1000000"))
+# Доля строк, которая лежит в архиве
+ARCHIVED_EVERY = 10
+# Пик памяти Python во время выгрузки: несколько кусков по EXPORT_CHUNK_ROWS, а не вся таблица
+PEAK_MEMORY_LIMIT = 16 * 1024 * 1024
+
+TASK_COLUMNS = "id, title, description, is_important, is_urgent, quadrant, completed, created_at, completed_at, updated_at, deadline_at"
+# Строки генерирует сам SQLite (рекурсивный CTE): вставка 1M строк через Python заняла бы минуты
+GENERATED_ROWS = f"""
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows)
+SELECT i, 'Задача ' || i, CASE WHEN i % 3 = 0 THEN 'Описание, с "кавычками"' END,
+       i % 2, (i / 2) % 2, 'Q' || (1 + i % 4), i % {ARCHIVED_EVERY} = 0,
+       datetime('2025-01-01', '+' || i || ' seconds') || '.000000',
+       CASE WHEN i % {ARCHIVED_EVERY} = 0 THEN '2025-02-01 00:00:00.000000' END,
+       '2025-03-01 00:00:00.000000', NULL
+FROM n
+"""
+
+
+async def seed(test_engine, rows: int) -> None:
+    async with test_engine.begin() as connection:
+        await connection.execute(
+            text(f"INSERT INTO tasks ({TASK_COLUMNS}) SELECT * FROM ({GENERATED_ROWS}) WHERE i % {ARCHIVED_EVERY} != 0"),
+            {"rows": rows}
+        )
+        await connection.execute(
+            text(f"INSERT INTO tasks_archive ({TASK_COLUMNS}, archived_at) "
+                 f"SELECT *, '2025-04-01 00:00:00.000000' FROM ({GENERATED_ROWS}) WHERE i % {ARCHIVED_EVERY} = 0"),
+            {"rows": rows}
+        )
+
+
+async def export(app, query: str, on_chunk) -> int:
+    """Выполняет GET /api/v2/tasks/export?query по ASGI; тело отдаётся on_chunk по кускам. Возвращает статус"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/v2/tasks/export", "raw_path": b"/api/v2/tasks/export", "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"test")], "client": ("127.0.0.1", 1), "server": ("test", 80),
+    }
+    status = {}
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Клиент «отключается» только после конца ответа
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                on_chunk(message["body"])
+            if not message.get("more_body"):
+                finished.set()
+
+    await app(scope, receive, send)
+    return status["code"]
+
+
+@pytest.fixture
+def export_app(session_factory, monkeypatch):
+    from main import app
+    import database
+
+    app.dependency_overrides[database.get_read_session_factory] = lambda: session_factory
+    monkeypatch.setattr(response_cache, "max_entries", 0)
+    yield app
+    app.dependency_overrides.pop(database.get_read_session_factory, None)
+
+
+async def test_export_streams_million_rows_in_bounded_memory(export_app, test_engine):
+    await seed(test_engine, EXPORT_TEST_ROWS)
+
+    cursors = []
+
+    def remember_cursor(conn, cursor, statement, parameters, context, executemany):
+        if "UNION ALL" in statement:
+            cursors.append(getattr(cursor, "server_side", False))
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", remember_cursor)
+    totals = {"bytes": 0, "lines": 0, "last": b""}
+
+    def consume(chunk: bytes) -> None:
+        totals["bytes"] += len(chunk)
+        totals["lines"] += chunk.count(b"\n")
+        totals["last"] = chunk
+
+    started = time.perf_counter()
+    tracemalloc.start()
+    try:
+        status = await export(export_app, "format=ndjson&include_archived=true", consume)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        event.remove(test_engine.sync_engine, "before_cursor_execute", remember_cursor)
+    elapsed = time.perf_counter() - started
+
+    assert status == 200
+    assert totals["lines"] == EXPORT_TEST_ROWS
+    assert orjson.loads(totals["last"].splitlines()[-1])["id"] == EXPORT_TEST_ROWS
+    # UNION ALL с архивом читается серверным курсором, а не fetchall
+    assert cursors == [True]
+    assert peak < PEAK_MEMORY_LIMIT, (
+        f"пик памяти {peak / 2**20:.1f} МБ при выгрузке {totals['bytes'] / 2**20:.0f} МБ за {elapsed:.1f} с"
+    )
+
+
+async def test_csv_export_filters_and_header(export_app, test_engine):
+    await seed(test_engine, 100)
+    body = []
+    status = await export(export_app, "format=csv&status=completed&include_archived=true", body.append)
+
+    assert status == 200
+    lines = b"".join(body).decode().splitlines()
+    assert lines[0].split(",") == list(TASK_FIELDS)
+    # Завершённые задачи есть только в архиве (каждая ARCHIVED_EVERY-я)
+    assert len(lines) - 1 == 100 // ARCHIVED_EVERY
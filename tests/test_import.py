@@ -0,0 +1,136 @@
+"""
+Импорт задач POST /tasks/import: разбор NDJSON и CSV (записи в несколько строк, BOM),
+ошибочные строки в отчёте с номерами строк входных данных, запись кусками
+(каждый кусок — одна транзакция) и счётчики статистики после импорта.
+"""
+from itertools import groupby
+from typing import AsyncIterator, List
+
+import orjson
+import pytest
+from sqlalchemy import event, func, select
+
+from models import Task
+from services.counters import rebuild_counters, reconcile_counters
+from services.task_import import import_tasks
+
+pytestmark = pytest.mark.anyio
+
+BASE = "/api/v2/tasks"
+
+
+async def body(data: bytes, size: int = 7) -> AsyncIterator[bytes]:
+    """Тело запроса кусками по size байт: границы кусков режут строки и символы UTF-8"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def ndjson(*records) -> bytes:
+    return b"".join(
+        (record if isinstance(record, bytes) else orjson.dumps(record)) + b"\n" for record in records
+    )
+
+
+async def titles(session_factory) -> List[str]:
+    async with session_factory() as db:
+        return list((await db.execute(select(Task.title).order_by(Task.id))).scalars())
+
+
+async def test_ndjson_reports_bad_rows_and_imports_valid_ones(session_factory):
+    data = ndjson(
+        {"title": "Первая", "is_important": True},
+        b"{not json",
+        {"title": "Вторая", "is_important": False, "deadline_at": "2020-01-01T00:00:00Z"},
+        b"",
+        b"[1, 2]",
+        {"title": "", "is_important": True},
+        {"title": "Третья", "is_important": False},
+    )
+    async with session_factory() as db:
+        report = await import_tasks(db, body(data), "ndjson")
+
+    assert (report.read, report.imported, report.failed) == (6, 3, 3)
+    # Пустая строка 4 пропускается, но нумерацию не сбивает
+    assert [error["line"] for error in report.errors] == [2, 5, 6]
+    assert "JSON" in report.errors[0]["error"] and "title" in report.errors[2]["error"]
+    assert await titles(session_factory) == ["Первая", "Вторая", "Третья"]
+
+
+async def test_csv_with_bom_and_quoted_newline(session_factory):
+    data = (
+        '﻿id,title,description,is_important,deadline_at\r\n'
+        '1,Простая,,true,\r\n'
+        '2,"С переводом\r\nстроки","Описание, с ""кавычками""\nи ещё строкой",false,\r\n'
+        '3,Лишняя колонка,,true,,x\r\n'
+        '4,Неверная важность,,maybe,\r\n'
+        '5,Последняя,,false,2030-01-01T00:00:00Z'
+    ).encode()
+    async with session_factory() as db:
+        report = await import_tasks(db, body(data), "csv")
+
+    assert (report.read, report.imported, report.failed) == (5, 3, 2)
+    # Запись 2 занимает строки 3-5: следующие номера — по строкам файла
+    assert [error["line"] for error in report.errors] == [6, 7]
+    async with session_factory() as db:
+        rows = (await db.execute(select(Task).order_by(Task.id))).scalars().all()
+    assert [row.title for row in rows] == ["Простая", "С переводом\nстроки", "Последняя"]
+    assert rows[1].description == 'Описание, с "кавычками"\nи ещё строкой'
+    assert rows[0].description is None
+
+
+async def test_unclosed_quote_is_reported(session_factory):
+    data = 'title,is_important\nНормальная,true\n"Сломанная,true\n'.encode()
+    async with session_factory() as db:
+        report = await import_tasks(db, body(data), "csv")
+    assert report.imported == 1
+    assert report.errors == [{"line": 3, "error": "незакрытая кавычка в конце файла"}]
+
+
+async def test_chunks_are_separate_transactions_and_counters_match(session_factory, test_engine):
+    async with session_factory() as db:
+        await rebuild_counters(db)
+
+    statements = []
+
+    def remember(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()[:3]).upper())
+
+    def remember_commit(conn):
+        statements.append("COMMIT")
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", remember)
+    event.listen(test_engine.sync_engine, "commit", remember_commit)
+    records = [
+        {"title": f"Задача {number}", "is_important": number % 2 == 0,
+         "completed": number % 3 == 0, "deadline_at": "2020-01-01T00:00:00Z" if number % 4 == 0 else None}
+        for number in range(10)
+    ]
+    try:
+        async with session_factory() as db:
+            report = await import_tasks(db, body(ndjson(*records), 64), "ndjson", chunk_rows=4)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", remember)
+        event.remove(test_engine.sync_engine, "commit", remember_commit)
+
+    assert report.imported == 10
+    # Куски 4 + 4 + 2, каждый — одна транзакция. Строки задач пишутся последними:
+    # запросы счётчиков перед ними открывают транзакцию до COPY на PostgreSQL
+    # (SQLite выполняет INSERT ... RETURNING с порядком параметров построчно — повторы схлопываются)
+    transaction = ["INSERT INTO TASK_DAILY_STATS", "UPDATE TASK_COUNTERS SET", "INSERT INTO TASKS", "COMMIT"]
+    assert [statement for statement, _ in groupby(statements)] == transaction * 3
+
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(Task)) == 10
+        assert await reconcile_counters(db, fix=False) == {}
+
+
+async def test_import_endpoint(client):
+    response = await client.post(
+        f"{BASE}/import?format=csv", content="title,is_important\nИз CSV,true\n,false\n".encode()
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["imported"], result["failed"]) == (1, 1)
+    assert result["errors"][0]["line"] == 3
+
+    assert (await client.post(f"{BASE}/import?format=xml", content=b"")).status_code == 400
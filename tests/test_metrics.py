@@ -0,0 +1,38 @@
+"""
+Замеры SQL для /metrics: время каждого запроса и счётчики HTTP-запроса (RequestStats)
+остаются верными после запроса, упавшего в базе.
+"""
+import pytest
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import OperationalError
+
+from models import Task
+from services.metrics import RequestStats, current_request_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_statement_does_not_shift_timings(session_factory):
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    try:
+        async with session_factory() as db:
+            await db.execute(insert(Task), [{"title": f"Задача {n}", "quadrant": "Q4"} for n in range(3)])
+            with pytest.raises(OperationalError):
+                await db.execute(text("SELECT * FROM no_such_table"))
+            await db.rollback()
+
+            await db.execute(insert(Task), [{"title": f"Задача {n}", "quadrant": "Q4"} for n in range(3)])
+            result = await db.execute(update(Task).values(completed=True))
+            assert result.rowcount == 3
+            await db.commit()
+
+            connection = await db.connection()
+            assert not (await connection.get_raw_connection()).info.get("query_started")
+    finally:
+        current_request_stats.reset(token)
+
+    # INSERT, упавший SELECT, INSERT и UPDATE; строки — по rowcount изменений
+    assert stats.queries == 4
+    assert stats.rows == 3 + 3 + 3
+    assert stats.db_seconds > 0
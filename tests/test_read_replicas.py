@@ -0,0 +1,102 @@
+"""
+Чтение с реплик: две базы SQLite — основная и реплика. GET-эндпоинты читают с реплики,
+после записи клиент на READ_YOUR_WRITES_SECONDS закрепляется за основной базой
+(cookie read_primary_until), а когда срок проходит — снова читает с реплик по кругу.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Request
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import database
+from models import Base, Task
+from services.cache import response_cache
+
+pytestmark = pytest.mark.anyio
+
+BASE = "/api/v2/tasks"
+STICKY_SECONDS = 0.5
+
+
+@pytest.fixture
+async def replica_factory(tmp_path):
+    """Вторая база — «реплика» со своей задачей, по которой видно, откуда пришёл ответ"""
+    engine = database.create_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", "test-replica")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(Task).values(title="С реплики", quadrant="Q4"))
+    yield async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def routed_client(session_factory, replica_factory, monkeypatch):
+    """Клиент приложения: записи — в основную базу, чтения — через настоящий get_read_session"""
+    from main import app
+
+    router = database.read_router
+    monkeypatch.setattr(router, "primary", session_factory)
+    monkeypatch.setattr(router, "replicas", [replica_factory])
+    monkeypatch.setattr(router, "sticky_seconds", STICKY_SECONDS)
+    # Ответы не кэшируются: каждое чтение должно дойти до базы
+    monkeypatch.setattr(response_cache, "max_entries", 0)
+    response_cache.clear()
+
+    async def get_primary_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[database.get_async_session] = get_primary_session
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+    app.dependency_overrides.pop(database.get_async_session, None)
+    response_cache.clear()
+
+
+async def titles(client: httpx.AsyncClient) -> list:
+    response = await client.get(BASE)
+    assert response.status_code == 200
+    return [task["title"] for task in response.json()["items"]]
+
+
+async def test_reads_follow_writes_then_return_to_replica(routed_client):
+    # Без записей — чтение с реплики
+    assert await titles(routed_client) == ["С реплики"]
+
+    response = await routed_client.post(f"{BASE}/", json={"title": "В основной", "is_important": True})
+    assert response.status_code == 201
+    assert database.PRIMARY_STICKY_COOKIE in response.cookies
+
+    # Сразу после записи клиент видит свою задачу: чтение с основной базы
+    assert await titles(routed_client) == ["В основной"]
+    assert await titles(routed_client) == ["В основной"]
+
+    # Срок cookie прошёл — снова реплика
+    await asyncio.sleep(STICKY_SECONDS + 0.1)
+    assert await titles(routed_client) == ["С реплики"]
+
+    # Клиент без cookie (другой пользователь) читает с реплики и сразу после чужой записи
+    routed_client.cookies.clear()
+    await routed_client.post(f"{BASE}/", json={"title": "Ещё одна"})
+    routed_client.cookies.clear()
+    assert await titles(routed_client) == ["С реплики"]
+
+
+async def test_failed_write_does_not_pin_to_primary(routed_client):
+    response = await routed_client.put(f"{BASE}/999", json={"title": "Нет такой"})
+    assert response.status_code == 404
+    assert database.PRIMARY_STICKY_COOKIE not in response.cookies
+    assert await titles(routed_client) == ["С реплики"]
+
+
+async def test_replicas_are_used_round_robin(session_factory, replica_factory):
+    other_replica = async_sessionmaker()
+    router = database.ReadRouter(session_factory, [replica_factory, other_replica])
+    request = Request({"type": "http", "headers": []})
+
+    assert [router.choose(request) for _ in range(4)] == [
+        (replica_factory, True), (other_replica, True), (replica_factory, True), (other_replica, True)
+    ]
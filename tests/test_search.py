@@ -0,0 +1,118 @@
+"""
+Полнотекстовый поиск GET /tasks/search на SQLite (запасной InvertedIndex): ранжирование,
+поиск по префиксу, поле score, keyset-пагинация по (score, id) и проверка курсора.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, update
+
+from models import Task
+from services import archive
+from services.pagination import pack_cursor
+from services.search import build_search_query, search_index
+from services.sync import record_tombstones
+
+pytestmark = pytest.mark.anyio
+
+BASE = "/api/v2/tasks"
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """Индекс общий на процесс: каждый тест строит его по своей базе"""
+    search_index.ready = False
+    search_index.clear()
+    yield
+    search_index.ready = False
+    search_index.clear()
+
+
+async def create(client, title: str, description: str | None = None) -> int:
+    response = await client.post(
+        f"{BASE}/", json={"title": title, "description": description, "is_important": False}
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+async def search(client, q: str, **params):
+    return await client.get(f"{BASE}/search", params={"q": q, **params})
+
+
+async def test_ranking_prefix_and_score(client):
+    rare = await create(client, "alpha", "alpha alpha")
+    common = await create(client, "alpha beta gamma delta", "epsilon zeta eta theta iota")
+    await create(client, "совсем другое", "ничего общего")
+
+    response = await search(client, "alpha")
+    assert response.status_code == 200
+    items = response.json()["items"]
+    # Чаще встречается в коротком тексте — выше
+    assert [item["id"] for item in items] == [rare, common]
+    assert items[0]["score"] > items[1]["score"] > 0
+
+    # Каждое слово ищется по префиксу, все слова обязательны
+    assert [item["id"] for item in (await search(client, "alp")).json()["items"]] == [rare, common]
+    assert [item["id"] for item in (await search(client, "alp bet")).json()["items"]] == [common]
+    assert (await search(client, "omega")).status_code == 404
+
+
+async def test_pagination_has_no_duplicates_or_gaps(client):
+    ids = [await create(client, f"report {'word ' * number}", "report") for number in range(7)]
+    await create(client, "unrelated")
+
+    seen, scores, after = [], [], None
+    while True:
+        params = {"limit": 3, **({"after": after} if after else {})}
+        page = (await search(client, "report", **params)).json()
+        seen += [item["id"] for item in page["items"]]
+        scores += [item["score"] for item in page["items"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert sorted(seen) == ids and len(seen) == len(set(seen))
+    assert scores == sorted(scores, reverse=True)
+
+
+async def test_index_sees_writes_of_other_workers(client, session_factory, monkeypatch):
+    renamed = await create(client, "alpha старое")
+    deleted = await create(client, "alpha удалённая")
+    archived = await create(client, "alpha завершённая")
+    assert len((await search(client, "alpha")).json()["items"]) == 3
+
+    # Другой воркер пишет в базу мимо индекса этого процесса
+    monkeypatch.setattr(archive, "archive_indexed_task", lambda task_id: None)
+    long_ago = datetime.now(timezone.utc) - timedelta(days=365)
+    async with session_factory() as db:
+        await db.execute(update(Task).where(Task.id == renamed).values(title="beta новое"))
+        await db.execute(delete(Task).where(Task.id == deleted))
+        await record_tombstones(db, [deleted])
+        await db.execute(update(Task).where(Task.id == archived).values(completed=True, completed_at=long_ago))
+        created = (await db.execute(
+            insert(Task).values(title="alpha новая", quadrant="Q4").returning(Task.id)
+        )).scalar_one()
+        await db.commit()
+        assert await archive.archive_batch(db, datetime.now(timezone.utc)) == 1
+
+    assert [item["id"] for item in (await search(client, "alpha")).json()["items"]] == [created]
+    assert [item["id"] for item in (await search(client, "beta")).json()["items"]] == [renamed]
+
+
+@pytest.mark.parametrize("cursor", [
+    pack_cursor("x", 1), pack_cursor(None, None), pack_cursor(1.0, "1"), pack_cursor(True, 1),
+    pack_cursor(1.0, False), pack_cursor(float("nan"), 1), pack_cursor(1.0), "не-курсор",
+])
+async def test_bad_cursor_is_400(client, cursor):
+    await create(client, "alpha")
+
+    response = await search(client, "alpha", after=cursor)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Некорректный курсор"
+
+    # Запрос для PostgreSQL проверяет курсор так же
+    with pytest.raises(HTTPException) as error:
+        build_search_query(["alpha"], 10, cursor)
+    assert error.value.status_code == 400
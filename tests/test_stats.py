@@ -0,0 +1,98 @@
+"""
+GET /stats считается одним агрегирующим запросом (compute_task_stats). Эталон — прежний
+подсчёт циклом по всем задачам в Python; на случайных наборах задач результаты должны совпадать,
+в том числе после переноса части завершённых задач в архив.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+
+from models import ArchivedTask, Task
+from services.archive import archive_batch
+from services.stats import compute_task_stats
+from services.urgency import calculate_quadrant
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def reference_stats(tasks: list, now: datetime) -> dict:
+    """Прежний GET /stats: все задачи загружаются и считаются в цикле"""
+    by_quadrant = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
+    by_status = {"completed": 0, "pending": 0}
+    overdue_tasks = 0
+
+    for task in tasks:
+        if task.quadrant in by_quadrant:
+            by_quadrant[task.quadrant] += 1
+
+        if task.completed:
+            by_status["completed"] += 1
+        else:
+            by_status["pending"] += 1
+
+            if task.deadline_at:
+                deadline = task.deadline_at
+                if deadline.tzinfo is None:
+                    deadline = deadline.replace(tzinfo=timezone.utc)
+
+                if deadline < now:
+                    overdue_tasks += 1
+
+    return {
+        "total_tasks": len(tasks),
+        "by_quadrant": by_quadrant,
+        "by_status": by_status,
+        "overdue_tasks": overdue_tasks
+    }
+
+
+def random_task(rng: random.Random) -> dict:
+    is_important = rng.random() < 0.5
+    is_urgent = rng.random() < 0.5
+    completed = rng.random() < 0.4
+    deadline_at = rng.choice([
+        None,
+        NOW + timedelta(minutes=rng.randint(-60 * 24 * 30, 60 * 24 * 30)),
+        # Граница: дедлайн ровно сейчас ещё не просрочен
+        NOW,
+    ])
+    created_at = NOW - timedelta(days=rng.randint(0, 400), seconds=rng.randint(0, 86_400))
+    return {
+        "title": f"Задача {rng.randint(0, 10**6)}",
+        "is_important": is_important,
+        "is_urgent": is_urgent,
+        "quadrant": calculate_quadrant(is_important, is_urgent),
+        "completed": completed,
+        "created_at": created_at,
+        "completed_at": created_at + timedelta(days=rng.randint(0, 30)) if completed else None,
+        "deadline_at": deadline_at,
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+async def test_aggregate_matches_python_loop(session_factory, seed):
+    rng = random.Random(seed)
+    async with session_factory() as db:
+        await db.execute(insert(Task), [random_task(rng) for _ in range(rng.randint(0, 400))])
+        await db.commit()
+
+        tasks = (await db.execute(select(Task))).scalars().all()
+        assert await compute_task_stats(db, NOW) == reference_stats(tasks, NOW)
+
+
+async def test_archived_tasks_are_counted(session_factory):
+    rng = random.Random(42)
+    async with session_factory() as db:
+        await db.execute(insert(Task), [random_task(rng) for _ in range(300)])
+        await db.commit()
+        expected = reference_stats((await db.execute(select(Task))).scalars().all(), NOW)
+
+        moved = await archive_batch(db, NOW - timedelta(days=60), batch_size=1000)
+        assert moved > 0
+        assert len((await db.execute(select(ArchivedTask))).scalars().all()) == moved
+
+        assert await compute_task_stats(db, NOW) == expected
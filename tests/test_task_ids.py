@@ -0,0 +1,49 @@
+"""
+ID задач не повторяются и в SQLite (AUTOINCREMENT): новая задача не получает ID
+удалённой или перенесённой в архив, поэтому не совпадает со следом удаления
+(GET /tasks/changes) и с ключом строки архива.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.archive import archive_batch
+
+pytestmark = pytest.mark.anyio
+
+BASE = "/api/v2/tasks"
+
+
+async def create(client, title: str) -> dict:
+    response = await client.post(f"{BASE}/", json={"title": title, "is_important": False})
+    assert response.status_code == 201
+    return response.json()
+
+
+async def test_deleted_task_id_is_not_reused(client):
+    await create(client, "Первая")
+    last = await create(client, "Удалённая")
+    assert (await client.delete(f"{BASE}/{last['id']}")).status_code == 200
+
+    new = await create(client, "Новая")
+    assert new["id"] > last["id"]
+
+    changes = (await client.get(f"{BASE}/changes")).json()
+    assert changes["deleted"] == [last["id"]]
+    assert new["id"] in [task["id"] for task in changes["tasks"]]
+
+
+async def test_archived_task_id_is_not_reused(client, session_factory):
+    last = await create(client, "В архив")
+    assert (await client.patch(f"{BASE}/{last['id']}/complete")).status_code == 200
+
+    async with session_factory() as db:
+        assert await archive_batch(db, datetime.now(timezone.utc) + timedelta(days=1)) == 1
+
+    new = await create(client, "После архива")
+    assert new["id"] > last["id"]
+
+    # Следующий пакет архива с новой задачей не упирается в ключ tasks_archive
+    assert (await client.patch(f"{BASE}/{new['id']}/complete")).status_code == 200
+    async with session_factory() as db:
+        assert await archive_batch(db, datetime.now(timezone.utc) + timedelta(days=1)) == 1
@@ -0,0 +1,113 @@
+"""
+Обновление, завершение и удаление задачи: сама задача меняется одним запросом
+(UPDATE/DELETE ... RETURNING), без загрузки ORM-объекта до и refresh после commit.
+Запросы считаются слушателем before_cursor_execute на движке тестовой базы.
+
+Счётчики, дневные итоги и следы удалений пишутся следующими запросами той же
+транзакции; тесты фиксируют их полный список, чтобы лишний запрос был заметен сразу.
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+from services.task_writes import task_update_values, update_with_old_state
+
+pytestmark = pytest.mark.anyio
+
+BASE = "/api/v2/tasks"
+
+
+@contextmanager
+def recorded_statements(test_engine):
+    """Список (команда, таблица) каждого запроса, отправленного в базу внутри блока"""
+    statements = []
+
+    def remember(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.split(None, 1)[0].upper()
+        table = re.search(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", statement, re.IGNORECASE)
+        statements.append((verb, table.group(1) if table else None))
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", remember)
+    try:
+        yield statements
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", remember)
+
+
+def task_statements(statements: list) -> list:
+    return [verb for verb, table in statements if table == "tasks"]
+
+
+async def create(client, **fields) -> dict:
+    response = await client.post(f"{BASE}/", json={"title": "Задача", "is_important": False, **fields})
+    assert response.status_code == 201
+    return response.json()
+
+
+async def test_update_round_trips(client, test_engine):
+    task = await create(client)
+
+    with recorded_statements(test_engine) as statements:
+        response = await client.put(f"{BASE}/{task['id']}", json={"title": "Новое название"})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Новое название"
+    # SQLite: состояние до изменения читается отдельно (на PostgreSQL — в том же UPDATE)
+    assert task_statements(statements) == ["SELECT", "UPDATE"]
+    # Название не влияет на счётчики: других запросов нет
+    assert len(statements) == 2
+
+    with recorded_statements(test_engine) as statements:
+        response = await client.put(f"{BASE}/{task['id']}", json={"is_important": True})
+    assert response.json()["quadrant"] == "Q2"
+    assert statements == [("SELECT", "tasks"), ("UPDATE", "tasks"), ("UPDATE", "task_counters")]
+
+
+async def test_complete_round_trips(client, test_engine):
+    task = await create(client)
+
+    with recorded_statements(test_engine) as statements:
+        response = await client.patch(f"{BASE}/{task['id']}/complete")
+    assert response.status_code == 200
+    assert response.json()["completed"] is True
+    assert statements == [
+        ("SELECT", "tasks"),
+        ("UPDATE", "tasks"),
+        ("INSERT", "task_daily_stats"),
+        ("UPDATE", "task_counters"),
+    ]
+
+
+async def test_delete_round_trips(client, test_engine):
+    task = await create(client)
+
+    with recorded_statements(test_engine) as statements:
+        response = await client.delete(f"{BASE}/{task['id']}")
+    assert response.status_code == 200
+    assert response.json()["id"] == task["id"]
+    assert statements == [("DELETE", "tasks"), ("INSERT", "task_tombstones"), ("UPDATE", "task_counters")]
+
+
+async def test_missing_task_is_404_after_one_statement(client, test_engine):
+    with recorded_statements(test_engine) as statements:
+        assert (await client.delete(f"{BASE}/999")).status_code == 404
+    assert statements == [("DELETE", "tasks")]
+
+    with recorded_statements(test_engine) as statements:
+        assert (await client.patch(f"{BASE}/999/complete")).status_code == 404
+    assert statements == [("SELECT", "tasks")]
+
+
+def test_postgresql_update_returns_old_state_in_same_statement():
+    deadline = datetime.now(timezone.utc) + timedelta(days=1)
+    stmt = update_with_old_state(7, task_update_values({"deadline_at": deadline}))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("UPDATE tasks SET") and sql.count("UPDATE tasks") == 1
+    assert 'FOR UPDATE) AS "old"' in sql
+    assert '"old".quadrant AS old_quadrant' in sql and '"old".completed AS old_completed' in sql
+    # Квадрант по новой срочности и текущей важности считается в самом запросе
+    assert "CASE WHEN" in sql
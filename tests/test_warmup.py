@@ -0,0 +1,83 @@
+"""
+Прогрев при запуске: чтения роутеров и фоновых задач выполняются (на репликах — только GET),
+а изменяющие запросы — UPDATE пересчёта срочности, SELECT ... FOR UPDATE архиватора и записи
+роутеров — только компилируются: прогрев каждого воркера ничего не пишет и не блокирует.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert, select
+from sqlalchemy.dialects import postgresql
+
+import database
+from models import Base, Task
+from services import warmup
+from services.query_plans import router_queries, write_statements
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def replica_engine(tmp_path):
+    engine = database.create_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", "test-replica")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def record(engine, statements: list) -> None:
+    def remember(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine.sync_engine, "before_cursor_execute", remember)
+
+
+async def test_warm_up_executes_only_selects(test_engine, replica_engine, session_factory, monkeypatch):
+    long_ago = datetime.now(timezone.utc) - timedelta(days=365)
+    async with test_engine.begin() as connection:
+        # Задача, которую изменили бы и пересчёт срочности (дедлайн прошёл), и архиватор
+        await connection.execute(insert(Task).values(
+            title="Старая", quadrant="Q4", completed=True, completed_at=long_ago, deadline_at=long_ago
+        ))
+
+    monkeypatch.setattr(warmup, "engine", test_engine)
+    monkeypatch.setattr(warmup, "replica_engines", [replica_engine])
+    primary, replica = [], []
+    record(test_engine, primary)
+    record(replica_engine, replica)
+
+    report = await warmup.warm_up(connections=1)
+
+    queries = router_queries("sqlite")
+    reads = [name for name, stmt in queries if warmup.is_plain_select(stmt)]
+    router_reads = [name for name in reads if name.startswith("GET")]
+    # Основная база — все чтения, реплика — чтения роутеров, остальное только компилируется
+    assert report["statements"] == len(reads) + len(router_reads)
+    assert report["compiled"] == len(queries) - len(reads) + len(write_statements("sqlite"))
+    assert report["statements_failed"] == 0
+    assert set(primary) == {"SELECT"} and set(replica) == {"SELECT"}
+
+    async with session_factory() as db:
+        task = (await db.execute(select(Task))).scalar_one()
+    assert (task.quadrant, task.is_urgent) == ("Q4", False)
+
+
+def test_mutating_statements_are_not_plain_selects():
+    statements = dict(router_queries("postgresql") + write_statements("postgresql"))
+    writes = write_statements("postgresql")
+    assert warmup.compile_statements(postgresql.dialect(), writes) == len(writes)
+
+    assert warmup.is_plain_select(statements["GET /tasks"])
+    for name in ("requadrant tick", "archive batch", "PUT /tasks/batch (FOR UPDATE)",
+                 "POST /tasks, POST /tasks/batch", "PUT /tasks/{task_id}", "DELETE /tasks/{task_id}"):
+        assert not warmup.is_plain_select(statements[name]), name
+
+
+async def test_mutating_statement_is_skipped_by_warm_statements(test_engine):
+    executed = []
+    record(test_engine, executed)
+    statements = [(name, stmt) for name, stmt in router_queries("sqlite") if name == "requadrant tick"]
+
+    assert await warmup.warm_statements(test_engine, statements) == 0
+    assert executed == []